@@ -0,0 +1,130 @@
+"""
+Statistiques du tableau de bord admin
+Une agrégation $facet par collection (compteurs, somme et moyenne d'XP,
+tops) au lieu d'une série de count_documents et de calculs en Python.
+Le résultat est mis en cache avec un TTL court; une lecture périmée
+renvoie la dernière valeur et déclenche le recalcul en arrière-plan.
+"""
+import asyncio
+import os
+import time
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+ADMIN_STATS_TTL_SECONDS = int(os.environ.get('ADMIN_STATS_TTL_SECONDS', '60'))
+TOP_USERS_LIMIT = 5
+# Collections dont seul le volume est affiché (compteur des métadonnées)
+COUNTED_COLLECTIONS = ["strategies", "alerts", "chat_history", "signals", "journal"]
+
+
+def users_pipeline(week_ago: str):
+    return [{"$facet": {
+        "total": [{"$count": "n"}],
+        "admins": [{"$match": {"is_admin": True}}, {"$count": "n"}],
+        "new_this_week": [{"$match": {"created_at": {"$gte": week_ago}}}, {"$count": "n"}],
+        "academy": [
+            {"$match": {"academy_xp": {"$gt": 0}}},
+            {"$group": {"_id": None, "total_xp": {"$sum": "$academy_xp"},
+                        "average_xp": {"$avg": "$academy_xp"}, "learners": {"$sum": 1}}}
+        ],
+        "top_traders": [
+            {"$sort": {"paper_balance": -1}},
+            {"$limit": TOP_USERS_LIMIT},
+            {"$project": {"_id": 0, "id": 1, "name": 1, "email": 1, "paper_balance": 1}}
+        ],
+        "top_learners": [
+            {"$sort": {"academy_xp": -1}},
+            {"$limit": TOP_USERS_LIMIT},
+            {"$project": {"_id": 0, "id": 1, "name": 1, "email": 1, "academy_xp": 1}}
+        ]
+    }}]
+
+
+PAPER_TRADES_PIPELINE = [{"$facet": {
+    "total": [{"$count": "n"}],
+    "by_source": [{"$group": {"_id": "$source", "n": {"$sum": 1}}}]
+}}]
+
+
+def _count(bucket) -> int:
+    return bucket[0]["n"] if bucket else 0
+
+
+async def compute_admin_stats(db) -> Dict:
+    """Un passage par collection, exécutés en parallèle"""
+    week_ago = (datetime.now(timezone.utc) - timedelta(days=7)).isoformat()
+    users_task = db.users.aggregate(users_pipeline(week_ago)).to_list(1)
+    trades_task = db.paper_trades.aggregate(PAPER_TRADES_PIPELINE).to_list(1)
+    count_tasks = [db[name].estimated_document_count() for name in COUNTED_COLLECTIONS]
+    users_result, trades_result, *counts = await asyncio.gather(users_task, trades_task, *count_tasks)
+
+    users = users_result[0]
+    trades = trades_result[0]
+    academy = users["academy"][0] if users["academy"] else {}
+    by_source = {bucket["_id"]: bucket["n"] for bucket in trades["by_source"]}
+
+    return {
+        "users": {
+            "total": _count(users["total"]),
+            "admins": _count(users["admins"]),
+            "new_this_week": _count(users["new_this_week"])
+        },
+        "trading": {
+            "total_trades": _count(trades["total"]),
+            "auto_trades": by_source.get("auto_trading", 0),
+            "smart_invest_trades": by_source.get("smart_invest", 0)
+        },
+        "academy": {
+            "total_xp_earned": academy.get("total_xp", 0),
+            "average_xp": round(academy.get("average_xp") or 0, 1),
+            "active_learners": academy.get("learners", 0)
+        },
+        "top_traders": users["top_traders"],
+        "top_learners": users["top_learners"],
+        "counts": dict(zip(COUNTED_COLLECTIONS, counts)),
+        "timestamp": datetime.now(timezone.utc).isoformat()
+    }
+
+
+class AdminStatsCache:
+    """Dernier résultat de compute_admin_stats, recalculé une fois à la fois"""
+
+    def __init__(self, ttl: int = ADMIN_STATS_TTL_SECONDS):
+        self.ttl = ttl
+        self._value: Optional[Dict] = None
+        self._computed_at = 0.0
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def _stale(self) -> bool:
+        return time.monotonic() - self._computed_at >= self.ttl
+
+    async def refresh(self, db) -> Dict:
+        async with self._lock:
+            if self._value is None or self._stale():
+                self._value = await compute_admin_stats(db)
+                self._computed_at = time.monotonic()
+        return self._value
+
+    async def _refresh_quietly(self, db):
+        try:
+            await self.refresh(db)
+        except Exception as e:
+            logger.error(f"Admin stats refresh failed: {e}")
+
+    async def get(self, db) -> Dict:
+        if self._value is None:
+            return await self.refresh(db)
+        if self._stale() and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._refresh_quietly(db))
+        return self._value
+
+    def invalidate(self):
+        self._computed_at = 0.0
+
+
+# Instance globale
+admin_stats = AdminStatsCache()
@@ -2,6 +2,7 @@ from fastapi import HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import jwt
 from .config import db, JWT_SECRET, JWT_ALGORITHM
+from .user_cache import user_cache
 
 security = HTTPBearer()
 
@@ -14,7 +15,7 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         if not user_id:
             raise HTTPException(status_code=401, detail="Invalid token")
         
-        user = await db.users.find_one({"id": user_id}, {"_id": 0})
+        user = await user_cache.load(db, user_id)
         if not user:
             raise HTTPException(status_code=401, detail="User not found")
         
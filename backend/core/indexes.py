@@ -0,0 +1,220 @@
+"""
+Manifeste des index MongoDB de BULL SAGE
+Appliqué de façon idempotente au démarrage: chaque index correspond à la forme
+d'une requête fréquente (égalité d'abord, puis tri, puis plage)
+"""
+import os
+from datetime import datetime, timezone, timedelta
+from typing import Dict, List, Optional
+import logging
+
+from pymongo import IndexModel, ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# Rétention des collections de logs (jours), appliquée par index TTL sur "expires_at"
+ERROR_LOG_RETENTION_DAYS = int(os.environ.get('ERROR_LOG_RETENTION_DAYS', '30'))
+NEWSLETTER_LOG_RETENTION_DAYS = int(os.environ.get('NEWSLETTER_LOG_RETENTION_DAYS', '90'))
+
+
+def _ttl(name: str) -> IndexModel:
+    # Les documents expirent à la date portée par "expires_at"
+    return IndexModel([("expires_at", ASCENDING)], name=name, expireAfterSeconds=0)
+
+
+INDEX_MANIFEST: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        IndexModel([("is_admin", ASCENDING)], name="is_admin"),
+        IndexModel([("auto_trading_config.enabled", ASCENDING)], name="auto_trading_enabled"),
+        IndexModel([("academy_xp", DESCENDING)], name="academy_xp_desc"),
+        IndexModel([("paper_balance", DESCENDING)], name="paper_balance_desc"),
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_id"),
+    ],
+    "signals": [
+        IndexModel([("user_id", ASCENDING), ("status", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="user_status_created_id"),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="user_created_id"),
+        IndexModel([("user_id", ASCENDING), ("result_pnl", DESCENDING)], name="user_result_pnl"),
+        IndexModel([("status", ASCENDING)], name="status"),
+        IndexModel([("id", ASCENDING)], name="id"),
+    ],
+    "signal_stats": [
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+    ],
+    "journal": [
+        IndexModel([("user_id", ASCENDING), ("status", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="user_status_created_id"),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="user_created_id"),
+        IndexModel([("user_id", ASCENDING), ("exit_date", ASCENDING)], name="user_exit_date"),
+        IndexModel([("id", ASCENDING)], name="id"),
+    ],
+    "journal_stats": [
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+    ],
+    "paper_trades": [
+        IndexModel([("user_id", ASCENDING), ("source", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="user_source_created_id"),
+        IndexModel([("user_id", ASCENDING), ("source", ASCENDING), ("status", ASCENDING)], name="user_source_status"),
+        IndexModel([("user_id", ASCENDING), ("timestamp", DESCENDING), ("id", DESCENDING)], name="user_timestamp_id"),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="user_created_id"),
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_id"),
+    ],
+    "paper_ledger": [
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+        IndexModel([("realized_pnl", DESCENDING), ("user_id", ASCENDING)], name="realized_pnl_user"),
+    ],
+    "auto_trades": [
+        IndexModel([("status", ASCENDING)], name="status"),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="user_created_id"),
+    ],
+    "smart_alerts": [
+        IndexModel([("user_id", ASCENDING), ("triggered", ASCENDING)], name="user_triggered"),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)], name="user_created"),
+        IndexModel([("triggered", ASCENDING), ("alert_type", ASCENDING)], name="triggered_type"),
+    ],
+    "academy_progress": [
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+        IndexModel([("total_xp", DESCENDING)], name="total_xp_desc"),
+    ],
+    "chat_history": [
+        IndexModel([("user_id", ASCENDING), ("timestamp", DESCENDING)], name="user_timestamp"),
+    ],
+    "chat_memory": [
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+    ],
+    "alerts": [IndexModel([("user_id", ASCENDING)], name="user_id")],
+    "strategies": [IndexModel([("user_id", ASCENDING)], name="user_id")],
+    "wallets": [IndexModel([("user_id", ASCENDING)], name="user_id")],
+    "settings": [IndexModel([("type", ASCENDING)], name="type")],
+    "error_logs": [
+        IndexModel([("timestamp", DESCENDING)], name="timestamp_desc"),
+        _ttl("expires_at_ttl"),
+    ],
+    "newsletter_logs": [
+        IndexModel([("sent_at", DESCENDING)], name="sent_at_desc"),
+        _ttl("expires_at_ttl"),
+    ],
+    "newsletter_deliveries": [
+        IndexModel([("run_id", ASCENDING), ("status", ASCENDING), ("user_id", ASCENDING)], name="run_status_user"),
+        _ttl("expires_at_ttl"),
+    ],
+    "newsletter_jobs": [
+        IndexModel([("status", ASCENDING), ("heartbeat_at", ASCENDING)], name="status_heartbeat"),
+    ],
+}
+
+
+def log_expiry(days: int) -> datetime:
+    """Date d'expiration à stocker dans "expires_at" d'un document de log"""
+    return datetime.now(timezone.utc) + timedelta(days=days)
+
+
+async def ensure_indexes(db) -> Dict[str, List[str]]:
+    """
+    Crée les index du manifeste (no-op s'ils existent déjà à l'identique).
+    Un conflit (doublons sur un index unique, définition modifiée) est journalisé
+    sans bloquer le démarrage.
+    """
+    created = {}
+    for collection, indexes in INDEX_MANIFEST.items():
+        try:
+            created[collection] = await db[collection].create_indexes(indexes)
+        except OperationFailure as e:
+            logger.warning(f"Index creation failed for {collection}: {e}")
+            # Créer individuellement ceux qui ne sont pas en conflit
+            created[collection] = []
+            for index in indexes:
+                try:
+                    created[collection] += await db[collection].create_indexes([index])
+                except OperationFailure as err:
+                    logger.warning(f"Index {collection}.{index.document['name']} skipped: {err}")
+
+    return created
+
+
+# Requêtes fréquentes vérifiées par le rapport d'administration
+# (les valeurs "$user_id" sont remplacées par l'identifiant de l'administrateur)
+HOT_QUERIES = [
+    {"name": "auth_user_by_id", "collection": "users", "filter": {"id": "$user_id"}},
+    {"name": "login_user_by_email", "collection": "users", "filter": {"email": "$email"}},
+    {"name": "active_signals", "collection": "signals",
+     "filter": {"user_id": "$user_id", "status": "active"}, "sort": {"created_at": -1, "id": -1}},
+    {"name": "signals_list", "collection": "signals",
+     "filter": {"user_id": "$user_id"}, "sort": {"created_at": -1, "id": -1}},
+    {"name": "closed_journal_trades", "collection": "journal",
+     "filter": {"user_id": "$user_id", "status": {"$ne": "open"}}},
+    {"name": "auto_trades_today", "collection": "paper_trades",
+     "filter": {"user_id": "$user_id", "source": "auto_trading", "created_at": {"$gte": "$today"}}},
+    {"name": "paper_trades_history", "collection": "paper_trades",
+     "filter": {"user_id": "$user_id"}, "sort": {"timestamp": -1, "id": -1}},
+    {"name": "admin_users_page", "collection": "users",
+     "filter": {}, "sort": {"created_at": -1, "id": -1}, "limit": 200},
+    {"name": "academy_leaderboard", "collection": "academy_progress",
+     "filter": {}, "sort": {"total_xp": -1}, "limit": 20},
+    {"name": "pending_smart_alerts", "collection": "smart_alerts",
+     "filter": {"user_id": "$user_id", "triggered": False}},
+    {"name": "chat_history", "collection": "chat_history",
+     "filter": {"user_id": "$user_id"}, "sort": {"timestamp": -1}},
+    {"name": "error_logs_recent", "collection": "error_logs",
+     "filter": {}, "sort": {"timestamp": -1}, "limit": 100},
+    {"name": "newsletter_top_traders", "collection": "paper_ledger",
+     "filter": {"realized_pnl": {"$gt": 0}}, "sort": {"realized_pnl": -1, "user_id": 1}, "limit": 5},
+    # Derniers trades d'un trader: une branche par champ d'heure d'exécution
+    {"name": "newsletter_trader_manual_trades", "collection": "paper_trades",
+     "filter": {"user_id": "$user_id", "timestamp": {"$exists": True}},
+     "sort": {"timestamp": -1, "id": -1}, "limit": 2},
+    {"name": "newsletter_trader_other_trades", "collection": "paper_trades",
+     "filter": {"user_id": "$user_id", "timestamp": {"$exists": False}},
+     "sort": {"created_at": -1, "id": -1}, "limit": 2},
+]
+
+
+def _bind(value, params: Dict):
+    if isinstance(value, dict):
+        return {k: _bind(v, params) for k, v in value.items()}
+    if isinstance(value, str) and value.startswith("$") and value[1:] in params:
+        return params[value[1:]]
+    return value
+
+
+def _plan_stages(plan: Dict) -> List[Dict]:
+    """Aplatit l'arbre du plan gagnant en liste d'étapes"""
+    if "queryPlan" in plan:
+        # Format du moteur SBE (MongoDB >= 7)
+        plan = plan["queryPlan"]
+    stages = [plan]
+    for child in plan.get("inputStages", []) + ([plan["inputStage"]] if "inputStage" in plan else []):
+        stages += _plan_stages(child)
+    return stages
+
+
+async def explain_hot_queries(db, params: Optional[Dict] = None) -> List[Dict]:
+    """Plan d'exécution (queryPlanner) de chaque requête fréquente"""
+    params = params or {}
+    report = []
+    for query in HOT_QUERIES:
+        command = {"find": query["collection"], "filter": _bind(query["filter"], params)}
+        if query.get("sort"):
+            command["sort"] = query["sort"]
+        if query.get("limit"):
+            command["limit"] = query["limit"]
+
+        try:
+            explain = await db.command({"explain": command, "verbosity": "queryPlanner"})
+        except OperationFailure as e:
+            report.append({"name": query["name"], "collection": query["collection"], "error": str(e)})
+            continue
+
+        stages = _plan_stages(explain.get("queryPlanner", {}).get("winningPlan", {}))
+        index_names = [s["indexName"] for s in stages if s.get("stage") == "IXSCAN"]
+        stage_names = [s.get("stage") for s in stages]
+        report.append({
+            "name": query["name"],
+            "collection": query["collection"],
+            "uses_index": bool(index_names),
+            "indexes": index_names,
+            "collection_scan": "COLLSCAN" in stage_names,
+            "in_memory_sort": "SORT" in stage_names,
+            "stages": stage_names
+        })
+    return report
@@ -0,0 +1,97 @@
+"""
+Pagination par curseur (keyset) des listes
+Les pages sont triées par (champ de tri, identifiant) décroissants et la page
+suivante repart après le dernier élément renvoyé: le coût d'une page ne dépend
+pas de sa position, contrairement à skip. Le curseur de la page suivante est
+renvoyé dans l'en-tête X-Next-Cursor (absent sur la dernière page).
+"""
+import base64
+import binascii
+from typing import Dict, List, Optional, Tuple
+
+from bson import json_util
+from fastapi import HTTPException
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(value, tiebreak) -> str:
+    raw = json_util.dumps([value, tiebreak]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple:
+    try:
+        value, tiebreak = json_util.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (binascii.Error, ValueError, TypeError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    return value, tiebreak
+
+
+def keyset_filter(query: Dict, sort_field: str, tiebreak: str, after: Optional[str]) -> Dict:
+    """
+    Filtre des éléments situés après le curseur (ordre décroissant).
+    Les documents sans valeur de tri sont classés en dernier, comme le fait MongoDB.
+    """
+    if not after:
+        return query
+    value, last_id = decode_cursor(after)
+    if value is None:
+        position = {sort_field: None, tiebreak: {"$lt": last_id}}
+    else:
+        position = {"$or": [
+            {sort_field: {"$lt": value}},
+            {sort_field: value, tiebreak: {"$lt": last_id}},
+            {sort_field: None}
+        ]}
+    return {"$and": [query, position]} if query else position
+
+
+def parse_fields(fields: Optional[str], hidden: Tuple[str, ...] = ()) -> Optional[Dict]:
+    """Projection demandée via ?fields=a,b,c (None = tous les champs)"""
+    if not fields:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    projection = {name: 1 for name in names if name not in hidden and not name.startswith("$")}
+    if not projection:
+        raise HTTPException(status_code=400, detail="No valid field requested")
+    return projection
+
+
+async def fetch_page(
+    collection,
+    query: Dict,
+    limit: int,
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    sort_field: str = "created_at",
+    tiebreak: str = "id",
+    exclude: Tuple[str, ...] = (),
+) -> Tuple[List[Dict], Optional[str]]:
+    """
+    Une page de `collection` et le curseur de la suivante.
+    `exclude` liste les champs jamais renvoyés (ex: password).
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    projection = parse_fields(fields, hidden=exclude)
+    if projection is None:
+        projection = {"_id": 0, **{name: 0 for name in exclude}}
+    else:
+        # Les clés du curseur sont toujours lues
+        projection.update({sort_field: 1, tiebreak: 1, "_id": 0})
+
+    cursor = collection.find(keyset_filter(query, sort_field, tiebreak, after), projection)
+    items = await cursor.sort([(sort_field, -1), (tiebreak, -1)]).limit(limit + 1).to_list(limit + 1)
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_cursor(last.get(sort_field), last.get(tiebreak))
+    return items, next_cursor
+
+
+def set_next_cursor(response, next_cursor: Optional[str]):
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
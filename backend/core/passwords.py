@@ -0,0 +1,164 @@
+"""
+Hachage des mots de passe hors de la boucle d'événements
+bcrypt est exécuté dans un pool de threads borné (bcrypt libère le GIL),
+avec un coût configurable et une limitation des tentatives de connexion
+"""
+import asyncio
+import ipaddress
+import os
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+import bcrypt
+
+# Facteur de coût bcrypt (2^rounds itérations)
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', '12'))
+# Threads dédiés au hachage
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', '4'))
+
+# Limitation des tentatives de connexion (fenêtre glissante)
+LOGIN_WINDOW_SECONDS = int(os.environ.get('LOGIN_WINDOW_SECONDS', '900'))
+LOGIN_MAX_FAILURES_PER_ACCOUNT = int(os.environ.get('LOGIN_MAX_FAILURES_PER_ACCOUNT', '5'))
+LOGIN_MAX_ATTEMPTS_PER_IP = int(os.environ.get('LOGIN_MAX_ATTEMPTS_PER_IP', '30'))
+# Clés suivies au plus par compteur (les moins récemment vues sont évincées)
+LOGIN_THROTTLE_MAX_KEYS = int(os.environ.get('LOGIN_THROTTLE_MAX_KEYS', '10000'))
+# Proxys dont l'en-tête X-Forwarded-For fait foi (IP ou réseaux CIDR, séparés par des virgules)
+TRUSTED_PROXIES = [
+    ipaddress.ip_network(entry.strip(), strict=False)
+    for entry in os.environ.get('TRUSTED_PROXIES', '').split(',') if entry.strip()
+]
+
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+
+
+def _hash_sync(password: str, rounds: int) -> str:
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=rounds)).decode('utf-8')
+
+
+def _verify_sync(password: str, hashed: str) -> bool:
+    try:
+        return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+    except ValueError:
+        # Hash mal formé en base
+        return False
+
+
+async def hash_password(password: str, rounds: int = BCRYPT_ROUNDS) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, _hash_sync, password, rounds)
+
+
+async def verify_password(password: str, hashed: str) -> bool:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, _verify_sync, password, hashed)
+
+
+def hash_rounds(hashed: str) -> Optional[int]:
+    """Coût encodé dans un hash bcrypt ($2b$12$...)"""
+    try:
+        return int(hashed.split("$")[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def needs_rehash(hashed: str) -> bool:
+    """Vrai si le hash a été produit avec un autre coût que la configuration"""
+    return hash_rounds(hashed) != BCRYPT_ROUNDS
+
+
+def _is_trusted_proxy(host: Optional[str]) -> bool:
+    if not host or not TRUSTED_PROXIES:
+        return False
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in TRUSTED_PROXIES)
+
+
+def client_ip(request) -> Optional[str]:
+    """
+    IP du client. X-Forwarded-For n'est lu que si la connexion vient d'un proxy de
+    confiance: le premier saut non fiable en partant de la droite est retenu
+    (les entrées plus à gauche sont fournies par le client et falsifiables).
+    """
+    peer = request.client.host if request.client else None
+    forwarded = request.headers.get("x-forwarded-for")
+    if not forwarded or not _is_trusted_proxy(peer):
+        return peer
+    hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if not _is_trusted_proxy(hop):
+            return hop
+    return hops[0] if hops else peer
+
+
+class LoginThrottle:
+    """
+    Compteurs en fenêtre glissante: échecs par compte, tentatives par IP.
+    Bloque avant tout calcul bcrypt pour protéger le pool de hachage.
+    """
+
+    def __init__(self, window: int = LOGIN_WINDOW_SECONDS,
+                 max_failures_per_account: int = LOGIN_MAX_FAILURES_PER_ACCOUNT,
+                 max_attempts_per_ip: int = LOGIN_MAX_ATTEMPTS_PER_IP):
+        self.window = window
+        self.max_failures_per_account = max_failures_per_account
+        self.max_attempts_per_ip = max_attempts_per_ip
+        self._account_failures: "OrderedDict[str, deque]" = OrderedDict()
+        self._ip_attempts: "OrderedDict[str, deque]" = OrderedDict()
+
+    def _prune(self, events: deque, now: float):
+        while events and events[0] <= now - self.window:
+            events.popleft()
+
+    def _retry_after(self, book: Dict[str, deque], key: str, limit: int, now: float) -> int:
+        events = book.get(key)
+        if not events:
+            return 0
+        self._prune(events, now)
+        if not events:
+            del book[key]
+            return 0
+        if len(events) < limit:
+            return 0
+        return int(events[0] + self.window - now) + 1
+
+    def check(self, email: str, ip: Optional[str]) -> int:
+        """Secondes à attendre avant une nouvelle tentative (0 si autorisée)"""
+        now = time.monotonic()
+        wait = self._retry_after(self._account_failures, email.lower(), self.max_failures_per_account, now)
+        if ip:
+            wait = max(wait, self._retry_after(self._ip_attempts, ip, self.max_attempts_per_ip, now))
+        return wait
+
+    def _record(self, book: "OrderedDict[str, deque]", key: str):
+        now = time.monotonic()
+        events = book.get(key)
+        if events is None:
+            events = book[key] = deque()
+        else:
+            book.move_to_end(key)
+        events.append(now)
+        # Ordre LRU: les clés en tête sont les moins récemment vues
+        while book:
+            oldest = next(iter(book.values()))
+            if len(book) <= LOGIN_THROTTLE_MAX_KEYS and oldest[-1] > now - self.window:
+                break
+            book.popitem(last=False)
+
+    def record_attempt(self, ip: Optional[str]):
+        if ip:
+            self._record(self._ip_attempts, ip)
+
+    def record_failure(self, email: str):
+        self._record(self._account_failures, email.lower())
+
+    def record_success(self, email: str):
+        self._account_failures.pop(email.lower(), None)
+
+
+# Instance globale
+login_throttle = LoginThrottle()
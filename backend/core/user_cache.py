@@ -0,0 +1,83 @@
+"""
+Cache mémoire des utilisateurs authentifiés
+Évite une lecture MongoDB par appel API: entrées à durée de vie courte,
+taille bornée (LRU), invalidées explicitement par les handlers qui modifient
+un utilisateur
+"""
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+# Projection légère pour l'authentification (sans mot de passe ni portefeuille)
+AUTH_USER_PROJECTION = {"_id": 0, "password": 0, "portfolio": 0, "auto_trading_config": 0}
+
+USER_CACHE_TTL_SECONDS = float(os.environ.get('USER_CACHE_TTL_SECONDS', '30'))
+USER_CACHE_MAX_ENTRIES = int(os.environ.get('USER_CACHE_MAX_ENTRIES', '10000'))
+
+
+class UserCache:
+    """Cache LRU à expiration, indexé par id utilisateur"""
+
+    def __init__(self, ttl: float = USER_CACHE_TTL_SECONDS, max_entries: int = USER_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, user_id: str) -> Optional[Dict]:
+        entry = self._entries.get(user_id)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[user_id]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        # Copie pour que les handlers ne modifient pas l'entrée partagée
+        return dict(entry[1])
+
+    def set(self, user_id: str, user: Dict):
+        self._entries[user_id] = (time.monotonic() + self.ttl, dict(user))
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, user_id: str):
+        if self._entries.pop(user_id, None) is not None:
+            self.invalidations += 1
+
+    def clear(self):
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+
+    async def load(self, db, user_id: str) -> Optional[Dict]:
+        """Utilisateur depuis le cache, sinon depuis MongoDB (projection légère)"""
+        user = self.get(user_id)
+        if user is not None:
+            return user
+        user = await db.users.find_one({"id": user_id}, AUTH_USER_PROJECTION)
+        if user is not None:
+            self.set(user_id, user)
+        return user
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
+
+
+# Instance globale
+user_cache = UserCache()
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Response
 from datetime import datetime, timezone
 import httpx
 import asyncio
@@ -16,33 +16,40 @@ from ..core.config import (
     logger
 )
 from ..core.auth import get_current_user, get_admin_user
+from ..core.indexes import log_expiry, ERROR_LOG_RETENTION_DAYS
+from ..core.user_cache import user_cache
+from ..core.admin_stats import admin_stats
+from ..core.pagination import fetch_page, set_next_cursor
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
 @router.get("/users")
-async def get_all_users(current_user: dict = Depends(get_admin_user)):
-    """Get all users (admin only)"""
-    users = await db.users.find({}, {"_id": 0, "password": 0}).to_list(1000)
+async def get_all_users(
+    response: Response,
+    limit: int = 200,
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    current_user: dict = Depends(get_admin_user)
+):
+    """Get users, newest first (admin only, next page: ?after=<X-Next-Cursor>)"""
+    users, next_cursor = await fetch_page(db.users, {}, limit, after, fields, exclude=("password",))
+    set_next_cursor(response, next_cursor)
     return users
 
 @router.get("/stats")
 async def get_admin_stats(current_user: dict = Depends(get_admin_user)):
     """Get admin statistics"""
-    total_users = await db.users.count_documents({})
-    total_trades = await db.paper_trades.count_documents({})
-    total_signals = await db.signals.count_documents({})
-    total_alerts = await db.alerts.count_documents({})
-    total_journal = await db.journal.count_documents({})
-    total_strategies = await db.strategies.count_documents({})
+    stats = await admin_stats.get(db)
+    counts = stats["counts"]
     
     return {
-        "total_users": total_users,
-        "total_trades": total_trades,
-        "total_signals": total_signals,
-        "total_alerts": total_alerts,
-        "total_journal_entries": total_journal,
-        "total_strategies": total_strategies,
-        "timestamp": datetime.now(timezone.utc).isoformat()
+        "total_users": stats["users"]["total"],
+        "total_trades": stats["trading"]["total_trades"],
+        "total_signals": counts["signals"],
+        "total_alerts": counts["alerts"],
+        "total_journal_entries": counts["journal"],
+        "total_strategies": counts["strategies"],
+        "timestamp": stats["timestamp"]
     }
 
 @router.delete("/users/{user_id}")
@@ -52,11 +59,15 @@ async def delete_user(user_id: str, current_user: dict = Depends(get_admin_user)
         raise HTTPException(status_code=400, detail="Cannot delete yourself")
     
     await db.users.delete_one({"id": user_id})
+    user_cache.invalidate(user_id)
     await db.paper_trades.delete_many({"user_id": user_id})
     await db.signals.delete_many({"user_id": user_id})
+    await db.signal_stats.delete_one({"user_id": user_id})
     await db.alerts.delete_many({"user_id": user_id})
     await db.journal.delete_many({"user_id": user_id})
     await db.strategies.delete_many({"user_id": user_id})
+    await db.paper_ledger.delete_many({"user_id": user_id})
+    await db.journal_stats.delete_many({"user_id": user_id})
     
     return {"message": "User and all associated data deleted"}
 
@@ -70,6 +81,7 @@ async def toggle_admin(user_id: str, is_admin: bool, current_user: dict = Depend
         {"id": user_id},
         {"$set": {"is_admin": is_admin}}
     )
+    user_cache.invalidate(user_id)
     return {"message": f"Admin status set to {is_admin}"}
 
 @router.get("/api-keys")
@@ -268,7 +280,8 @@ async def save_error_log(
         "source": source,
         "details": details or {},
         "user_id": current_user.get("id"),
-        "user_email": current_user.get("email")
+        "user_email": current_user.get("email"),
+        "expires_at": log_expiry(ERROR_LOG_RETENTION_DAYS)
     }
     
     await db.error_logs.insert_one(log_entry)
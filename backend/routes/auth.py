@@ -1,22 +1,15 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
 from datetime import datetime, timezone, timedelta
 import uuid
 import jwt
-import bcrypt
 
 from ..core.config import db, JWT_SECRET, JWT_ALGORITHM, JWT_EXPIRATION_HOURS
 from ..core.auth import get_current_user
+from ..core.passwords import hash_password, verify_password, needs_rehash, login_throttle, client_ip
 from ..models.schemas import UserCreate, UserLogin, UserResponse, TokenResponse
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
-# Password hashing functions
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-
-def verify_password(password: str, hashed: str) -> bool:
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
-
 def create_token(user_id: str, email: str) -> str:
     expiry = datetime.now(timezone.utc) + timedelta(hours=JWT_EXPIRATION_HOURS)
     payload = {
@@ -36,7 +29,7 @@ async def register(user_data: UserCreate):
     user_doc = {
         "id": user_id,
         "email": user_data.email,
-        "password": hash_password(user_data.password),
+        "password": await hash_password(user_data.password),
         "name": user_data.name,
         "trading_level": user_data.trading_level,
         "created_at": datetime.now(timezone.utc).isoformat(),
@@ -62,10 +55,29 @@ async def register(user_data: UserCreate):
     return TokenResponse(access_token=token, user=user_response)
 
 @router.post("/login", response_model=TokenResponse)
-async def login(credentials: UserLogin):
+async def login(credentials: UserLogin, request: Request):
+    ip = client_ip(request)
+    retry_after = login_throttle.check(credentials.email, ip)
+    if retry_after:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many login attempts, please try again later",
+            headers={"Retry-After": str(retry_after)}
+        )
+    login_throttle.record_attempt(ip)
+    
     user = await db.users.find_one({"email": credentials.email})
-    if not user or not verify_password(credentials.password, user["password"]):
+    if not user or not await verify_password(credentials.password, user["password"]):
+        login_throttle.record_failure(credentials.email)
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    login_throttle.record_success(credentials.email)
+    
+    # Transparently upgrade hashes produced with a different cost factor
+    if needs_rehash(user["password"]):
+        await db.users.update_one(
+            {"id": user["id"]},
+            {"$set": {"password": await hash_password(credentials.password)}}
+        )
     
     token = create_token(user["id"], user["email"])
     
@@ -89,6 +101,8 @@ async def login(credentials: UserLogin):
 
 @router.get("/me", response_model=UserResponse)
 async def get_me(current_user: dict = Depends(get_current_user)):
+    # The cached auth user is lean: load the portfolio separately
+    holdings = await db.users.find_one({"id": current_user["id"]}, {"_id": 0, "portfolio": 1}) or {}
     return UserResponse(
         id=current_user["id"],
         email=current_user["email"],
@@ -102,5 +116,5 @@ async def get_me(current_user: dict = Depends(get_current_user)):
         preferences=current_user.get("preferences"),
         avatar=current_user.get("avatar"),
         points=current_user.get("points", 0),
-        portfolio=current_user.get("portfolio", {})
+        portfolio=holdings.get("portfolio", {})
     )
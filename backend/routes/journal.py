@@ -1,12 +1,13 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Response
 from typing import Optional
 from datetime import datetime, timezone
-from collections import Counter
 import uuid
 
 from ..core.config import db
 from ..core.auth import get_current_user
+from ..core.pagination import fetch_page, set_next_cursor
 from ..models.schemas import TradeJournalCreate, TradeJournalClose
+from ..services.journal_stats import record_closed_trade, get_journal_stats
 
 router = APIRouter(prefix="/journal", tags=["Trading Journal"])
 
@@ -56,16 +57,20 @@ async def create_journal_entry(entry: TradeJournalCreate, current_user: dict = D
 
 @router.get("/trades")
 async def get_journal_entries(
+    response: Response,
     status: Optional[str] = None,
     limit: int = 50,
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
     current_user: dict = Depends(get_current_user)
 ):
-    """Get trade journal entries"""
+    """Get trade journal entries (next page: ?after=<X-Next-Cursor>)"""
     query = {"user_id": current_user["id"]}
     if status:
         query["status"] = status
     
-    entries = await db.journal.find(query, {"_id": 0}).sort("created_at", -1).to_list(limit)
+    entries, next_cursor = await fetch_page(db.journal, query, limit, after, fields)
+    set_next_cursor(response, next_cursor)
     return entries
 
 @router.put("/trades/{trade_id}/close")
@@ -104,18 +109,20 @@ async def close_journal_trade(trade_id: str, close_data: TradeJournalClose, curr
         "updated_at": datetime.now(timezone.utc).isoformat()
     }
     
-    await db.journal.update_one({"id": trade_id}, {"$set": update_data})
+    result = await db.journal.update_one({"id": trade_id, "status": "open"}, {"$set": update_data})
+    if result.modified_count == 0:
+        raise HTTPException(status_code=400, detail="Trade already closed")
+    
+    # Fold the close into the materialized journal stats (O(1))
+    await record_closed_trade(db, {**trade, **update_data})
     return {"message": "Trade closed", "pnl_percent": round(pnl_percent, 2), "status": status}
 
 @router.get("/stats")
 async def get_trading_stats(current_user: dict = Depends(get_current_user)):
-    """Get comprehensive trading statistics"""
-    trades = await db.journal.find(
-        {"user_id": current_user["id"], "status": {"$ne": "open"}},
-        {"_id": 0}
-    ).to_list(1000)
+    """Get comprehensive trading statistics (materialized, updated on each close)"""
+    stats = await get_journal_stats(db, current_user["id"])
     
-    if not trades:
+    if not stats:
         return {
             "total_trades": 0,
             "winning_trades": 0,
@@ -130,88 +137,9 @@ async def get_trading_stats(current_user: dict = Depends(get_current_user)):
             "average_rr": 0,
             "most_traded_symbol": "N/A",
             "best_timeframe": "N/A",
+            "best_day_of_week": "N/A",
             "current_streak": 0,
             "max_drawdown": 0
         }
     
-    total = len(trades)
-    winning = [t for t in trades if t["status"] == "closed_profit"]
-    losing = [t for t in trades if t["status"] == "closed_loss"]
-    
-    win_rate = (len(winning) / total * 100) if total > 0 else 0
-    
-    pnls = [t.get("pnl_percent", 0) for t in trades]
-    total_pnl = sum(pnls)
-    
-    win_pnls = [t.get("pnl_percent", 0) for t in winning]
-    loss_pnls = [t.get("pnl_percent", 0) for t in losing]
-    
-    avg_win = sum(win_pnls) / len(win_pnls) if win_pnls else 0
-    avg_loss = sum(loss_pnls) / len(loss_pnls) if loss_pnls else 0
-    
-    best_trade = max(pnls) if pnls else 0
-    worst_trade = min(pnls) if pnls else 0
-    
-    gross_profit = sum([p for p in pnls if p > 0])
-    gross_loss = abs(sum([p for p in pnls if p < 0]))
-    profit_factor = gross_profit / gross_loss if gross_loss > 0 else gross_profit
-    
-    rrs = [t.get("risk_reward_ratio", 0) for t in trades]
-    avg_rr = sum(rrs) / len(rrs) if rrs else 0
-    
-    symbols = [t["symbol"] for t in trades]
-    most_traded = Counter(symbols).most_common(1)[0][0] if symbols else "N/A"
-    
-    timeframes = {}
-    for t in trades:
-        tf = t.get("timeframe", "unknown")
-        if tf not in timeframes:
-            timeframes[tf] = {"wins": 0, "total": 0}
-        timeframes[tf]["total"] += 1
-        if t["status"] == "closed_profit":
-            timeframes[tf]["wins"] += 1
-    
-    best_tf = max(timeframes.items(), key=lambda x: x[1]["wins"]/x[1]["total"] if x[1]["total"] > 0 else 0)[0] if timeframes else "N/A"
-    
-    sorted_trades = sorted(trades, key=lambda x: x.get("exit_date", ""), reverse=True)
-    streak = 0
-    streak_type = None
-    for t in sorted_trades:
-        if streak_type is None:
-            streak_type = t["status"]
-            streak = 1
-        elif t["status"] == streak_type:
-            streak += 1
-        else:
-            break
-    
-    current_streak = streak if streak_type == "closed_profit" else -streak
-    
-    cumulative = 0
-    peak = 0
-    max_dd = 0
-    for pnl in pnls:
-        cumulative += pnl
-        if cumulative > peak:
-            peak = cumulative
-        dd = peak - cumulative
-        if dd > max_dd:
-            max_dd = dd
-    
-    return {
-        "total_trades": total,
-        "winning_trades": len(winning),
-        "losing_trades": len(losing),
-        "win_rate": round(win_rate, 1),
-        "total_pnl": round(total_pnl, 2),
-        "average_win": round(avg_win, 2),
-        "average_loss": round(avg_loss, 2),
-        "best_trade": round(best_trade, 2),
-        "worst_trade": round(worst_trade, 2),
-        "profit_factor": round(profit_factor, 2),
-        "average_rr": round(avg_rr, 2),
-        "most_traded_symbol": most_traded,
-        "best_timeframe": best_tf,
-        "current_streak": current_streak,
-        "max_drawdown": round(max_dd, 2)
-    }
+    return stats
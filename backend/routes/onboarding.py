@@ -3,6 +3,7 @@ from datetime import datetime, timezone
 
 from ..core.config import db
 from ..core.auth import get_current_user
+from ..core.user_cache import user_cache
 from ..models.schemas import OnboardingData
 
 router = APIRouter(prefix="/onboarding", tags=["Onboarding"])
@@ -42,6 +43,7 @@ async def complete_onboarding(data: OnboardingData, current_user: dict = Depends
             }
         }
     )
+    user_cache.invalidate(current_user["id"])
     
     updated_user = await db.users.find_one({"id": current_user["id"]}, {"_id": 0, "password": 0})
     
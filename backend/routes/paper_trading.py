@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Response
 from datetime import datetime, timezone
 import uuid
 import logging
@@ -6,6 +6,8 @@ import httpx
 
 from ..core.config import db
 from ..core.auth import get_current_user
+from ..core.user_cache import user_cache
+from ..core.pagination import fetch_page, set_next_cursor
 from ..models.schemas import PaperTrade, PaperTradeCreate
 
 logger = logging.getLogger(__name__)
@@ -119,6 +121,7 @@ async def execute_paper_trade(trade: PaperTradeCreate, current_user: dict = Depe
         {"id": user_id},
         {"$set": {"paper_balance": new_balance, "portfolio": portfolio}}
     )
+    user_cache.invalidate(user_id)
     
     trade_id = str(uuid.uuid4())
     trade_doc = {
@@ -137,16 +140,22 @@ async def execute_paper_trade(trade: PaperTradeCreate, current_user: dict = Depe
     return PaperTrade(**trade_doc)
 
 @router.get("/trades")
-async def get_paper_trades(limit: int = 50, current_user: dict = Depends(get_current_user)):
-    """Get paper trading history"""
+async def get_paper_trades(
+    response: Response,
+    limit: int = 50,
+    after: str = None,
+    fields: str = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Get paper trading history (next page: ?after=<X-Next-Cursor>)"""
     try:
         user_id = current_user["id"]
         logger.info(f"Fetching trades for user: {user_id}")
         
-        trades = await db.paper_trades.find(
-            {"user_id": user_id},
-            {"_id": 0}
-        ).sort("timestamp", -1).limit(limit).to_list(limit)
+        trades, next_cursor = await fetch_page(
+            db.paper_trades, {"user_id": user_id}, limit, after, fields, sort_field="timestamp"
+        )
+        set_next_cursor(response, next_cursor)
         
         logger.info(f"Found {len(trades)} trades for user: {user_id}")
         
@@ -261,5 +270,6 @@ async def reset_paper_portfolio(current_user: dict = Depends(get_current_user)):
         {"id": current_user["id"]},
         {"$set": {"paper_balance": 10000.0, "portfolio": {}}}
     )
+    user_cache.invalidate(current_user["id"])
     await db.paper_trades.delete_many({"user_id": current_user["id"]})
     return {"message": "Portfolio reset successfully", "balance": 10000.0}
@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends
 
 from ..core.config import db
 from ..core.auth import get_current_user
+from ..core.user_cache import user_cache
 
 router = APIRouter(prefix="/settings", tags=["Settings"])
 
@@ -16,4 +17,5 @@ async def update_trading_level(level: str, current_user: dict = Depends(get_curr
         {"id": current_user["id"]},
         {"$set": {"trading_level": level}}
     )
+    user_cache.invalidate(current_user["id"])
     return {"trading_level": level}
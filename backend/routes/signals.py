@@ -1,10 +1,11 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Response
 from datetime import datetime, timezone
 import uuid
 import httpx
 
 from ..core.config import db, COINGECKO_API_URL, logger
 from ..core.auth import get_current_user
+from ..core.pagination import fetch_page, set_next_cursor
 from ..models.schemas import TradingSignal, SignalCreate
 
 router = APIRouter(prefix="/signals", tags=["Signals"])
@@ -35,13 +36,21 @@ async def create_signal(signal: SignalCreate, current_user: dict = Depends(get_c
     return TradingSignal(**signal_doc)
 
 @router.get("")
-async def get_signals(limit: int = 50, status: str = None, current_user: dict = Depends(get_current_user)):
-    """Get user's trading signals"""
+async def get_signals(
+    response: Response,
+    limit: int = 50,
+    status: str = None,
+    after: str = None,
+    fields: str = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Get user's trading signals (next page: ?after=<X-Next-Cursor>)"""
     query = {"user_id": current_user["id"]}
     if status:
         query["status"] = status
     
-    signals = await db.signals.find(query, {"_id": 0}).sort("created_at", -1).limit(limit).to_list(limit)
+    signals, next_cursor = await fetch_page(db.signals, query, limit, after, fields)
+    set_next_cursor(response, next_cursor)
     return signals
 
 @router.get("/stats")
@@ -9,6 +9,7 @@ import httpx
 
 from core.config import db, logger, EMERGENT_LLM_KEY, CRYPTOCOMPARE_API_URL, ALPHA_VANTAGE_API_KEY
 from core.auth import get_current_user
+from core.user_cache import user_cache
 from services.market_data import market_data_service, CRYPTO_MAPPING, SMART_INVEST_STOCKS
 from services.technical_analysis import technical_analysis_service
 
@@ -296,6 +297,7 @@ async def smart_invest_execute(request: SmartInvestExecute, current_user: dict =
         {"id": user_id},
         {"$set": {"paper_balance": new_balance, "portfolio": portfolio}}
     )
+    user_cache.invalidate(user_id)
     
     return {
         "success": True,
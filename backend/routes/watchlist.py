@@ -3,6 +3,7 @@ from datetime import datetime, timezone
 
 from ..core.config import db
 from ..core.auth import get_current_user
+from ..core.user_cache import user_cache
 from ..models.schemas import WatchlistUpdate
 
 router = APIRouter(tags=["Watchlist"])
@@ -14,6 +15,7 @@ async def update_watchlist(update: WatchlistUpdate, current_user: dict = Depends
         {"id": current_user["id"]},
         {"$set": {"watchlist": update.symbols}}
     )
+    user_cache.invalidate(current_user["id"])
     return {"watchlist": update.symbols}
 
 @router.post("/watchlist/{symbol}")
@@ -23,6 +25,7 @@ async def add_to_watchlist(symbol: str, current_user: dict = Depends(get_current
         {"id": current_user["id"]},
         {"$addToSet": {"watchlist": symbol}}
     )
+    user_cache.invalidate(current_user["id"])
     return {"message": f"{symbol} added to watchlist"}
 
 @router.delete("/watchlist/{symbol}")
@@ -32,4 +35,5 @@ async def remove_from_watchlist(symbol: str, current_user: dict = Depends(get_cu
         {"id": current_user["id"]},
         {"$pull": {"watchlist": symbol}}
     )
+    user_cache.invalidate(current_user["id"])
     return {"message": f"{symbol} removed from watchlist"}
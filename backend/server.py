@@ -1,6 +1,7 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File, Request, Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
@@ -14,12 +15,36 @@ from typing import List, Optional, Dict, Any
 import uuid
 from datetime import datetime, timezone, timedelta
 import jwt
-import bcrypt
 import httpx
+import json
 import numpy as np
+from pymongo import ReturnDocument
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from services.llm_service import LlmChat, UserMessage, translate_to_french
+from services.llm_gateway import llm_gateway, PRIORITY_STANDARD
+from services.alert_engine import (
+    alert_engine, ALERT_ENGINE_INTERVAL_SECONDS, INDICATOR_ALERT_CONDITIONS, DEFAULT_INDICATOR_INTERVAL
+)
+from services.candle_store import INTERVALS as CANDLE_INTERVALS
+from services.signal_evaluator import evaluate_active_signals, SIGNAL_EVALUATION_INTERVAL_MINUTES
+from services.signal_stats import apply_signal_change, get_signal_stats as load_signal_stats
+from services.journal_stats import record_closed_trade, get_journal_stats, rebuild_all_journal_stats
+from services.paper_ledger import record_trade as record_paper_trade, get_ledger as get_paper_ledger, reset_ledger as reset_paper_ledger, exit_trade, rebuild_all_ledgers
+from services.academy_leaderboard import leaderboard_snapshot, LEADERBOARD_TTL_SECONDS
+from services.history_export import EXPORT_DATASETS, EXPORT_FORMATS, parse_date_range, stream_export
+from services.market_context import market_context as market_context_service, MARKET_CONTEXT_REFRESH_SECONDS
+from services.translation_cache import translation_cache
+from services.llm_cache import llm_response_cache
+from services.chat_memory import conversation_memory
+from services.auto_trader import auto_trader, AUTO_TRADER_MONITOR_SECONDS
+from services.newsletter_jobs import NEWSLETTER_JOB_LEASE_SECONDS
+from core.indexes import ensure_indexes, explain_hot_queries, log_expiry, ERROR_LOG_RETENTION_DAYS
+from core.user_cache import user_cache
+from core.admin_stats import admin_stats
+from core.pagination import fetch_page, set_next_cursor
+from core.passwords import hash_password, verify_password, needs_rehash, login_throttle, client_ip
 
 # Import des routes avancées (avec gestion d'erreur)
 try:
@@ -283,9 +308,10 @@ class TradeJournalClose(BaseModel):
 class SmartAlertCreate(BaseModel):
     symbol: str
     symbol_name: str
-    alert_type: str  # price, rsi, macd, support, resistance, custom
+    alert_type: str  # price, rsi, macd, bollinger, volume, support, resistance, custom
     condition: str  # above, below, crosses_up, crosses_down
-    value: float
+    value: float  # price / RSI level / volume multiple of the average (ignored for macd, bollinger)
+    interval: Optional[str] = None  # candle interval for indicator alerts (1m, 5m, 15m, 1h, 4h, 1d)
     message: Optional[str] = None
     sound_enabled: bool = True
     repeat: bool = False
@@ -298,6 +324,7 @@ class SmartAlertResponse(BaseModel):
     alert_type: str
     condition: str
     value: float
+    interval: Optional[str] = None
     message: str
     sound_enabled: bool
     repeat: bool
@@ -372,12 +399,6 @@ class LessonComplete(BaseModel):
 
 # ============== AUTH HELPERS ==============
 
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-
-def verify_password(password: str, hashed: str) -> bool:
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
-
 def create_token(user_id: str, email: str) -> str:
     payload = {
         "user_id": user_id,
@@ -413,7 +434,7 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid token")
         
-        user = await db.users.find_one({"id": user_id}, {"_id": 0, "password": 0})
+        user = await user_cache.load(db, user_id)
         if user is None:
             raise HTTPException(status_code=401, detail="User not found")
         return user
@@ -434,7 +455,7 @@ async def register(user_data: UserCreate):
     user_doc = {
         "id": user_id,
         "email": user_data.email,
-        "password": hash_password(user_data.password),
+        "password": await hash_password(user_data.password),
         "name": user_data.name,
         "trading_level": user_data.trading_level,
         "created_at": datetime.now(timezone.utc).isoformat(),
@@ -460,10 +481,29 @@ async def register(user_data: UserCreate):
     return TokenResponse(access_token=token, user=user_response)
 
 @api_router.post("/auth/login", response_model=TokenResponse)
-async def login(credentials: UserLogin):
+async def login(credentials: UserLogin, request: Request):
+    ip = client_ip(request)
+    retry_after = login_throttle.check(credentials.email, ip)
+    if retry_after:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many login attempts, please try again later",
+            headers={"Retry-After": str(retry_after)}
+        )
+    login_throttle.record_attempt(ip)
+    
     user = await db.users.find_one({"email": credentials.email})
-    if not user or not verify_password(credentials.password, user["password"]):
+    if not user or not await verify_password(credentials.password, user["password"]):
+        login_throttle.record_failure(credentials.email)
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    login_throttle.record_success(credentials.email)
+    
+    # Transparently upgrade hashes produced with a different cost factor
+    if needs_rehash(user["password"]):
+        await db.users.update_one(
+            {"id": user["id"]},
+            {"$set": {"password": await hash_password(credentials.password)}}
+        )
     
     token = create_token(user["id"], user["email"])
     
@@ -972,6 +1012,8 @@ async def get_news_impact_summary(current_user: dict = Depends(get_current_user)
         chat = LlmChat(
             api_key=EMERGENT_LLM_KEY,
             session_id=f"news_summary_{datetime.now().strftime('%Y%m%d%H')}",
+            priority=PRIORITY_STANDARD,
+            cache_ttl=1800,  # Même sélection de news = même résumé pour tous
             system_message="""Tu es un analyste financier expert. Ta tâche est de résumer les actualités crypto importantes en français.
 
 Pour chaque news importante, donne:
@@ -1304,199 +1346,36 @@ async def create_signal(signal: SignalCreate, current_user: dict = Depends(get_c
         "result_pnl": None
     }
     await db.signals.insert_one(signal_doc)
+    signal_doc.pop("_id", None)
+    await apply_signal_change(db, None, signal_doc)
     return TradingSignal(**signal_doc)
 
 @api_router.get("/signals")
-async def get_signals(limit: int = 50, status: str = None, current_user: dict = Depends(get_current_user)):
-    """Get user's trading signals"""
+async def get_signals(
+    response: Response,
+    limit: int = 50,
+    status: str = None,
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Get user's trading signals (next page: ?after=<X-Next-Cursor>)"""
     query = {"user_id": current_user["id"]}
     if status:
         query["status"] = status
     
-    signals = await db.signals.find(query, {"_id": 0}).sort("created_at", -1).limit(limit).to_list(limit)
+    signals, next_cursor = await fetch_page(db.signals, query, limit, after, fields)
+    set_next_cursor(response, next_cursor)
     return signals
 
 @api_router.get("/signals/stats")
-async def get_signal_stats(current_user: dict = Depends(get_current_user)):
-    """Get comprehensive trading signal statistics with professional metrics"""
-    signals = await db.signals.find({"user_id": current_user["id"]}, {"_id": 0}).to_list(1000)
-    
-    total = len(signals)
-    if total == 0:
-        return {
-            "total_signals": 0,
-            "active": 0,
-            "hit_tp1": 0,
-            "hit_tp2": 0,
-            "hit_sl": 0,
-            "expired": 0,
-            "win_rate": 0,
-            "total_pnl": 0,
-            "avg_win": 0,
-            "avg_loss": 0,
-            "profit_factor": 0,
-            "best_signal": None,
-            "worst_signal": None,
-            "current_streak": 0,
-            "max_streak": 0,
-            "by_symbol": {},
-            "by_timeframe": {},
-            "monthly_performance": [],
-            "recent_signals": []
-        }
-    
-    active = len([s for s in signals if s["status"] == "active"])
-    hit_tp1 = len([s for s in signals if s["status"] == "hit_tp1"])
-    hit_tp2 = len([s for s in signals if s["status"] == "hit_tp2"])
-    hit_sl = len([s for s in signals if s["status"] == "hit_sl"])
-    expired = len([s for s in signals if s["status"] == "expired"])
-    
-    completed = hit_tp1 + hit_tp2 + hit_sl
-    wins = hit_tp1 + hit_tp2
-    win_rate = (wins / completed * 100) if completed > 0 else 0
-    
-    # P&L Analysis
-    closed_signals = [s for s in signals if s.get("result_pnl") is not None]
-    pnl_values = [s.get("result_pnl", 0) for s in closed_signals]
-    
-    total_pnl = sum(pnl_values) if pnl_values else 0
-    win_pnls = [p for p in pnl_values if p > 0]
-    loss_pnls = [p for p in pnl_values if p < 0]
-    
-    avg_win = sum(win_pnls) / len(win_pnls) if win_pnls else 0
-    avg_loss = abs(sum(loss_pnls) / len(loss_pnls)) if loss_pnls else 0
-    
-    gross_profit = sum(win_pnls) if win_pnls else 0
-    gross_loss = abs(sum(loss_pnls)) if loss_pnls else 0
-    profit_factor = gross_profit / gross_loss if gross_loss > 0 else gross_profit
-    
-    # Best and worst signals
-    best_signal = None
-    worst_signal = None
-    if closed_signals:
-        sorted_by_pnl = sorted(closed_signals, key=lambda x: x.get("result_pnl", 0), reverse=True)
-        if sorted_by_pnl:
-            best = sorted_by_pnl[0]
-            best_signal = {"symbol": best.get("symbol_name"), "pnl": best.get("result_pnl", 0), "type": best.get("signal_type")}
-            worst = sorted_by_pnl[-1]
-            worst_signal = {"symbol": worst.get("symbol_name"), "pnl": worst.get("result_pnl", 0), "type": worst.get("signal_type")}
-    
-    # Streak calculation
-    sorted_signals = sorted([s for s in signals if s["status"] != "active"], key=lambda x: x.get("created_at", ""), reverse=True)
-    current_streak = 0
-    max_streak = 0
-    temp_streak = 0
-    last_result = None
-    
-    for s in sorted_signals:
-        is_win = s["status"] in ["hit_tp1", "hit_tp2"]
-        if last_result is None:
-            last_result = is_win
-            current_streak = 1 if is_win else -1
-            temp_streak = 1
-        elif is_win == last_result:
-            temp_streak += 1
-            if current_streak > 0:
-                current_streak = temp_streak
-            else:
-                current_streak = -temp_streak
-        else:
-            max_streak = max(max_streak, abs(temp_streak))
-            temp_streak = 1
-            last_result = is_win
-            current_streak = 1 if is_win else -1
-    max_streak = max(max_streak, abs(temp_streak))
-    
-    # Stats by symbol with P&L
-    by_symbol = {}
-    for s in signals:
-        sym = s["symbol"]
-        if sym not in by_symbol:
-            by_symbol[sym] = {"total": 0, "wins": 0, "pnl": 0, "name": s.get("symbol_name", sym)}
-        by_symbol[sym]["total"] += 1
-        if s["status"] in ["hit_tp1", "hit_tp2"]:
-            by_symbol[sym]["wins"] += 1
-        if s.get("result_pnl"):
-            by_symbol[sym]["pnl"] += s["result_pnl"]
-    
-    # Calculate win rate for each symbol
-    for sym in by_symbol:
-        if by_symbol[sym]["total"] > 0:
-            by_symbol[sym]["win_rate"] = round(by_symbol[sym]["wins"] / by_symbol[sym]["total"] * 100, 1)
-        else:
-            by_symbol[sym]["win_rate"] = 0
-        by_symbol[sym]["pnl"] = round(by_symbol[sym]["pnl"], 2)
-    
-    # Stats by timeframe
-    by_timeframe = {}
-    for s in signals:
-        tf = s["timeframe"]
-        if tf not in by_timeframe:
-            by_timeframe[tf] = {"total": 0, "wins": 0, "pnl": 0}
-        by_timeframe[tf]["total"] += 1
-        if s["status"] in ["hit_tp1", "hit_tp2"]:
-            by_timeframe[tf]["wins"] += 1
-        if s.get("result_pnl"):
-            by_timeframe[tf]["pnl"] += s["result_pnl"]
-    
-    for tf in by_timeframe:
-        if by_timeframe[tf]["total"] > 0:
-            by_timeframe[tf]["win_rate"] = round(by_timeframe[tf]["wins"] / by_timeframe[tf]["total"] * 100, 1)
-        by_timeframe[tf]["pnl"] = round(by_timeframe[tf]["pnl"], 2)
-    
-    # Monthly performance (last 6 months)
-    from collections import defaultdict
-    monthly_perf = defaultdict(lambda: {"signals": 0, "wins": 0, "pnl": 0})
-    for s in closed_signals:
-        if s.get("created_at"):
-            month = s["created_at"][:7]  # YYYY-MM
-            monthly_perf[month]["signals"] += 1
-            if s["status"] in ["hit_tp1", "hit_tp2"]:
-                monthly_perf[month]["wins"] += 1
-            monthly_perf[month]["pnl"] += s.get("result_pnl", 0)
-    
-    monthly_performance = []
-    for month, data in sorted(monthly_perf.items(), reverse=True)[:6]:
-        monthly_performance.append({
-            "month": month,
-            "signals": data["signals"],
-            "wins": data["wins"],
-            "win_rate": round(data["wins"] / data["signals"] * 100, 1) if data["signals"] > 0 else 0,
-            "pnl": round(data["pnl"], 2)
-        })
-    
-    # Recent 5 closed signals
-    recent_signals = []
-    for s in sorted_signals[:5]:
-        recent_signals.append({
-            "symbol": s.get("symbol_name"),
-            "type": s.get("signal_type"),
-            "status": s.get("status"),
-            "pnl": s.get("result_pnl", 0),
-            "date": s.get("created_at", "")[:10]
-        })
-    
-    return {
-        "total_signals": total,
-        "active": active,
-        "hit_tp1": hit_tp1,
-        "hit_tp2": hit_tp2,
-        "hit_sl": hit_sl,
-        "expired": expired,
-        "win_rate": round(win_rate, 1),
-        "total_pnl": round(total_pnl, 2),
-        "avg_win": round(avg_win, 2),
-        "avg_loss": round(avg_loss, 2),
-        "profit_factor": round(profit_factor, 2),
-        "best_signal": best_signal,
-        "worst_signal": worst_signal,
-        "current_streak": current_streak,
-        "max_streak": max_streak,
-        "by_symbol": by_symbol,
-        "by_timeframe": by_timeframe,
-        "monthly_performance": monthly_performance,
-        "recent_signals": recent_signals
-    }
+async def get_signal_stats(refresh: bool = False, current_user: dict = Depends(get_current_user)):
+    """
+    Get comprehensive trading signal statistics with professional metrics.
+    Served from the per-user rollup kept up to date on every status change;
+    refresh=true rebuilds it from a $facet aggregation.
+    """
+    return await load_signal_stats(db, current_user["id"], rebuild=refresh)
 
 @api_router.put("/signals/{signal_id}/status")
 async def update_signal_status(signal_id: str, status: str, result_pnl: float = None, current_user: dict = Depends(get_current_user)):
@@ -1508,167 +1387,59 @@ async def update_signal_status(signal_id: str, status: str, result_pnl: float =
     update_data = {"status": status}
     if result_pnl is not None:
         update_data["result_pnl"] = result_pnl
+    if status != "active":
+        # Close time, orders the signal_stats streaks
+        update_data["evaluated_at"] = datetime.now(timezone.utc).isoformat()
     
-    result = await db.signals.update_one(
+    before = await db.signals.find_one_and_update(
         {"id": signal_id, "user_id": current_user["id"]},
-        {"$set": update_data}
+        {"$set": update_data},
+        projection={"_id": 0},
+        return_document=ReturnDocument.BEFORE
     )
-    if result.matched_count == 0:
+    if before is None:
         raise HTTPException(status_code=404, detail="Signal not found")
+    await apply_signal_change(db, before, {**before, **update_data})
     
     return {"message": "Signal updated", "status": status}
 
 @api_router.delete("/signals/{signal_id}")
 async def delete_signal(signal_id: str, current_user: dict = Depends(get_current_user)):
     """Delete a signal"""
-    result = await db.signals.delete_one({"id": signal_id, "user_id": current_user["id"]})
-    if result.deleted_count == 0:
+    deleted = await db.signals.find_one_and_delete(
+        {"id": signal_id, "user_id": current_user["id"]},
+        projection={"_id": 0}
+    )
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Signal not found")
+    await apply_signal_change(db, deleted, None)
     return {"message": "Signal deleted"}
 
 @api_router.post("/signals/evaluate")
 async def evaluate_signals(current_user: dict = Depends(get_current_user)):
     """
-    Automatically evaluate active signals against current market prices.
-    Checks if TP1, TP2, or SL have been hit and updates status/PnL accordingly.
+    Evaluate the caller's active signals along the price path since creation.
+    Uses candle highs/lows to find the first TP1, TP2 or SL touch and updates status/PnL accordingly.
     """
-    # Get all active signals for this user
-    active_signals = await db.signals.find(
-        {"user_id": current_user["id"], "status": "active"},
-        {"_id": 0}
-    ).to_list(100)
+    evaluation = await evaluate_active_signals(db, alert_engine.symbol_resolver, user_id=current_user["id"])
     
-    if not active_signals:
+    if not evaluation["total_evaluated"]:
         return {"message": "No active signals to evaluate", "updated": 0, "results": []}
     
-    # Get unique symbols
-    symbols = list(set([s["symbol"] for s in active_signals]))
-    symbols_str = ",".join(symbols)
-    
-    # Fetch current prices from CoinGecko
-    current_prices = {}
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                f"{COINGECKO_API_URL}/simple/price",
-                params={"ids": symbols_str, "vs_currencies": "usd"},
-                timeout=15.0
-            )
-            if response.status_code == 200:
-                price_data = response.json()
-                for symbol, data in price_data.items():
-                    current_prices[symbol] = data.get("usd", 0)
-        except Exception as e:
-            logger.error(f"Error fetching prices for evaluation: {e}")
-            raise HTTPException(status_code=500, detail="Could not fetch current prices")
-    
-    results = []
-    updated_count = 0
-    
-    for signal in active_signals:
-        symbol = signal["symbol"]
-        current_price = current_prices.get(symbol)
-        
-        if not current_price:
-            results.append({
-                "signal_id": signal["id"],
-                "symbol": symbol,
-                "status": "error",
-                "message": "Could not fetch current price"
-            })
-            continue
-        
-        entry_price = signal["entry_price"]
-        stop_loss = signal["stop_loss"]
-        tp1 = signal["take_profit_1"]
-        tp2 = signal.get("take_profit_2")
-        signal_type = signal["signal_type"]
-        
-        new_status = None
-        pnl_percent = 0
-        
-        # Calculate based on signal type (BUY or SELL)
-        if signal_type == "BUY":
-            # For BUY signals: price going up is good
-            if current_price <= stop_loss:
-                new_status = "hit_sl"
-                pnl_percent = ((stop_loss - entry_price) / entry_price) * 100
-            elif tp2 and current_price >= tp2:
-                new_status = "hit_tp2"
-                pnl_percent = ((tp2 - entry_price) / entry_price) * 100
-            elif current_price >= tp1:
-                new_status = "hit_tp1"
-                pnl_percent = ((tp1 - entry_price) / entry_price) * 100
-        elif signal_type == "SELL":
-            # For SELL signals: price going down is good
-            if current_price >= stop_loss:
-                new_status = "hit_sl"
-                pnl_percent = ((entry_price - stop_loss) / entry_price) * 100
-            elif tp2 and current_price <= tp2:
-                new_status = "hit_tp2"
-                pnl_percent = ((entry_price - tp2) / entry_price) * 100
-            elif current_price <= tp1:
-                new_status = "hit_tp1"
-                pnl_percent = ((entry_price - tp1) / entry_price) * 100
-        
-        # Check for expiration (signals older than 7 days for daily, 1 day for 1h/4h)
-        created_at = datetime.fromisoformat(signal["created_at"].replace("Z", "+00:00"))
-        now = datetime.now(timezone.utc)
-        age_hours = (now - created_at).total_seconds() / 3600
-        
-        if signal["timeframe"] == "daily" and age_hours > 168:  # 7 days
-            if not new_status:
-                new_status = "expired"
-                pnl_percent = ((current_price - entry_price) / entry_price) * 100 if signal_type == "BUY" else ((entry_price - current_price) / entry_price) * 100
-        elif signal["timeframe"] in ["1h", "4h"] and age_hours > 24:  # 1 day
-            if not new_status:
-                new_status = "expired"
-                pnl_percent = ((current_price - entry_price) / entry_price) * 100 if signal_type == "BUY" else ((entry_price - current_price) / entry_price) * 100
-        
-        if new_status:
-            # Update the signal in database
-            await db.signals.update_one(
-                {"id": signal["id"]},
-                {"$set": {
-                    "status": new_status,
-                    "result_pnl": round(pnl_percent, 2),
-                    "evaluated_at": datetime.now(timezone.utc).isoformat(),
-                    "price_at_evaluation": current_price
-                }}
-            )
-            updated_count += 1
-            results.append({
-                "signal_id": signal["id"],
-                "symbol": signal["symbol_name"],
-                "signal_type": signal_type,
-                "old_status": "active",
-                "new_status": new_status,
-                "entry_price": entry_price,
-                "current_price": current_price,
-                "pnl_percent": round(pnl_percent, 2)
-            })
-        else:
-            # Signal still active
-            unrealized_pnl = ((current_price - entry_price) / entry_price) * 100 if signal_type == "BUY" else ((entry_price - current_price) / entry_price) * 100
-            results.append({
-                "signal_id": signal["id"],
-                "symbol": signal["symbol_name"],
-                "signal_type": signal_type,
-                "status": "active",
-                "entry_price": entry_price,
-                "current_price": current_price,
-                "unrealized_pnl": round(unrealized_pnl, 2),
-                "tp1_distance": round(((tp1 - current_price) / current_price) * 100, 2) if signal_type == "BUY" else round(((current_price - tp1) / current_price) * 100, 2),
-                "sl_distance": round(((current_price - stop_loss) / current_price) * 100, 2) if signal_type == "BUY" else round(((stop_loss - current_price) / current_price) * 100, 2)
-            })
-    
     return {
-        "message": f"Evaluated {len(active_signals)} signals, updated {updated_count}",
-        "total_evaluated": len(active_signals),
-        "updated": updated_count,
-        "results": results
+        "message": f"Evaluated {evaluation['total_evaluated']} signals, updated {evaluation['updated']}",
+        **evaluation
     }
 
+async def run_signal_evaluation_cycle():
+    """Scheduled job: evaluate active signals of all users in one batch"""
+    try:
+        evaluation = await evaluate_active_signals(db, alert_engine.symbol_resolver)
+        if evaluation["updated"]:
+            logger.info(f"Signal evaluation: {evaluation['updated']}/{evaluation['total_evaluated']} signals closed")
+    except Exception as e:
+        logger.error(f"Signal evaluation cycle error: {e}")
+
 # ============== TRADING JOURNAL ROUTES ==============
 
 @api_router.post("/journal/trades")
@@ -1718,16 +1489,20 @@ async def create_journal_entry(entry: TradeJournalCreate, current_user: dict = D
 
 @api_router.get("/journal/trades")
 async def get_journal_entries(
+    response: Response,
     status: Optional[str] = None,
     limit: int = 50,
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
     current_user: dict = Depends(get_current_user)
 ):
-    """Get trade journal entries"""
+    """Get trade journal entries (next page: ?after=<X-Next-Cursor>)"""
     query = {"user_id": current_user["id"]}
     if status:
         query["status"] = status
     
-    entries = await db.journal.find(query, {"_id": 0}).sort("created_at", -1).to_list(limit)
+    entries, next_cursor = await fetch_page(db.journal, query, limit, after, fields)
+    set_next_cursor(response, next_cursor)
     return entries
 
 @api_router.put("/journal/trades/{trade_id}/close")
@@ -1768,18 +1543,20 @@ async def close_journal_trade(trade_id: str, close_data: TradeJournalClose, curr
         "updated_at": datetime.now(timezone.utc).isoformat()
     }
     
-    await db.journal.update_one({"id": trade_id}, {"$set": update_data})
+    result = await db.journal.update_one({"id": trade_id, "status": "open"}, {"$set": update_data})
+    if result.modified_count == 0:
+        raise HTTPException(status_code=400, detail="Trade already closed")
+    
+    # Fold the close into the materialized journal stats (O(1))
+    await record_closed_trade(db, {**trade, **update_data})
     return {"message": "Trade closed", "pnl_percent": round(pnl_percent, 2), "status": status}
 
 @api_router.get("/journal/stats")
 async def get_trading_stats(current_user: dict = Depends(get_current_user)):
-    """Get comprehensive trading statistics"""
-    trades = await db.journal.find(
-        {"user_id": current_user["id"], "status": {"$ne": "open"}},
-        {"_id": 0}
-    ).to_list(1000)
+    """Get comprehensive trading statistics (materialized, updated on each close)"""
+    stats = await get_journal_stats(db, current_user["id"])
     
-    if not trades:
+    if not stats:
         return {
             "total_trades": 0,
             "winning_trades": 0,
@@ -1799,103 +1576,24 @@ async def get_trading_stats(current_user: dict = Depends(get_current_user)):
             "max_drawdown": 0
         }
     
-    # Basic stats
-    total = len(trades)
-    winning = [t for t in trades if t["status"] == "closed_profit"]
-    losing = [t for t in trades if t["status"] == "closed_loss"]
-    
-    win_rate = (len(winning) / total * 100) if total > 0 else 0
-    
-    # P&L stats
-    pnls = [t.get("pnl_percent", 0) for t in trades]
-    total_pnl = sum(pnls)
-    
-    win_pnls = [t.get("pnl_percent", 0) for t in winning]
-    loss_pnls = [t.get("pnl_percent", 0) for t in losing]
-    
-    avg_win = sum(win_pnls) / len(win_pnls) if win_pnls else 0
-    avg_loss = sum(loss_pnls) / len(loss_pnls) if loss_pnls else 0
-    
-    best_trade = max(pnls) if pnls else 0
-    worst_trade = min(pnls) if pnls else 0
-    
-    # Profit factor
-    gross_profit = sum([p for p in pnls if p > 0])
-    gross_loss = abs(sum([p for p in pnls if p < 0]))
-    profit_factor = gross_profit / gross_loss if gross_loss > 0 else gross_profit
-    
-    # Average R:R
-    rrs = [t.get("risk_reward_ratio", 0) for t in trades]
-    avg_rr = sum(rrs) / len(rrs) if rrs else 0
-    
-    # Most traded symbol
-    from collections import Counter
-    symbols = [t["symbol"] for t in trades]
-    most_traded = Counter(symbols).most_common(1)[0][0] if symbols else "N/A"
-    
-    # Best timeframe (by win rate)
-    timeframes = {}
-    for t in trades:
-        tf = t.get("timeframe", "unknown")
-        if tf not in timeframes:
-            timeframes[tf] = {"wins": 0, "total": 0}
-        timeframes[tf]["total"] += 1
-        if t["status"] == "closed_profit":
-            timeframes[tf]["wins"] += 1
-    
-    best_tf = max(timeframes.items(), key=lambda x: x[1]["wins"]/x[1]["total"] if x[1]["total"] > 0 else 0)[0] if timeframes else "N/A"
-    
-    # Current streak
-    sorted_trades = sorted(trades, key=lambda x: x.get("exit_date", ""), reverse=True)
-    streak = 0
-    streak_type = None
-    for t in sorted_trades:
-        if streak_type is None:
-            streak_type = t["status"]
-            streak = 1
-        elif t["status"] == streak_type:
-            streak += 1
-        else:
-            break
-    
-    current_streak = streak if streak_type == "closed_profit" else -streak
-    
-    # Max drawdown (simplified)
-    cumulative = 0
-    peak = 0
-    max_dd = 0
-    for pnl in pnls:
-        cumulative += pnl
-        if cumulative > peak:
-            peak = cumulative
-        dd = peak - cumulative
-        if dd > max_dd:
-            max_dd = dd
-    
-    return {
-        "total_trades": total,
-        "winning_trades": len(winning),
-        "losing_trades": len(losing),
-        "win_rate": round(win_rate, 1),
-        "total_pnl": round(total_pnl, 2),
-        "average_win": round(avg_win, 2),
-        "average_loss": round(avg_loss, 2),
-        "best_trade": round(best_trade, 2),
-        "worst_trade": round(worst_trade, 2),
-        "profit_factor": round(profit_factor, 2),
-        "average_rr": round(avg_rr, 2),
-        "most_traded_symbol": most_traded,
-        "best_timeframe": best_tf,
-        "best_day_of_week": "N/A",  # Would need more data
-        "current_streak": current_streak,
-        "max_drawdown": round(max_dd, 2)
-    }
+    return stats
 
 # ============== SMART ALERTS ROUTES ==============
 
 @api_router.post("/alerts/smart")
 async def create_smart_alert(alert: SmartAlertCreate, current_user: dict = Depends(get_current_user)):
     """Create a smart alert (price, RSI, MACD, etc.)"""
+    interval = None
+    if alert.alert_type in INDICATOR_ALERT_CONDITIONS:
+        if alert.condition not in INDICATOR_ALERT_CONDITIONS[alert.alert_type]:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid condition for {alert.alert_type}. Must be one of: {list(INDICATOR_ALERT_CONDITIONS[alert.alert_type])}"
+            )
+        interval = alert.interval or DEFAULT_INDICATOR_INTERVAL
+        if interval not in CANDLE_INTERVALS:
+            raise HTTPException(status_code=400, detail=f"Invalid interval. Must be one of: {list(CANDLE_INTERVALS)}")
+    
     alert_doc = {
         "id": str(uuid.uuid4()),
         "user_id": current_user["id"],
@@ -1904,7 +1602,8 @@ async def create_smart_alert(alert: SmartAlertCreate, current_user: dict = Depen
         "alert_type": alert.alert_type,
         "condition": alert.condition,
         "value": alert.value,
-        "message": alert.message or f"{alert.symbol_name} {alert.condition} {alert.value}",
+        "interval": interval,
+        "message": alert.message or f"{alert.symbol_name} {alert.alert_type} {alert.condition} {alert.value}",
         "sound_enabled": alert.sound_enabled,
         "repeat": alert.repeat,
         "triggered": False,
@@ -1914,6 +1613,7 @@ async def create_smart_alert(alert: SmartAlertCreate, current_user: dict = Depen
     
     await db.smart_alerts.insert_one(alert_doc)
     alert_doc.pop("_id", None)
+    alert_engine.add_alert(alert_doc)
     return alert_doc
 
 @api_router.get("/alerts/smart")
@@ -1931,70 +1631,77 @@ async def delete_smart_alert(alert_id: str, current_user: dict = Depends(get_cur
     result = await db.smart_alerts.delete_one({"id": alert_id, "user_id": current_user["id"]})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Alert not found")
+    alert_engine.remove_alert(alert_id)
     return {"message": "Alert deleted"}
 
 @api_router.get("/alerts/check")
 async def check_alerts(current_user: dict = Depends(get_current_user)):
-    """Check all alerts against current prices and return triggered ones"""
-    alerts = await db.smart_alerts.find(
-        {"user_id": current_user["id"], "triggered": False},
-        {"_id": 0}
-    ).to_list(100)
-    
-    if not alerts:
-        return {"triggered": [], "checked": 0}
-    
-    # Get unique symbols
-    symbols = list(set([a["symbol"] for a in alerts]))
+    """
+    Return alerts triggered by the background alert engine since the last check.
+    Evaluation runs server-side on a shared price feed; this call does no upstream fetch.
+    """
+    triggered = alert_engine.drain_pending(current_user["id"])
+    return {
+        "triggered": triggered,
+        "checked": alert_engine.count_for_user(current_user["id"]),
+        "last_tick": alert_engine.last_tick
+    }
+
+@api_router.get("/alerts/stream")
+async def stream_alerts(current_user: dict = Depends(get_current_user)):
+    """Server-Sent Events stream of the user's triggered alerts"""
+    user_id = current_user["id"]
+    queue = alert_engine.subscribe(user_id)
     
-    # Fetch current prices
-    current_prices = {}
-    async with httpx.AsyncClient() as client:
+    async def event_generator():
         try:
-            response = await client.get(
-                f"{COINGECKO_API_URL}/simple/price",
-                params={"ids": ",".join(symbols), "vs_currencies": "usd"},
-                timeout=15.0
-            )
-            if response.status_code == 200:
-                price_data = response.json()
-                for symbol, data in price_data.items():
-                    current_prices[symbol] = data.get("usd", 0)
-        except Exception as e:
-            logger.error(f"Error checking alerts: {e}")
-            return {"triggered": [], "checked": 0, "error": str(e)}
-    
-    triggered = []
-    for alert in alerts:
-        symbol = alert["symbol"]
-        current_price = current_prices.get(symbol, 0)
-        
-        if not current_price:
-            continue
-        
-        is_triggered = False
-        
-        if alert["alert_type"] == "price":
-            if alert["condition"] == "above" and current_price >= alert["value"]:
-                is_triggered = True
-            elif alert["condition"] == "below" and current_price <= alert["value"]:
-                is_triggered = True
-        
-        if is_triggered:
-            # Update alert as triggered
-            if not alert["repeat"]:
-                await db.smart_alerts.update_one(
-                    {"id": alert["id"]},
-                    {"$set": {"triggered": True, "triggered_at": datetime.now(timezone.utc).isoformat()}}
-                )
-            
-            triggered.append({
-                **alert,
-                "current_price": current_price,
-                "triggered_at": datetime.now(timezone.utc).isoformat()
-            })
-    
-    return {"triggered": triggered, "checked": len(alerts)}
+            # Deliver what fired while the user was away
+            for event in alert_engine.drain_pending(user_id):
+                yield f"event: alert\ndata: {json.dumps(event, default=str)}\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=25)
+                    yield f"event: alert\ndata: {json.dumps(event, default=str)}\n\n"
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+        finally:
+            alert_engine.unsubscribe(user_id, queue)
+    
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# ============== DATA EXPORT ==============
+
+@api_router.get("/export/{dataset}")
+async def export_history(
+    dataset: str,
+    format: str = "ndjson",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Stream the user's full journal, paper_trades, auto_trades or signals history
+    as NDJSON or CSV. start/end are ISO dates (end day included).
+    """
+    if dataset not in EXPORT_DATASETS:
+        raise HTTPException(status_code=404, detail=f"Unknown dataset. Must be one of: {list(EXPORT_DATASETS)}")
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid format. Must be one of: {list(EXPORT_FORMATS)}")
+    try:
+        start_at, end_at = parse_date_range(start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid date range: {e}")
+    
+    filename = f"bullsage_{dataset}_{datetime.now(timezone.utc).strftime('%Y%m%d')}.{format}"
+    return StreamingResponse(
+        stream_export(db, dataset, current_user["id"], format, start_at, end_at),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 # ============== DAILY BRIEFING ROUTE ==============
 
@@ -2002,29 +1709,18 @@ async def check_alerts(current_user: dict = Depends(get_current_user)):
 async def get_daily_briefing(current_user: dict = Depends(get_current_user)):
     """Get AI-generated daily trading briefing"""
     
-    # Gather market data
-    market_data = {}
-    
-    async with httpx.AsyncClient() as client:
-        # Fear & Greed
-        try:
-            fg_response = await client.get("https://api.alternative.me/fng/?limit=1", timeout=10.0)
-            if fg_response.status_code == 200:
-                market_data["fear_greed"] = fg_response.json().get("data", [{}])[0]
-        except Exception:
-            market_data["fear_greed"] = {"value": "50", "value_classification": "Neutral"}
-        
-        # BTC price and change
-        try:
-            btc_response = await client.get(
-                f"{COINGECKO_API_URL}/simple/price",
-                params={"ids": "bitcoin,ethereum,solana", "vs_currencies": "usd", "include_24hr_change": "true"},
-                timeout=10.0
-            )
-            if btc_response.status_code == 200:
-                market_data["prices"] = btc_response.json()
-        except Exception:
-            market_data["prices"] = {}
+    # Market data from the shared snapshot
+    snapshot = (await market_context_service.get())["market"]
+    market_data = {
+        "fear_greed": snapshot.get("fear_greed") or {"value": "50", "value_classification": "Neutral"},
+        "prices": {
+            coin["id"]: {
+                "usd": coin.get("current_price", 0),
+                "usd_24h_change": coin.get("price_change_percentage_24h", 0) or 0
+            }
+            for coin in snapshot.get("crypto", [])
+        }
+    }
     
     # Get user's watchlist performance
     watchlist = current_user.get("watchlist", [])[:5]
@@ -2076,6 +1772,7 @@ Format JSON:
         chat = LlmChat(
             api_key=EMERGENT_LLM_KEY,
             session_id=f"briefing_{current_user['id']}_{datetime.now().strftime('%Y%m%d')}",
+            cache_ttl=900,  # Partagé entre traders au même contexte (watchlist, niveau)
             system_message="Tu es BULL, un trader expert qui donne des briefings matinaux concis et actionnables."
         )
         chat.with_model("xai", "grok-3-latest")
@@ -2236,7 +1933,7 @@ async def get_ai_trading_signals(current_user: dict = Depends(get_current_user))
     
     # Construire le contexte pour l'IA
     context = f"""
-ANALYSE MULTI-MARCHÉS - {datetime.now().strftime('%d/%m/%Y %H:%M')}
+ANALYSE MULTI-MARCHÉS - {datetime.now().strftime('%d/%m/%Y %Hh')}
 
 Tu es un trader expert avec 20 ans d'expérience. Analyse ces données et donne des SIGNAUX DE TRADING PRÉCIS.
 
@@ -2290,6 +1987,7 @@ Sois PRÉCIS et ACTIONNABLE. Pas de blabla, que des signaux exploitables.
         chat = LlmChat(
             api_key=EMERGENT_LLM_KEY,
             session_id=f"signals_{current_user['id']}_{datetime.now().strftime('%Y%m%d%H')}",
+            cache_ttl=900,
             system_message="Tu es un trader professionnel. Tu donnes des signaux de trading précis et actionnables."
         )
         chat.with_model("xai", "grok-3-latest")
@@ -3092,8 +2790,8 @@ async def scan_trading_opportunities(current_user: dict = Depends(get_current_us
 
 @api_router.get("/market/intelligence")
 async def get_market_intelligence(current_user: dict = Depends(get_current_user)):
-    """Get comprehensive market intelligence dashboard data"""
-    data = await fetch_comprehensive_market_data()
+    """Get comprehensive market intelligence dashboard data (shared market snapshot)"""
+    data = (await market_context_service.get())["market"]
     analysis = analyze_market_conditions(data)
     
     return {
@@ -3276,153 +2974,168 @@ def analyze_market_conditions(data: dict) -> dict:
     
     return analysis
 
-@api_router.post("/assistant/chat", response_model=ChatResponse)
-async def chat_with_bull(request: ChatRequest, current_user: dict = Depends(get_current_user)):
-    """Chat with BULL SAGE AI Assistant - with real-time market data"""
-    try:
-        # Get user's trading level for personalized responses
-        trading_level = current_user.get("trading_level", "beginner")
-        user_name = current_user.get("name", "Trader")
-        
-        # FETCH ALL REAL-TIME DATA
-        market_data = await fetch_comprehensive_market_data()
-        
-        # Analyze market conditions
-        market_analysis = analyze_market_conditions(market_data)
-        
-        # Build comprehensive market context
-        market_context = f"""
+async def fetch_top_markets(limit: int = 10) -> list:
+    """Top cryptos by market cap (newsletter market section)"""
+    async with httpx.AsyncClient() as client:
+        response = await client.get(
+            f"{COINGECKO_API_URL}/coins/markets",
+            params={"vs_currency": "usd", "order": "market_cap_desc", "per_page": limit, "page": 1},
+            timeout=15.0
+        )
+        if response.status_code == 200:
+            return response.json()
+    return []
+
+def render_market_context(market_data: dict) -> str:
+    """Market context block injected in the assistant system prompt"""
+    # Analyze market conditions
+    market_analysis = analyze_market_conditions(market_data)
+    
+    # Build comprehensive market context
+    market_context = f"""
 === DONNÉES MARCHÉ TEMPS RÉEL ({market_data['timestamp'][:19].replace('T', ' ')} UTC) ===
 
 📊 PRIX CRYPTO ACTUELS:"""
-        
-        for coin in market_data["crypto"]:
-            price = coin.get("current_price", 0)
-            change_1h = coin.get("price_change_percentage_1h_in_currency", 0) or 0
-            change_24h = coin.get("price_change_percentage_24h", 0) or 0
-            change_7d = coin.get("price_change_percentage_7d_in_currency", 0) or 0
-            change_30d = coin.get("price_change_percentage_30d_in_currency", 0) or 0
-            high_24h = coin.get("high_24h", 0)
-            low_24h = coin.get("low_24h", 0)
-            ath = coin.get("ath", 0)
-            ath_change = coin.get("ath_change_percentage", 0) or 0
-            market_context += f"""
+    
+    for coin in market_data["crypto"]:
+        price = coin.get("current_price", 0)
+        change_1h = coin.get("price_change_percentage_1h_in_currency", 0) or 0
+        change_24h = coin.get("price_change_percentage_24h", 0) or 0
+        change_7d = coin.get("price_change_percentage_7d_in_currency", 0) or 0
+        change_30d = coin.get("price_change_percentage_30d_in_currency", 0) or 0
+        high_24h = coin.get("high_24h", 0)
+        low_24h = coin.get("low_24h", 0)
+        ath = coin.get("ath", 0)
+        ath_change = coin.get("ath_change_percentage", 0) or 0
+        market_context += f"""
 - {coin['name']} ({coin['symbol'].upper()}): ${price:,.2f}
   • 1h: {change_1h:+.2f}% | 24h: {change_24h:+.2f}% | 7j: {change_7d:+.2f}% | 30j: {change_30d:+.2f}%
   • High 24h: ${high_24h:,.2f} | Low 24h: ${low_24h:,.2f}
   • ATH: ${ath:,.2f} ({ath_change:+.1f}% du ATH)"""
 
-        # Fear & Greed Index
-        if market_data["fear_greed"]:
-            fg = market_data["fear_greed"]
-            market_context += f"""
+    # Fear & Greed Index
+    if market_data["fear_greed"]:
+        fg = market_data["fear_greed"]
+        market_context += f"""
 
 😱 FEAR & GREED INDEX: {fg.get('value', 'N/A')} ({fg.get('value_classification', 'N/A')})
   • Interprétation: """
-            fg_value = int(fg.get('value', 50))
-            if fg_value <= 25:
-                market_context += "EXTREME FEAR - Signal potentiel d'ACHAT (marché sous-évalué)"
-            elif fg_value <= 45:
-                market_context += "FEAR - Prudence, possible opportunité d'achat"
-            elif fg_value <= 55:
-                market_context += "NEUTRAL - Marché indécis"
-            elif fg_value <= 75:
-                market_context += "GREED - Prudence, risque de correction"
-            else:
-                market_context += "EXTREME GREED - Signal de VENTE potentiel (marché suracheté)"
+        fg_value = int(fg.get('value', 50))
+        if fg_value <= 25:
+            market_context += "EXTREME FEAR - Signal potentiel d'ACHAT (marché sous-évalué)"
+        elif fg_value <= 45:
+            market_context += "FEAR - Prudence, possible opportunité d'achat"
+        elif fg_value <= 55:
+            market_context += "NEUTRAL - Marché indécis"
+        elif fg_value <= 75:
+            market_context += "GREED - Prudence, risque de correction"
+        else:
+            market_context += "EXTREME GREED - Signal de VENTE potentiel (marché suracheté)"
 
-        # Macro data
-        if market_data["macro"]:
-            market_context += """
+    # Macro data
+    if market_data["macro"]:
+        market_context += """
 
 🏦 DONNÉES MACRO:"""
-            if market_data["macro"].get("vix"):
-                vix_val = market_data["macro"]["vix"].get("value", "N/A")
-                market_context += f"""
+        if market_data["macro"].get("vix"):
+            vix_val = market_data["macro"]["vix"].get("value", "N/A")
+            market_context += f"""
 - VIX (Volatilité): {vix_val}"""
-                try:
-                    vix_num = float(vix_val)
-                    if vix_num < 15:
-                        market_context += " (Faible - marché calme, bon pour prendre des positions)"
-                    elif vix_num < 25:
-                        market_context += " (Normal)"
-                    else:
-                        market_context += " (ÉLEVÉ - PRUDENCE, forte incertitude)"
-                except Exception:
-                    pass
-            
-            if market_data["macro"].get("fed_rate"):
-                market_context += f"""
+            try:
+                vix_num = float(vix_val)
+                if vix_num < 15:
+                    market_context += " (Faible - marché calme, bon pour prendre des positions)"
+                elif vix_num < 25:
+                    market_context += " (Normal)"
+                else:
+                    market_context += " (ÉLEVÉ - PRUDENCE, forte incertitude)"
+            except Exception:
+                pass
+        
+        if market_data["macro"].get("fed_rate"):
+            market_context += f"""
 - Taux Fed: {market_data["macro"]["fed_rate"].get("value", "N/A")}%"""
-            
-            if market_data["macro"].get("dxy"):
-                market_context += f"""
+        
+        if market_data["macro"].get("dxy"):
+            market_context += f"""
 - Dollar Index (DXY): {market_data["macro"]["dxy"].get("value", "N/A")} (Dollar fort = crypto faible généralement)"""
 
-        # Fear & Greed History (trend)
-        if market_data.get("fear_greed_history") and len(market_data["fear_greed_history"]) > 1:
-            current_fg = int(market_data["fear_greed_history"][0].get("value", 50))
-            week_ago_fg = int(market_data["fear_greed_history"][-1].get("value", 50))
-            fg_change = current_fg - week_ago_fg
-            market_context += f"""
+    # Fear & Greed History (trend)
+    if market_data.get("fear_greed_history") and len(market_data["fear_greed_history"]) > 1:
+        current_fg = int(market_data["fear_greed_history"][0].get("value", 50))
+        week_ago_fg = int(market_data["fear_greed_history"][-1].get("value", 50))
+        fg_change = current_fg - week_ago_fg
+        market_context += f"""
 - Fear & Greed Tendance 7j: {week_ago_fg} → {current_fg} ({fg_change:+d} points)"""
 
-        # Economic Calendar
-        if market_data.get("economic_calendar"):
-            market_context += """
+    # Economic Calendar
+    if market_data.get("economic_calendar"):
+        market_context += """
 
 📅 CALENDRIER ÉCONOMIQUE (événements importants à venir):"""
-            for event in market_data["economic_calendar"][:5]:
-                event_name = event.get("event", "")[:50]
-                event_date = event.get("date", "")
-                impact = event.get("impact", "").upper()
-                market_context += f"""
+        for event in market_data["economic_calendar"][:5]:
+            event_name = event.get("event", "")[:50]
+            event_date = event.get("date", "")
+            impact = event.get("impact", "").upper()
+            market_context += f"""
 - [{impact}] {event_date}: {event_name}"""
 
-        # News headlines
-        if market_data["news"]:
-            market_context += """
+    # News headlines
+    if market_data["news"]:
+        market_context += """
 
 📰 DERNIÈRES NEWS CRYPTO:"""
-            for news in market_data["news"][:5]:
-                headline = news.get("headline", "")[:80]
-                source = news.get("source", "")
-                market_context += f"""
+        for news in market_data["news"][:5]:
+            headline = news.get("headline", "")[:80]
+            source = news.get("source", "")
+            market_context += f"""
 - {headline} ({source})"""
 
-        # AI-generated analysis summary
-        market_context += f"""
+    # AI-generated analysis summary
+    market_context += f"""
 
 🤖 ANALYSE AUTOMATIQUE DU MARCHÉ:
 - Sentiment global: {market_analysis['overall_sentiment'].upper()}
 - Niveau de risque: {market_analysis['risk_level'].upper()}"""
-        
-        if market_analysis["key_factors"]:
-            market_context += """
+    
+    if market_analysis["key_factors"]:
+        market_context += """
 - Facteurs clés:"""
-            for factor in market_analysis["key_factors"]:
-                market_context += f"""
+        for factor in market_analysis["key_factors"]:
+            market_context += f"""
   • {factor}"""
-        
-        if market_analysis["warnings"]:
-            market_context += """
+    
+    if market_analysis["warnings"]:
+        market_context += """
 - ⚠️ ALERTES:"""
-            for warning in market_analysis["warnings"]:
-                market_context += f"""
+        for warning in market_analysis["warnings"]:
+            market_context += f"""
   • {warning}"""
-        
-        if market_analysis["opportunities"]:
-            market_context += """
+    
+    if market_analysis["opportunities"]:
+        market_context += """
 - 💡 OPPORTUNITÉS:"""
-            for opp in market_analysis["opportunities"]:
-                market_context += f"""
+        for opp in market_analysis["opportunities"]:
+            market_context += f"""
   • {opp}"""
 
-        market_context += """
+    market_context += """
 
 === FIN DES DONNÉES TEMPS RÉEL ==="""
+    return market_context
 
-        system_message = f"""Tu es BULL SAGE, un assistant de trading IA PROFESSIONNEL. Tu accompagnes {user_name}, un trader de niveau {trading_level}.
+async def build_assistant_context(current_user: dict):
+    """Shared market snapshot and the BULL SAGE system prompt built from it"""
+    # Get user's trading level for personalized responses
+    trading_level = current_user.get("trading_level", "beginner")
+    user_name = current_user.get("name", "Trader")
+    
+    # Prebuilt by the market context service (no upstream call here)
+    snapshot = await market_context_service.get()
+    market_data = snapshot["market"]
+    market_context = snapshot["context"]
+
+    system_message = f"""Tu es BULL SAGE, un assistant de trading IA PROFESSIONNEL. Tu accompagnes {user_name}, un trader de niveau {trading_level}.
 
 🎯 TON OBJECTIF PRINCIPAL: Donner des conseils de trading PRÉCIS et ACTIONNABLES basés sur les données TEMPS RÉEL ci-dessous.
 
@@ -3450,13 +3163,33 @@ async def chat_with_bull(request: ChatRequest, current_user: dict = Depends(get_
 - Ne jamais risquer plus de 1-2% par trade
 
 🗣️ Réponds TOUJOURS en français, de manière directe et actionnable."""
+    return system_message, market_data
 
-        chat = LlmChat(
-            api_key=EMERGENT_LLM_KEY,
-            session_id=f"bullsage_{current_user['id']}_{datetime.now().strftime('%Y%m%d%H')}",
-            system_message=system_message
-        )
-        chat.with_model("xai", "grok-3-latest")
+def chat_market_snapshot(market_data: dict) -> dict:
+    """Key market values stored alongside each chat exchange"""
+    return {
+        "btc_price": market_data["crypto"][0].get("current_price") if market_data["crypto"] else None,
+        "fear_greed": market_data["fear_greed"].get("value") if market_data["fear_greed"] else None
+    }
+
+async def create_assistant_chat(current_user: dict, system_message: str) -> LlmChat:
+    """Assistant chat primed with the conversation window and rolling summary"""
+    summary, history = await conversation_memory.load(current_user["id"])
+    chat = LlmChat(
+        api_key=EMERGENT_LLM_KEY,
+        session_id=f"bullsage_{current_user['id']}_{datetime.now().strftime('%Y%m%d%H')}",
+        system_message=system_message,
+        history=history,
+        summary=summary
+    )
+    return chat.with_model("xai", "grok-3-latest")
+
+@api_router.post("/assistant/chat", response_model=ChatResponse)
+async def chat_with_bull(request: ChatRequest, current_user: dict = Depends(get_current_user)):
+    """Chat with BULL SAGE AI Assistant - with real-time market data"""
+    try:
+        system_message, market_data = await build_assistant_context(current_user)
+        chat = await create_assistant_chat(current_user, system_message)
         
         user_message = UserMessage(text=request.message)
         response = await chat.send_message(user_message)
@@ -3467,12 +3200,10 @@ async def chat_with_bull(request: ChatRequest, current_user: dict = Depends(get_
             "message": request.message,
             "response": response,
             "timestamp": datetime.now(timezone.utc).isoformat(),
-            "market_data_snapshot": {
-                "btc_price": market_data["crypto"][0].get("current_price") if market_data["crypto"] else None,
-                "fear_greed": market_data["fear_greed"].get("value") if market_data["fear_greed"] else None
-            }
+            "market_data_snapshot": chat_market_snapshot(market_data)
         }
         await db.chat_history.insert_one(chat_doc)
+        conversation_memory.schedule_summary(current_user["id"])
         
         return ChatResponse(
             response=response,
@@ -3483,14 +3214,59 @@ async def chat_with_bull(request: ChatRequest, current_user: dict = Depends(get_
         logger.error(f"AI Chat error: {e}")
         raise HTTPException(status_code=500, detail=f"AI Assistant error: {str(e)}")
 
+@api_router.post("/assistant/chat/stream")
+async def chat_with_bull_stream(request: ChatRequest, current_user: dict = Depends(get_current_user)):
+    """
+    Streaming variant of /assistant/chat (Server-Sent Events).
+    Emits "delta" events with text fragments as the model produces them, then
+    "done" once the assembled answer is stored in chat history ("error" on
+    failure or empty answer, nothing stored).
+    """
+    try:
+        system_message, market_data = await build_assistant_context(current_user)
+        chat = await create_assistant_chat(current_user, system_message)
+    except Exception as e:
+        logger.error(f"AI Chat context error: {e}")
+        raise HTTPException(status_code=500, detail=f"AI Assistant error: {str(e)}")
+    
+    async def event_generator():
+        parts = []
+        try:
+            async for delta in chat.stream_message(UserMessage(text=request.message)):
+                parts.append(delta)
+                yield f"event: delta\ndata: {json.dumps({'text': delta}, ensure_ascii=False)}\n\n"
+        except Exception as e:
+            logger.error(f"AI Chat stream error: {e}")
+            yield f"event: error\ndata: {json.dumps({'detail': f'AI Assistant error: {str(e)}'})}\n\n"
+            return
+        
+        if not "".join(parts).strip():
+            # Nothing to store or show: the exchange is dropped like a failed one
+            logger.error("AI Chat stream error: empty response")
+            yield f"event: error\ndata: {json.dumps({'detail': 'AI Assistant error: empty response'})}\n\n"
+            return
+        
+        timestamp = datetime.now(timezone.utc).isoformat()
+        await db.chat_history.insert_one({
+            "user_id": current_user["id"],
+            "message": request.message,
+            "response": "".join(parts),
+            "timestamp": timestamp,
+            "market_data_snapshot": chat_market_snapshot(market_data)
+        })
+        conversation_memory.schedule_summary(current_user["id"])
+        yield f"event: done\ndata: {json.dumps({'timestamp': timestamp})}\n\n"
+    
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @api_router.get("/assistant/history")
 async def get_chat_history(limit: int = 20, current_user: dict = Depends(get_current_user)):
-    """Get chat history for current user"""
-    history = await db.chat_history.find(
-        {"user_id": current_user["id"]},
-        {"_id": 0}
-    ).sort("timestamp", -1).limit(limit).to_list(limit)
-    return list(reversed(history))
+    """Get the conversation window (last exchanges sent to the model) for current user"""
+    return await conversation_memory.window(current_user["id"], limit, projection={"_id": 0})
 
 # ============== PAPER TRADING ROUTES ==============
 
@@ -3543,6 +3319,7 @@ async def execute_paper_trade(trade: PaperTradeCreate, current_user: dict = Depe
         {"id": user_id},
         {"$set": {"paper_balance": new_balance, "portfolio": portfolio}}
     )
+    user_cache.invalidate(user_id)
     
     # Record trade
     trade_id = str(uuid.uuid4())
@@ -3557,17 +3334,25 @@ async def execute_paper_trade(trade: PaperTradeCreate, current_user: dict = Depe
         "status": "executed"
     }
     await db.paper_trades.insert_one(trade_doc)
+    await record_paper_trade(db, trade_doc)
     
     return PaperTrade(**trade_doc)
 
 @api_router.get("/paper-trading/trades")
-async def get_paper_trades(limit: int = 50, current_user: dict = Depends(get_current_user)):
-    """Get paper trading history"""
+async def get_paper_trades(
+    response: Response,
+    limit: int = 50,
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Get paper trading history (next page: ?after=<X-Next-Cursor>)"""
     try:
-        trades = await db.paper_trades.find(
-            {"user_id": current_user["id"]},
-            {"_id": 0}
-        ).sort("timestamp", -1).limit(limit).to_list(limit)
+        trades, next_cursor = await fetch_page(
+            db.paper_trades, {"user_id": current_user["id"]}, limit, after, fields,
+            sort_field="timestamp"
+        )
+        set_next_cursor(response, next_cursor)
         
         if not trades:
             return []
@@ -3642,23 +3427,22 @@ async def reset_paper_portfolio(current_user: dict = Depends(get_current_user)):
         {"id": current_user["id"]},
         {"$set": {"paper_balance": 10000.0, "portfolio": {}}}
     )
+    user_cache.invalidate(current_user["id"])
     await db.paper_trades.delete_many({"user_id": current_user["id"]})
+    await reset_paper_ledger(db, current_user["id"])
     return {"message": "Portfolio reset successfully", "balance": 10000.0}
 
 @api_router.get("/paper-trading/stats")
 async def get_paper_trading_stats(current_user: dict = Depends(get_current_user)):
-    """Get comprehensive paper trading statistics"""
-    trades = await db.paper_trades.find(
-        {"user_id": current_user["id"]},
-        {"_id": 0}
-    ).to_list(1000)
+    """Get comprehensive paper trading statistics (from the precomputed position ledger)"""
+    ledger = await get_paper_ledger(db, current_user["id"])
     
-    user = await db.users.find_one({"id": current_user["id"]})
+    user = await db.users.find_one({"id": current_user["id"]}, {"_id": 0, "paper_balance": 1, "portfolio": 1})
     current_balance = user.get("paper_balance", 10000.0)
     portfolio = user.get("portfolio", {})
     initial_balance = 10000.0
     
-    if not trades:
+    if not ledger["total_trades"]:
         return {
             "total_trades": 0,
             "buy_trades": 0,
@@ -3676,123 +3460,49 @@ async def get_paper_trading_stats(current_user: dict = Depends(get_current_user)
             "daily_pnl": []
         }
     
-    total_trades = len(trades)
-    buy_trades = len([t for t in trades if t["type"] == "buy"])
-    sell_trades = len([t for t in trades if t["type"] == "sell"])
-    total_volume = sum(t["amount"] * t["price"] for t in trades)
-    
-    # Calculate realized P&L from sell trades
-    realized_pnl = 0
-    trade_pnls = []
-    
-    # Group trades by symbol
-    from collections import defaultdict
-    trades_by_symbol = defaultdict(list)
-    for t in sorted(trades, key=lambda x: x.get("timestamp", "")):
-        trades_by_symbol[t["symbol"]].append(t)
-    
-    # Calculate P&L for each closed position
-    for symbol, symbol_trades in trades_by_symbol.items():
-        position_cost = 0
-        position_amount = 0
-        
-        for t in symbol_trades:
-            if t["type"] == "buy":
-                cost = t["amount"] * t["price"]
-                position_cost += cost
-                position_amount += t["amount"]
-            elif t["type"] == "sell":
-                if position_amount > 0:
-                    avg_cost = position_cost / position_amount
-                    sell_value = t["amount"] * t["price"]
-                    cost_basis = t["amount"] * avg_cost
-                    pnl = sell_value - cost_basis
-                    pnl_percent = (pnl / cost_basis * 100) if cost_basis > 0 else 0
-                    
-                    realized_pnl += pnl
-                    trade_pnls.append({
-                        "symbol": symbol,
-                        "pnl": pnl,
-                        "pnl_percent": pnl_percent,
-                        "timestamp": t.get("timestamp")
-                    })
-                    
-                    # Update position
-                    position_cost -= t["amount"] * avg_cost
-                    position_amount -= t["amount"]
-    
     # Get current portfolio value with live prices (estimate)
     portfolio_value = current_balance
-    for symbol, holding in portfolio.items():
+    holdings = portfolio.values() if isinstance(portfolio, dict) else portfolio
+    for holding in holdings:
         # Use stored average price as estimate
-        portfolio_value += holding.get("amount", 0) * holding.get("avg_price", 0)
+        portfolio_value += holding.get("amount", holding.get("quantity", 0)) * holding.get("avg_price", 0)
     
     total_pnl = portfolio_value - initial_balance
     total_pnl_percent = (total_pnl / initial_balance * 100) if initial_balance > 0 else 0
     
-    # Best and worst trades
-    best_trade = None
-    worst_trade = None
-    if trade_pnls:
-        sorted_pnls = sorted(trade_pnls, key=lambda x: x["pnl"], reverse=True)
-        if sorted_pnls:
-            best = sorted_pnls[0]
-            best_trade = {"symbol": best["symbol"], "pnl": round(best["pnl"], 2), "pnl_percent": round(best["pnl_percent"], 2)}
-            worst = sorted_pnls[-1]
-            worst_trade = {"symbol": worst["symbol"], "pnl": round(worst["pnl"], 2), "pnl_percent": round(worst["pnl_percent"], 2)}
-    
-    # Most traded symbol
-    symbol_counts = {}
-    for t in trades:
-        sym = t["symbol"]
-        symbol_counts[sym] = symbol_counts.get(sym, 0) + 1
-    most_traded = max(symbol_counts.items(), key=lambda x: x[1])[0] if symbol_counts else None
-    
-    # Recent trading history (last 10)
-    trading_history = []
-    for t in sorted(trades, key=lambda x: x.get("timestamp", ""), reverse=True)[:10]:
-        trading_history.append({
-            "symbol": t["symbol"],
-            "type": t["type"],
-            "amount": t["amount"],
-            "price": t["price"],
-            "value": round(t["amount"] * t["price"], 2),
-            "timestamp": t.get("timestamp", "")[:10] if t.get("timestamp") else ""
-        })
+    def _closed_trade(trade):
+        if not trade:
+            return None
+        return {"symbol": trade["symbol"], "pnl": round(trade["pnl"], 2), "pnl_percent": round(trade["pnl_percent"], 2)}
     
-    # Daily P&L (simplified - based on trade dates)
-    daily_pnl = []
-    daily_trades = defaultdict(lambda: {"buys": 0, "sells": 0, "volume": 0})
-    for t in trades:
-        date = t.get("timestamp", "")[:10] if t.get("timestamp") else "unknown"
-        daily_trades[date]["volume"] += t["amount"] * t["price"]
-        if t["type"] == "buy":
-            daily_trades[date]["buys"] += 1
-        else:
-            daily_trades[date]["sells"] += 1
+    symbol_counts = ledger.get("symbol_counts", {})
+    most_traded = max(symbol_counts.items(), key=lambda x: x[1])[0] if symbol_counts else None
     
-    for date, data in sorted(daily_trades.items(), reverse=True)[:7]:
-        daily_pnl.append({
+    daily_pnl = [
+        {
             "date": date,
             "trades": data["buys"] + data["sells"],
-            "volume": round(data["volume"], 2)
-        })
+            "volume": round(data["volume"], 2),
+            "realized_pnl": round(data.get("realized_pnl", 0), 2)
+        }
+        for date, data in sorted(ledger.get("daily", {}).items(), reverse=True)[:7]
+    ]
     
     return {
-        "total_trades": total_trades,
-        "buy_trades": buy_trades,
-        "sell_trades": sell_trades,
-        "total_volume": round(total_volume, 2),
+        "total_trades": ledger["total_trades"],
+        "buy_trades": ledger["buy_trades"],
+        "sell_trades": ledger["sell_trades"],
+        "total_volume": round(ledger["total_volume"], 2),
         "current_balance": round(current_balance, 2),
         "initial_balance": initial_balance,
-        "realized_pnl": round(realized_pnl, 2),
+        "realized_pnl": round(ledger["realized_pnl"], 2),
         "total_pnl": round(total_pnl, 2),
         "total_pnl_percent": round(total_pnl_percent, 2),
         "portfolio_value": round(portfolio_value, 2),
-        "best_trade": best_trade,
-        "worst_trade": worst_trade,
+        "best_trade": _closed_trade(ledger.get("best_trade")),
+        "worst_trade": _closed_trade(ledger.get("worst_trade")),
         "most_traded": most_traded,
-        "trading_history": trading_history,
+        "trading_history": ledger.get("recent_trades", []),
         "daily_pnl": daily_pnl
     }
 
@@ -3805,6 +3515,7 @@ async def update_watchlist(data: WatchlistUpdate, current_user: dict = Depends(g
         {"id": current_user["id"]},
         {"$set": {"watchlist": data.symbols}}
     )
+    user_cache.invalidate(current_user["id"])
     return {"watchlist": data.symbols}
 
 @api_router.post("/watchlist/{symbol}")
@@ -3814,6 +3525,7 @@ async def add_to_watchlist(symbol: str, current_user: dict = Depends(get_current
         {"id": current_user["id"]},
         {"$addToSet": {"watchlist": symbol.lower()}}
     )
+    user_cache.invalidate(current_user["id"])
     user = await db.users.find_one({"id": current_user["id"]})
     return {"watchlist": user.get("watchlist", [])}
 
@@ -3824,6 +3536,7 @@ async def remove_from_watchlist(symbol: str, current_user: dict = Depends(get_cu
         {"id": current_user["id"]},
         {"$pull": {"watchlist": symbol.lower()}}
     )
+    user_cache.invalidate(current_user["id"])
     user = await db.users.find_one({"id": current_user["id"]})
     return {"watchlist": user.get("watchlist", [])}
 
@@ -3912,6 +3625,7 @@ async def update_trading_level(level: str, current_user: dict = Depends(get_curr
         {"id": current_user["id"]},
         {"$set": {"trading_level": level}}
     )
+    user_cache.invalidate(current_user["id"])
     return {"trading_level": level}
 
 # ============== ONBOARDING ROUTES ==============
@@ -3955,6 +3669,7 @@ async def complete_onboarding(data: OnboardingData, current_user: dict = Depends
             }
         }
     )
+    user_cache.invalidate(current_user["id"])
     
     # Get updated user
     updated_user = await db.users.find_one({"id": current_user["id"]}, {"_id": 0, "password": 0})
@@ -4526,6 +4241,7 @@ async def smart_invest_execute(request: SmartInvestExecute, current_user: dict =
         {"id": user_id},
         {"$set": {"paper_balance": new_balance, "portfolio": portfolio}}
     )
+    user_cache.invalidate(user_id)
     
     # Record the trade
     trade_doc = {
@@ -4541,6 +4257,7 @@ async def smart_invest_execute(request: SmartInvestExecute, current_user: dict =
         "source": "smart_invest"
     }
     await db.paper_trades.insert_one(trade_doc)
+    await record_paper_trade(db, trade_doc)
     
     return {
         "success": True,
@@ -5210,27 +4927,30 @@ async def get_admin_user(current_user: dict = Depends(get_current_user)):
     return current_user
 
 @api_router.get("/admin/users")
-async def admin_get_users(admin: dict = Depends(get_admin_user)):
-    """Get all users (admin only)"""
-    users = await db.users.find({}, {"_id": 0, "password": 0}).to_list(1000)
+async def admin_get_users(
+    response: Response,
+    limit: int = 200,
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    admin: dict = Depends(get_admin_user)
+):
+    """Get users, newest first (admin only, next page: ?after=<X-Next-Cursor>)"""
+    users, next_cursor = await fetch_page(db.users, {}, limit, after, fields, exclude=("password",))
+    set_next_cursor(response, next_cursor)
     return users
 
 @api_router.get("/admin/stats")
 async def admin_get_stats(admin: dict = Depends(get_admin_user)):
     """Get platform statistics (admin only)"""
-    users_count = await db.users.count_documents({})
-    trades_count = await db.paper_trades.count_documents({})
-    strategies_count = await db.strategies.count_documents({})
-    alerts_count = await db.alerts.count_documents({})
-    chats_count = await db.chat_history.count_documents({})
+    stats = await admin_stats.get(db)
     
     return {
-        "users": users_count,
-        "paper_trades": trades_count,
-        "strategies": strategies_count,
-        "alerts": alerts_count,
-        "ai_chats": chats_count,
-        "timestamp": datetime.now(timezone.utc).isoformat()
+        "users": stats["users"]["total"],
+        "paper_trades": stats["trading"]["total_trades"],
+        "strategies": stats["counts"]["strategies"],
+        "alerts": stats["counts"]["alerts"],
+        "ai_chats": stats["counts"]["chat_history"],
+        "timestamp": stats["timestamp"]
     }
 
 @api_router.delete("/admin/users/{user_id}")
@@ -5240,6 +4960,8 @@ async def admin_delete_user(user_id: str, admin: dict = Depends(get_admin_user))
         raise HTTPException(status_code=400, detail="Cannot delete yourself")
     
     result = await db.users.delete_one({"id": user_id})
+    user_cache.invalidate(user_id)
+    leaderboard_snapshot.invalidate()
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -5248,6 +4970,11 @@ async def admin_delete_user(user_id: str, admin: dict = Depends(get_admin_user))
     await db.strategies.delete_many({"user_id": user_id})
     await db.alerts.delete_many({"user_id": user_id})
     await db.chat_history.delete_many({"user_id": user_id})
+    await conversation_memory.clear(user_id)
+    # Materialized per-user documents (an orphaned ledger would still rank in the newsletter)
+    await db.paper_ledger.delete_many({"user_id": user_id})
+    await db.journal_stats.delete_many({"user_id": user_id})
+    await db.signal_stats.delete_many({"user_id": user_id})
     
     return {"message": "User deleted successfully"}
 
@@ -5261,6 +4988,7 @@ async def admin_toggle_admin(user_id: str, is_admin: bool, admin: dict = Depends
         {"id": user_id},
         {"$set": {"is_admin": is_admin}}
     )
+    user_cache.invalidate(user_id)
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -5318,6 +5046,53 @@ async def get_api_health(admin: dict = Depends(get_admin_user)):
     
     return results
 
+@api_router.get("/admin/indexes")
+async def get_index_report(admin: dict = Depends(get_admin_user)):
+    """Explain the hot queries and report whether each one is served by an index"""
+    today_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    report = await explain_hot_queries(db, {
+        "user_id": admin["id"],
+        "email": admin["email"],
+        "today": today_start.isoformat()
+    })
+    return {
+        "queries": report,
+        "all_indexed": all(q.get("uses_index") for q in report),
+        "collection_scans": [q["name"] for q in report if q.get("collection_scan")]
+    }
+
+@api_router.post("/admin/paper-ledger/rebuild")
+async def admin_rebuild_paper_ledgers(admin: dict = Depends(get_admin_user)):
+    """Realign every paper ledger with paper_trades (e.g. after a crash between writes)"""
+    count = await rebuild_all_ledgers(db)
+    return {"message": f"Paper ledgers rebuilt for {count} users", "users": count}
+
+@api_router.post("/admin/journal-stats/rebuild")
+async def admin_rebuild_journal_stats(admin: dict = Depends(get_admin_user)):
+    """Backfill the materialized journal stats of every user"""
+    count = await rebuild_all_journal_stats(db)
+    return {"message": f"Journal stats rebuilt for {count} users", "users": count}
+
+@api_router.get("/admin/user-cache")
+async def get_user_cache_stats(admin: dict = Depends(get_admin_user)):
+    """Hit ratio and size of the in-process user cache"""
+    return user_cache.stats()
+
+@api_router.get("/admin/llm-gateway")
+async def get_llm_gateway_stats(admin: dict = Depends(get_admin_user)):
+    """Queue depth, wait times and token usage of the shared LLM gateway"""
+    return llm_gateway.stats()
+
+@api_router.get("/admin/llm-cache")
+async def get_llm_cache_stats(admin: dict = Depends(get_admin_user)):
+    """Hit ratio and tokens saved by the LLM response cache"""
+    return llm_response_cache.stats()
+
+@api_router.get("/admin/translation-cache")
+async def get_translation_cache_stats(admin: dict = Depends(get_admin_user)):
+    """Size and hit ratio of the shared news translation cache"""
+    return translation_cache.stats()
+
 @api_router.get("/admin/logs")
 async def get_admin_logs(admin: dict = Depends(get_admin_user), limit: int = 100):
     """Get error logs"""
@@ -5333,7 +5108,8 @@ async def create_log(level: str, message: str, source: str = "frontend", admin:
         "level": level,
         "message": message,
         "source": source,
-        "timestamp": datetime.now(timezone.utc).isoformat()
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "expires_at": log_expiry(ERROR_LOG_RETENTION_DAYS)
     }
     await db.error_logs.insert_one(log)
     return {"message": "Log created"}
@@ -5386,6 +5162,7 @@ async def upload_avatar(
         {"id": current_user["id"]},
         {"$set": {"avatar": avatar_url}}
     )
+    user_cache.invalidate(current_user["id"])
     
     return {"avatar": avatar_url, "message": "Photo de profil mise à jour"}
 
@@ -5402,6 +5179,7 @@ async def delete_avatar(current_user: dict = Depends(get_current_user)):
         {"id": current_user["id"]},
         {"$unset": {"avatar": ""}}
     )
+    user_cache.invalidate(current_user["id"])
     
     return {"message": "Photo supprimée"}
 
@@ -5424,6 +5202,7 @@ async def update_profile(
     
     if updates:
         await db.users.update_one({"id": current_user["id"]}, {"$set": updates})
+        user_cache.invalidate(current_user["id"])
     
     return {"message": "Profil mis à jour", "updates": updates}
 
@@ -5476,6 +5255,7 @@ async def admin_update_user(
         raise HTTPException(status_code=400, detail="No updates provided")
     
     result = await db.users.update_one({"id": user_id}, {"$set": updates})
+    user_cache.invalidate(user_id)
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -5483,16 +5263,20 @@ async def admin_update_user(
 
 @api_router.get("/admin/trades")
 async def admin_get_all_trades(
+    response: Response,
     limit: int = 100,
     user_id: Optional[str] = None,
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
     admin: dict = Depends(get_admin_user)
 ):
-    """Get all trades (admin only)"""
+    """Get all trades (admin only, next page: ?after=<X-Next-Cursor>)"""
     query = {}
     if user_id:
         query["user_id"] = user_id
     
-    trades = await db.paper_trades.find(query, {"_id": 0}).sort("created_at", -1).limit(limit).to_list(limit)
+    trades, next_cursor = await fetch_page(db.paper_trades, query, limit, after, fields)
+    set_next_cursor(response, next_cursor)
     return trades
 
 @api_router.get("/admin/academy/progress")
@@ -5530,77 +5314,36 @@ async def admin_update_user_academy(
     
     if updates:
         await db.users.update_one({"id": user_id}, {"$set": updates})
+        user_cache.invalidate(user_id)
     
     if add_badge:
         await db.users.update_one(
             {"id": user_id},
             {"$addToSet": {"badges": add_badge}}
         )
+        user_cache.invalidate(user_id)
     
     if remove_badge:
         await db.users.update_one(
             {"id": user_id},
             {"$pull": {"badges": remove_badge}}
         )
+        user_cache.invalidate(user_id)
     
     return {"message": "Academy progress updated"}
 
 @api_router.get("/admin/dashboard")
 async def admin_dashboard(admin: dict = Depends(get_admin_user)):
-    """Get comprehensive admin dashboard data"""
-    # User stats
-    total_users = await db.users.count_documents({})
-    admin_users = await db.users.count_documents({"is_admin": True})
-    
-    # Get users created in last 7 days
-    week_ago = datetime.now(timezone.utc) - timedelta(days=7)
-    new_users_week = await db.users.count_documents({
-        "created_at": {"$gte": week_ago.isoformat()}
-    })
-    
-    # Trading stats
-    total_trades = await db.paper_trades.count_documents({})
-    auto_trades = await db.paper_trades.count_documents({"source": "auto_trading"})
-    smart_invest_trades = await db.paper_trades.count_documents({"source": "smart_invest"})
-    
-    # Academy stats
-    total_xp = 0
-    users_with_xp = await db.users.find({"academy_xp": {"$gt": 0}}, {"academy_xp": 1}).to_list(1000)
-    for u in users_with_xp:
-        total_xp += u.get("academy_xp", 0)
-    
-    avg_xp = total_xp / len(users_with_xp) if users_with_xp else 0
-    
-    # Top users
-    top_traders = await db.users.find(
-        {},
-        {"_id": 0, "id": 1, "name": 1, "email": 1, "paper_balance": 1}
-    ).sort("paper_balance", -1).limit(5).to_list(5)
-    
-    top_learners = await db.users.find(
-        {},
-        {"_id": 0, "id": 1, "name": 1, "email": 1, "academy_xp": 1}
-    ).sort("academy_xp", -1).limit(5).to_list(5)
+    """Get comprehensive admin dashboard data (cached, one $facet per collection)"""
+    stats = await admin_stats.get(db)
     
     return {
-        "users": {
-            "total": total_users,
-            "admins": admin_users,
-            "new_this_week": new_users_week
-        },
-        "trading": {
-            "total_trades": total_trades,
-            "auto_trades": auto_trades,
-            "smart_invest_trades": smart_invest_trades
-        },
-        "academy": {
-            "total_xp_earned": total_xp,
-            "average_xp": round(avg_xp, 1),
-            "active_learners": len(users_with_xp)
-        },
-        "top_traders": top_traders,
-        "top_learners": top_learners,
-        "timestamp": datetime.now(timezone.utc).isoformat()
+        "users": stats["users"],
+        "trading": stats["trading"],
+        "academy": stats["academy"],
+        "top_traders": stats["top_traders"],
+        "top_learners": stats["top_learners"],
+        "timestamp": stats["timestamp"]
     }
 
 # ============== ACADEMY ENDPOINTS ==============
@@ -5820,6 +5563,7 @@ async def complete_lesson(lesson_id: str, current_user: dict = Depends(get_curre
             },
             upsert=True
         )
+        leaderboard_snapshot.record_xp(current_user["id"], new_xp)
     
     level_info = calculate_level(progress.get("total_xp", 0) + xp_earned)
     
@@ -5950,6 +5694,7 @@ async def submit_quiz(module_id: str, submission: QuizSubmission, current_user:
             },
             upsert=True
         )
+        leaderboard_snapshot.record_xp(current_user["id"], new_xp)
     
     return {
         "score": correct_count,
@@ -6011,36 +5756,32 @@ async def get_academy_progress(current_user: dict = Depends(get_current_user)):
 
 @api_router.get("/academy/leaderboard")
 async def get_leaderboard(current_user: dict = Depends(get_current_user)):
-    """Get academy leaderboard"""
-    # Get all progress sorted by XP
-    all_progress = await db.academy_progress.find(
-        {},
-        {"_id": 0}
-    ).sort("total_xp", -1).limit(20).to_list(20)
+    """Get academy leaderboard (shared snapshot, caller rank from the total_xp index)"""
+    top = await leaderboard_snapshot.get(db)
     
     leaderboard = []
-    for i, prog in enumerate(all_progress):
-        user = await db.users.find_one({"id": prog["user_id"]}, {"_id": 0, "password": 0})
-        if user:
-            level_info = calculate_level(prog.get("total_xp", 0))
-            leaderboard.append({
-                "rank": i + 1,
-                "user_id": user["id"],
-                "name": user.get("name", "Trader Anonyme"),
-                "total_xp": prog.get("total_xp", 0),
-                "level": level_info["level"],
-                "level_title": level_info["title"],
-                "level_icon": level_info["icon"],
-                "badges_count": len(prog.get("badges", [])),
-                "is_current_user": user["id"] == current_user["id"]
-            })
+    for rank, entry in enumerate(top, start=1):
+        level_info = calculate_level(entry["total_xp"])
+        leaderboard.append({
+            "rank": rank,
+            "user_id": entry["user_id"],
+            "name": entry.get("name") or "Trader Anonyme",
+            "total_xp": entry["total_xp"],
+            "level": level_info["level"],
+            "level_title": level_info["title"],
+            "level_icon": level_info["icon"],
+            "badges_count": entry["badges_count"],
+            "is_current_user": entry["user_id"] == current_user["id"]
+        })
     
     # Find current user's rank if not in top 20
-    current_user_in_list = any(entry["is_current_user"] for entry in leaderboard)
     current_user_rank = None
     
-    if not current_user_in_list:
-        user_progress = await db.academy_progress.find_one({"user_id": current_user["id"]})
+    if leaderboard_snapshot.rank_of(current_user["id"]) is None:
+        user_progress = await db.academy_progress.find_one(
+            {"user_id": current_user["id"]},
+            {"_id": 0, "total_xp": 1}
+        )
         if user_progress:
             higher_count = await db.academy_progress.count_documents(
                 {"total_xp": {"$gt": user_progress.get("total_xp", 0)}}
@@ -6092,6 +5833,13 @@ class AutoTrade(BaseModel):
 # In-memory store for auto-trading state (per user)
 _auto_trading_state: Dict[str, Dict] = {}
 
+# One lock per user: the browser scan and the scheduled cycle both rewrite
+# paper_balance/portfolio from a read of the user document
+_auto_trading_locks: Dict[str, asyncio.Lock] = {}
+
+def _auto_trading_lock(user_id: str) -> asyncio.Lock:
+    return _auto_trading_locks.setdefault(user_id, asyncio.Lock())
+
 @api_router.get("/auto-trading/config")
 async def get_auto_trading_config(current_user: dict = Depends(get_current_user)):
     """Get user's auto-trading configuration"""
@@ -6136,6 +5884,7 @@ async def update_auto_trading_config(config: AutoTradingConfig, current_user: di
         {"id": user_id},
         {"$set": {"auto_trading_config": config_dict}}
     )
+    user_cache.invalidate(user_id)
     
     # Update in-memory state
     if user_id not in _auto_trading_state:
@@ -6187,22 +5936,152 @@ async def stop_auto_trading(current_user: dict = Depends(get_current_user)):
     
     return {"success": True, "message": "Auto-Trading arrêté"}
 
-@api_router.post("/auto-trading/scan")
-async def auto_trading_scan(current_user: dict = Depends(get_current_user)):
+# Interval between two server-side auto-trading cycles
+AUTO_TRADING_SCAN_INTERVAL_MINUTES = int(os.environ.get('AUTO_TRADING_SCAN_INTERVAL_MINUTES', '15'))
+# Max concurrent histohour requests during a cycle
+AUTO_TRADING_FETCH_CONCURRENCY = 5
+
+def _score_auto_trading_asset(coin_id: str, usd_data: Dict, prices: List[float]) -> Dict[str, Any]:
+    """Compute the auto-trading score of one asset (shared by every user trading it)"""
+    coin_info = CRYPTO_MAPPING[coin_id]
+    current_price = usd_data.get("PRICE", 0)
+    change_24h = usd_data.get("CHANGEPCT24HOUR", 0)
+    
+    # Calculate indicators
+    rsi = calculate_rsi(prices)
+    macd = calculate_macd(prices)
+    bb = calculate_bollinger_bands(prices)
+    ma = calculate_moving_averages(prices)
+    
+    # Calculate score
+    score = 0
+    reasons = []
+    
+    # RSI
+    if rsi < 25:
+        score += 4
+        reasons.append(f"RSI extrême ({rsi:.1f})")
+    elif rsi < 30:
+        score += 3
+        reasons.append(f"RSI survente ({rsi:.1f})")
+    elif rsi < 40:
+        score += 2
+    elif rsi > 75:
+        score -= 4
+        reasons.append(f"RSI surachat ({rsi:.1f}) - VENTE")
+    elif rsi > 70:
+        score -= 2
+    
+    # Bollinger
+    if bb.get("position") == "oversold":
+        score += 3
+        reasons.append("Bollinger oversold")
+    elif bb.get("position") == "overbought":
+        score -= 2
+    
+    # Trend
+    trend = ma.get("trend", "neutral")
+    if trend == "strong_bullish":
+        score += 3
+        reasons.append("Tendance forte haussière")
+    elif trend == "bullish":
+        score += 2
+    elif trend == "strong_bearish":
+        score -= 3
+        reasons.append("Tendance forte baissière - VENTE")
+    elif trend == "bearish":
+        score -= 2
+    
+    # MACD
+    if macd.get("trend") == "bullish":
+        score += 1.5
+    elif macd.get("trend") == "bearish":
+        score -= 1.5
+    
+    # 24h momentum
+    if change_24h < -5:
+        score += 1  # Potential reversal
+        reasons.append(f"Correction récente ({change_24h:.1f}%)")
+    
+    return {
+        "coin_id": coin_id,
+        "name": coin_info["name"],
+        "symbol": coin_info["binance_symbol"],
+        "current_price": current_price,
+        "change_24h": change_24h,
+        "score": round(score, 1),
+        "rsi": round(rsi, 1),
+        "trend": trend,
+        "reasons": reasons
+    }
+
+async def _compute_auto_trading_signals(coin_ids: List[str]) -> Optional[Dict[str, Dict[str, Any]]]:
     """
-    Scan the market and execute auto-trades if conditions are met.
-    Only executes trades with HIGH confidence (score >= min_score).
+    Fetch market data and score each distinct asset once.
+    One pricemultifull call for all assets, one histohour call per asset.
+    Returns None if prices could not be fetched.
     """
-    user_id = current_user["id"]
+    coin_ids = [cid for cid in dict.fromkeys(coin_ids) if cid in CRYPTO_MAPPING]
+    if not coin_ids:
+        return {}
     
-    # Get user data
-    user = await db.users.find_one({"id": user_id}, {"_id": 0})
-    if not user:
-        return {"error": "Utilisateur non trouvé"}
+    symbols = [CRYPTO_MAPPING[cid]["binance_symbol"] for cid in coin_ids]
     
+    async with httpx.AsyncClient() as client:
+        price_response = await client.get(
+            f"{CRYPTOCOMPARE_API_URL}/pricemultifull",
+            params={"fsyms": ",".join(symbols), "tsyms": "USD"},
+            timeout=15.0
+        )
+        
+        if price_response.status_code != 200:
+            return None
+        
+        price_data = price_response.json().get("RAW", {})
+        semaphore = asyncio.Semaphore(AUTO_TRADING_FETCH_CONCURRENCY)
+        
+        async def score_asset(coin_id: str) -> Optional[Dict[str, Any]]:
+            crypto_symbol = CRYPTO_MAPPING[coin_id]["binance_symbol"]
+            if crypto_symbol not in price_data or "USD" not in price_data[crypto_symbol]:
+                return None
+            
+            usd_data = price_data[crypto_symbol]["USD"]
+            if usd_data.get("PRICE", 0) <= 0:
+                return None
+            
+            try:
+                async with semaphore:
+                    hist_response = await client.get(
+                        f"{CRYPTOCOMPARE_API_URL}/histohour",
+                        params={"fsym": crypto_symbol, "tsym": "USD", "limit": 168},
+                        timeout=10.0
+                    )
+            except Exception as e:
+                logger.warning(f"Auto-trading history fetch failed for {coin_id}: {e}")
+                return None
+            
+            if hist_response.status_code != 200:
+                return None
+            
+            hist_data = hist_response.json()
+            if hist_data.get("Response") != "Success" or "Data" not in hist_data:
+                return None
+            
+            data_points = hist_data["Data"]
+            if not isinstance(data_points, list) or len(data_points) < 50:
+                return None
+            
+            prices = [float(d["close"]) for d in data_points if d.get("close")]
+            return _score_auto_trading_asset(coin_id, usd_data, prices)
+        
+        scored = await asyncio.gather(*(score_asset(cid) for cid in coin_ids))
+    
+    return {s["coin_id"]: s for s in scored if s}
+
+async def _execute_auto_trading_for_user(user: dict, signals: Dict[str, Dict[str, Any]], today_trades: int) -> Dict[str, Any]:
+    """Apply one user's thresholds and limits to precomputed signals and execute the trades"""
+    user_id = user["id"]
     config = user.get("auto_trading_config", {})
-    if not config.get("enabled"):
-        return {"error": "Auto-trading désactivé", "trades": []}
     
     balance = user.get("paper_balance", 0)
     min_score = config.get("min_score", 5.0)
@@ -6210,14 +6089,6 @@ async def auto_trading_scan(current_user: dict = Depends(get_current_user)):
     assets_to_trade = config.get("assets_to_trade", ["bitcoin", "ethereum", "solana"])
     max_daily_trades = config.get("max_daily_trades", 5)
     
-    # Check daily trade limit
-    today_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
-    today_trades = await db.paper_trades.count_documents({
-        "user_id": user_id,
-        "source": "auto_trading",
-        "created_at": {"$gte": today_start.isoformat()}
-    })
-    
     if today_trades >= max_daily_trades:
         return {
             "message": f"Limite journalière atteinte ({max_daily_trades} trades)",
@@ -6225,293 +6096,300 @@ async def auto_trading_scan(current_user: dict = Depends(get_current_user)):
             "opportunities": []
         }
     
-    # Scan for opportunities
     opportunities = []
     executed_trades = []
     
-    try:
-        async with httpx.AsyncClient() as client:
-            # Get current prices from CryptoCompare
-            symbols = []
-            for coin_id in assets_to_trade:
-                if coin_id in CRYPTO_MAPPING:
-                    symbols.append(CRYPTO_MAPPING[coin_id]["binance_symbol"])
-            
-            symbols_str = ",".join(symbols)
-            
-            price_response = await client.get(
-                f"{CRYPTOCOMPARE_API_URL}/pricemultifull",
-                params={"fsyms": symbols_str, "tsyms": "USD"},
-                timeout=15.0
-            )
-            
-            if price_response.status_code != 200:
-                return {"error": "Impossible de récupérer les prix", "trades": []}
-            
-            price_data = price_response.json().get("RAW", {})
+    for coin_id in assets_to_trade:
+        if today_trades + len(executed_trades) >= max_daily_trades:
+            break
+        
+        if coin_id not in signals:
+            continue
+        
+        coin_info = CRYPTO_MAPPING[coin_id]
+        crypto_symbol = coin_info["binance_symbol"]
+        opportunity = dict(signals[coin_id])
+        current_price = opportunity["current_price"]
+        score = opportunity["score"]
+        reasons = opportunity["reasons"]
+        
+        # Determine action
+        if score >= min_score:
+            opportunity["action"] = "BUY"
+            opportunity["confidence"] = "HAUTE"
+            opportunities.append(opportunity)
             
-            # Analyze each asset
-            for coin_id in assets_to_trade:
-                if today_trades + len(executed_trades) >= max_daily_trades:
-                    break
-                
-                if coin_id not in CRYPTO_MAPPING:
-                    continue
+            # Execute trade
+            if balance >= max_trade_amount:
+                quantity = max_trade_amount / current_price
                 
-                coin_info = CRYPTO_MAPPING[coin_id]
-                crypto_symbol = coin_info["binance_symbol"]
-                
-                if crypto_symbol not in price_data or "USD" not in price_data[crypto_symbol]:
-                    continue
-                
-                usd_data = price_data[crypto_symbol]["USD"]
-                current_price = usd_data.get("PRICE", 0)
-                change_24h = usd_data.get("CHANGEPCT24HOUR", 0)
-                
-                if current_price <= 0:
-                    continue
+                # Calculate levels
+                stop_loss_pct = config.get("stop_loss_percent", 5.0)
+                take_profit_pct = config.get("take_profit_percent", 10.0)
                 
-                # Get historical data
-                hist_response = await client.get(
-                    f"{CRYPTOCOMPARE_API_URL}/histohour",
-                    params={"fsym": crypto_symbol, "tsym": "USD", "limit": 168},
-                    timeout=10.0
-                )
+                trade = {
+                    "id": str(uuid.uuid4()),
+                    "user_id": user_id,
+                    "coin_id": coin_id,
+                    "type": "buy",
+                    "source": "auto_trading",
+                    "quantity": quantity,
+                    "entry_price": current_price,
+                    "amount_usd": max_trade_amount,
+                    "stop_loss": current_price * (1 - stop_loss_pct / 100),
+                    "take_profit": current_price * (1 + take_profit_pct / 100),
+                    "score": score,
+                    "reasons": reasons,
+                    "status": "open",
+                    "created_at": datetime.now(timezone.utc).isoformat()
+                }
                 
-                if hist_response.status_code != 200:
-                    continue
+                await db.paper_trades.insert_one(trade)
+                await record_paper_trade(db, trade)
                 
-                hist_data = hist_response.json()
-                if hist_data.get("Response") != "Success" or "Data" not in hist_data:
-                    continue
+                # Update portfolio
+                portfolio = user.setdefault("portfolio", [])
+                existing = next((p for p in portfolio if p["coin_id"] == coin_id), None)
                 
-                data_points = hist_data["Data"]
-                if not isinstance(data_points, list) or len(data_points) < 50:
-                    continue
+                if existing:
+                    total_qty = existing["quantity"] + quantity
+                    total_cost = (existing["quantity"] * existing["avg_price"]) + max_trade_amount
+                    existing["quantity"] = total_qty
+                    existing["avg_price"] = total_cost / total_qty
+                else:
+                    portfolio.append({
+                        "coin_id": coin_id,
+                        "symbol": crypto_symbol,
+                        "quantity": quantity,
+                        "avg_price": current_price
+                    })
                 
-                prices = [float(d["close"]) for d in data_points if d.get("close")]
+                # Update balance
+                balance -= max_trade_amount
                 
-                # Calculate indicators
-                rsi = calculate_rsi(prices)
-                macd = calculate_macd(prices)
-                bb = calculate_bollinger_bands(prices)
-                ma = calculate_moving_averages(prices)
-                sr = calculate_support_resistance(prices)
+                await db.users.update_one(
+                    {"id": user_id},
+                    {"$set": {"paper_balance": balance, "portfolio": portfolio}}
+                )
+                user_cache.invalidate(user_id)
                 
-                # Calculate score
-                score = 0
-                reasons = []
+                executed_trades.append({
+                    "trade_id": trade["id"],
+                    "coin": coin_info["name"],
+                    "action": "BUY",
+                    "amount": max_trade_amount,
+                    "quantity": quantity,
+                    "price": current_price,
+                    "score": score,
+                    "stop_loss": trade["stop_loss"],
+                    "take_profit": trade["take_profit"]
+                })
                 
-                # RSI
-                if rsi < 25:
-                    score += 4
-                    reasons.append(f"RSI extrême ({rsi:.1f})")
-                elif rsi < 30:
-                    score += 3
-                    reasons.append(f"RSI survente ({rsi:.1f})")
-                elif rsi < 40:
-                    score += 2
-                elif rsi > 75:
-                    score -= 4
-                    reasons.append(f"RSI surachat ({rsi:.1f}) - VENTE")
-                elif rsi > 70:
-                    score -= 2
+                logger.info(f"Auto-trade executed: BUY {coin_id} for ${max_trade_amount} (score: {score})")
+        
+        elif score <= -min_score:
+            # Check if we have this asset in portfolio to sell
+            portfolio = user.get("portfolio", [])
+            holding = next((p for p in portfolio if p["coin_id"] == coin_id), None)
+            
+            if holding and holding["quantity"] > 0:
+                opportunity["action"] = "SELL"
+                opportunity["confidence"] = "HAUTE"
+                opportunities.append(opportunity)
                 
-                # Bollinger
-                if bb.get("position") == "oversold":
-                    score += 3
-                    reasons.append("Bollinger oversold")
-                elif bb.get("position") == "overbought":
-                    score -= 2
+                # Execute sell
+                sell_quantity = holding["quantity"]
+                sell_value = sell_quantity * current_price
                 
-                # Trend
-                trend = ma.get("trend", "neutral")
-                if trend == "strong_bullish":
-                    score += 3
-                    reasons.append("Tendance forte haussière")
-                elif trend == "bullish":
-                    score += 2
-                elif trend == "strong_bearish":
-                    score -= 3
-                    reasons.append("Tendance forte baissière - VENTE")
-                elif trend == "bearish":
-                    score -= 2
+                trade = {
+                    "id": str(uuid.uuid4()),
+                    "user_id": user_id,
+                    "coin_id": coin_id,
+                    "type": "sell",
+                    "source": "auto_trading",
+                    "quantity": sell_quantity,
+                    "entry_price": holding["avg_price"],
+                    "exit_price": current_price,
+                    "amount_usd": sell_value,
+                    "profit_loss": sell_value - (sell_quantity * holding["avg_price"]),
+                    "score": score,
+                    "reasons": reasons,
+                    "status": "closed",
+                    "created_at": datetime.now(timezone.utc).isoformat()
+                }
                 
-                # MACD
-                if macd.get("trend") == "bullish":
-                    score += 1.5
-                elif macd.get("trend") == "bearish":
-                    score -= 1.5
+                await db.paper_trades.insert_one(trade)
+                await record_paper_trade(db, trade)
                 
-                # 24h momentum
-                if change_24h < -5:
-                    score += 1  # Potential reversal
-                    reasons.append(f"Correction récente ({change_24h:.1f}%)")
+                # Remove from portfolio
+                portfolio = [p for p in portfolio if p["coin_id"] != coin_id]
+                user["portfolio"] = portfolio
+                balance += sell_value
                 
-                opportunity = {
-                    "coin_id": coin_id,
-                    "name": coin_info["name"],
-                    "symbol": crypto_symbol,
-                    "current_price": current_price,
-                    "change_24h": change_24h,
-                    "score": round(score, 1),
-                    "rsi": round(rsi, 1),
-                    "trend": trend,
-                    "reasons": reasons
-                }
+                await db.users.update_one(
+                    {"id": user_id},
+                    {"$set": {"paper_balance": balance, "portfolio": portfolio}}
+                )
+                user_cache.invalidate(user_id)
                 
-                # Determine action
-                if score >= min_score:
-                    opportunity["action"] = "BUY"
-                    opportunity["confidence"] = "HAUTE"
-                    opportunities.append(opportunity)
-                    
-                    # Execute trade
-                    if balance >= max_trade_amount:
-                        quantity = max_trade_amount / current_price
-                        
-                        # Calculate levels
-                        stop_loss_pct = config.get("stop_loss_percent", 5.0)
-                        take_profit_pct = config.get("take_profit_percent", 10.0)
-                        
-                        trade = {
-                            "id": f"auto_{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')}_{coin_id[:3]}",
-                            "user_id": user_id,
-                            "coin_id": coin_id,
-                            "type": "buy",
-                            "source": "auto_trading",
-                            "quantity": quantity,
-                            "entry_price": current_price,
-                            "amount_usd": max_trade_amount,
-                            "stop_loss": current_price * (1 - stop_loss_pct / 100),
-                            "take_profit": current_price * (1 + take_profit_pct / 100),
-                            "score": score,
-                            "reasons": reasons,
-                            "status": "open",
-                            "created_at": datetime.now(timezone.utc).isoformat()
-                        }
-                        
-                        await db.paper_trades.insert_one(trade)
-                        
-                        # Update portfolio
-                        portfolio = user.get("portfolio", [])
-                        existing = next((p for p in portfolio if p["coin_id"] == coin_id), None)
-                        
-                        if existing:
-                            total_qty = existing["quantity"] + quantity
-                            total_cost = (existing["quantity"] * existing["avg_price"]) + max_trade_amount
-                            existing["quantity"] = total_qty
-                            existing["avg_price"] = total_cost / total_qty
-                        else:
-                            portfolio.append({
-                                "coin_id": coin_id,
-                                "symbol": crypto_symbol,
-                                "quantity": quantity,
-                                "avg_price": current_price
-                            })
-                        
-                        # Update balance
-                        balance -= max_trade_amount
-                        
-                        await db.users.update_one(
-                            {"id": user_id},
-                            {"$set": {"paper_balance": balance, "portfolio": portfolio}}
-                        )
-                        
-                        executed_trades.append({
-                            "trade_id": trade["id"],
-                            "coin": coin_info["name"],
-                            "action": "BUY",
-                            "amount": max_trade_amount,
-                            "quantity": quantity,
-                            "price": current_price,
-                            "score": score,
-                            "stop_loss": trade["stop_loss"],
-                            "take_profit": trade["take_profit"]
-                        })
-                        
-                        logger.info(f"Auto-trade executed: BUY {coin_id} for ${max_trade_amount} (score: {score})")
+                executed_trades.append({
+                    "trade_id": trade["id"],
+                    "coin": coin_info["name"],
+                    "action": "SELL",
+                    "amount": sell_value,
+                    "quantity": sell_quantity,
+                    "price": current_price,
+                    "profit_loss": trade["profit_loss"],
+                    "score": score
+                })
                 
-                elif score <= -min_score:
-                    # Check if we have this asset in portfolio to sell
-                    portfolio = user.get("portfolio", [])
-                    holding = next((p for p in portfolio if p["coin_id"] == coin_id), None)
-                    
-                    if holding and holding["quantity"] > 0:
-                        opportunity["action"] = "SELL"
-                        opportunity["confidence"] = "HAUTE"
-                        opportunities.append(opportunity)
-                        
-                        # Execute sell
-                        sell_quantity = holding["quantity"]
-                        sell_value = sell_quantity * current_price
-                        
-                        trade = {
-                            "id": f"auto_{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')}_{coin_id[:3]}_sell",
-                            "user_id": user_id,
-                            "coin_id": coin_id,
-                            "type": "sell",
-                            "source": "auto_trading",
-                            "quantity": sell_quantity,
-                            "entry_price": holding["avg_price"],
-                            "exit_price": current_price,
-                            "amount_usd": sell_value,
-                            "profit_loss": sell_value - (sell_quantity * holding["avg_price"]),
-                            "score": score,
-                            "reasons": reasons,
-                            "status": "closed",
-                            "created_at": datetime.now(timezone.utc).isoformat()
-                        }
-                        
-                        await db.paper_trades.insert_one(trade)
-                        
-                        # Remove from portfolio
-                        portfolio = [p for p in portfolio if p["coin_id"] != coin_id]
-                        balance += sell_value
-                        
-                        await db.users.update_one(
-                            {"id": user_id},
-                            {"$set": {"paper_balance": balance, "portfolio": portfolio}}
-                        )
-                        
-                        executed_trades.append({
-                            "trade_id": trade["id"],
-                            "coin": coin_info["name"],
-                            "action": "SELL",
-                            "amount": sell_value,
-                            "quantity": sell_quantity,
-                            "price": current_price,
-                            "profit_loss": trade["profit_loss"],
-                            "score": score
-                        })
-                        
-                        logger.info(f"Auto-trade executed: SELL {coin_id} for ${sell_value:.2f} (score: {score})")
+                logger.info(f"Auto-trade executed: SELL {coin_id} for ${sell_value:.2f} (score: {score})")
+    
+    return {
+        "success": True,
+        "message": f"Scan terminé. {len(executed_trades)} trade(s) exécuté(s).",
+        "trades": executed_trades,
+        "opportunities": opportunities,
+        "new_balance": balance,
+        "remaining_daily_trades": max_daily_trades - today_trades - len(executed_trades)
+    }
+
+async def _count_auto_trades_today(user_id: str) -> int:
+    today_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    return await db.paper_trades.count_documents({
+        "user_id": user_id,
+        "source": "auto_trading",
+        "created_at": {"$gte": today_start.isoformat()}
+    })
+
+async def _run_auto_trading_for_user(user_id: str, signals: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Execute one user's auto-trades under their lock, from a fresh read of balance, portfolio and daily count"""
+    async with _auto_trading_lock(user_id):
+        user = await db.users.find_one(
+            {"id": user_id},
+            {"_id": 0, "id": 1, "paper_balance": 1, "portfolio": 1, "auto_trading_config": 1}
+        )
+        if not user or not user.get("auto_trading_config", {}).get("enabled"):
+            return {"error": "Auto-trading désactivé", "trades": []}
         
+        today_trades = await _count_auto_trades_today(user_id)
+        return await _execute_auto_trading_for_user(user, signals, today_trades)
+
+@api_router.post("/auto-trading/scan")
+async def auto_trading_scan(current_user: dict = Depends(get_current_user)):
+    """
+    Scan the market and execute auto-trades if conditions are met.
+    Only executes trades with HIGH confidence (score >= min_score).
+    """
+    user_id = current_user["id"]
+    
+    # Get user data
+    user = await db.users.find_one({"id": user_id}, {"_id": 0})
+    if not user:
+        return {"error": "Utilisateur non trouvé"}
+    
+    config = user.get("auto_trading_config", {})
+    if not config.get("enabled"):
+        return {"error": "Auto-trading désactivé", "trades": []}
+    
+    max_daily_trades = config.get("max_daily_trades", 5)
+    
+    # Check daily trade limit
+    today_trades = await _count_auto_trades_today(user_id)
+    
+    if today_trades >= max_daily_trades:
         return {
-            "success": True,
-            "message": f"Scan terminé. {len(executed_trades)} trade(s) exécuté(s).",
-            "trades": executed_trades,
-            "opportunities": opportunities,
-            "new_balance": balance,
-            "remaining_daily_trades": max_daily_trades - today_trades - len(executed_trades)
+            "message": f"Limite journalière atteinte ({max_daily_trades} trades)",
+            "trades": [],
+            "opportunities": []
         }
+    
+    try:
+        signals = await _compute_auto_trading_signals(config.get("assets_to_trade", ["bitcoin", "ethereum", "solana"]))
+        if signals is None:
+            return {"error": "Impossible de récupérer les prix", "trades": []}
+        
+        return await _run_auto_trading_for_user(user_id, signals)
         
     except Exception as e:
         logger.error(f"Auto-trading scan error: {e}")
         return {"error": f"Erreur lors du scan: {str(e)}", "trades": []}
 
+async def run_auto_trading_cycle():
+    """
+    Scheduled job: scan the market once for all users with auto-trading enabled.
+    Signals are computed once per distinct asset, then each user's trades are
+    dispatched with their own thresholds and daily limits.
+    """
+    users = await db.users.find(
+        {"auto_trading_config.enabled": True},
+        {"_id": 0, "id": 1, "paper_balance": 1, "portfolio": 1, "auto_trading_config": 1}
+    ).to_list(None)
+    
+    if not users:
+        return {"users": 0, "assets": 0, "trades": 0}
+    
+    # Today's auto-trade count for every user in one aggregation
+    today_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    counts = await db.paper_trades.aggregate([
+        {"$match": {
+            "user_id": {"$in": [u["id"] for u in users]},
+            "source": "auto_trading",
+            "created_at": {"$gte": today_start.isoformat()}
+        }},
+        {"$group": {"_id": "$user_id", "count": {"$sum": 1}}}
+    ]).to_list(None)
+    today_trades = {c["_id"]: c["count"] for c in counts}
+    
+    # Skip users who already hit their daily limit before fetching anything
+    users = [
+        u for u in users
+        if today_trades.get(u["id"], 0) < u["auto_trading_config"].get("max_daily_trades", 5)
+    ]
+    
+    assets = []
+    for user in users:
+        assets.extend(user["auto_trading_config"].get("assets_to_trade", ["bitcoin", "ethereum", "solana"]))
+    assets = list(dict.fromkeys(assets))
+    
+    if not assets:
+        return {"users": 0, "assets": 0, "trades": 0}
+    
+    try:
+        signals = await _compute_auto_trading_signals(assets)
+    except Exception as e:
+        logger.error(f"Auto-trading cycle market data error: {e}")
+        return {"error": str(e)}
+    
+    if signals is None:
+        logger.warning("Auto-trading cycle skipped: prices unavailable")
+        return {"error": "Impossible de récupérer les prix"}
+    
+    total_trades = 0
+    for user in users:
+        try:
+            result = await _run_auto_trading_for_user(user["id"], signals)
+            total_trades += len(result.get("trades", []))
+        except Exception as e:
+            logger.error(f"Auto-trading cycle error for user {user['id']}: {e}")
+    
+    logger.info(f"Auto-trading cycle: {len(users)} user(s), {len(signals)}/{len(assets)} asset(s) scored, {total_trades} trade(s)")
+    return {"users": len(users), "assets": len(signals), "trades": total_trades}
+
 @api_router.get("/auto-trading/history")
 async def get_auto_trading_history(
+    response: Response,
     limit: int = 20,
+    after: Optional[str] = None,
     current_user: dict = Depends(get_current_user)
 ):
-    """Get history of auto-trades"""
+    """Get history of auto-trades (stats cover the returned page, next page: ?after=<X-Next-Cursor>)"""
     user_id = current_user["id"]
     
-    trades = await db.paper_trades.find(
-        {"user_id": user_id, "source": "auto_trading"},
-        {"_id": 0}
-    ).sort("created_at", -1).limit(limit).to_list(limit)
+    trades, next_cursor = await fetch_page(
+        db.paper_trades, {"user_id": user_id, "source": "auto_trading"}, limit, after
+    )
+    set_next_cursor(response, next_cursor)
     
     # Calculate stats
     total_trades = len(trades)
@@ -6609,18 +6487,25 @@ async def check_auto_trading_exits(current_user: dict = Depends(get_current_user
                 if should_close:
                     sell_value = quantity * current_price
                     profit_loss = sell_value - trade.get("amount_usd", 0)
+                    closed_at = datetime.now(timezone.utc).isoformat()
                     
-                    # Update trade
-                    await db.paper_trades.update_one(
-                        {"id": trade["id"]},
+                    # Update trade (only if still open: a concurrent check may have closed it)
+                    result = await db.paper_trades.update_one(
+                        {"id": trade["id"], "status": "open"},
                         {"$set": {
                             "status": "closed",
                             "exit_price": current_price,
                             "profit_loss": profit_loss,
                             "close_reason": close_reason,
-                            "closed_at": datetime.now(timezone.utc).isoformat()
+                            "closed_at": closed_at
                         }}
                     )
+                    if not result.modified_count:
+                        continue
+                    
+                    # The exit lives on the closed buy doc (no extra paper_trades doc, which the
+                    # daily-limit counts and the history would pick up); the ledger gets a sell
+                    await record_paper_trade(db, exit_trade({**trade, "exit_price": current_price, "closed_at": closed_at}))
                     
                     # Update portfolio
                     portfolio = [p for p in portfolio if p["coin_id"] != coin_id]
@@ -6641,6 +6526,7 @@ async def check_auto_trading_exits(current_user: dict = Depends(get_current_user
                     {"id": user_id},
                     {"$set": {"paper_balance": balance, "portfolio": portfolio}}
                 )
+                user_cache.invalidate(user_id)
         
         return {
             "success": True,
@@ -7611,15 +7497,9 @@ async def send_test_newsletter(
     if not service.smtp_config:
         raise HTTPException(status_code=400, detail="SMTP non configuré")
     
-    # Generate newsletter content
-    market_data = await service.get_market_data()
-    trending = await service.get_trending_tokens()
-    top_trades = await service.get_top_traders_activity()
-    analysis = await service.generate_ai_analysis(market_data)
-    
-    html_content = service.generate_html_newsletter(
-        market_data, analysis, trending, top_trades
-    )
+    # Shared newsletter content, personalized with the admin's watchlist
+    content = await service.get_shared_content()
+    html_content = service.personalize(content, admin.get("watchlist"))
     
     # Send to specified email or admin email
     target_email = email or admin.get("email")
@@ -7636,7 +7516,7 @@ async def send_newsletter_now(admin: dict = Depends(get_admin_user)):
     from services.newsletter import get_newsletter_service
     
     service = get_newsletter_service(db)
-    result = await service.send_daily_newsletter()
+    result = await service.send_daily_newsletter(job_id=f"manual_{uuid.uuid4()}")
     
     return {
         "message": "Newsletter envoyée",
@@ -7681,6 +7561,7 @@ async def update_newsletter_subscription(
         {"id": current_user["id"]},
         {"$set": {"newsletter_subscribed": subscribed}}
     )
+    user_cache.invalidate(current_user["id"])
     return {"message": "Préférences mises à jour", "subscribed": subscribed}
 
 # ============== STARTUP EVENTS ==============
@@ -7692,6 +7573,45 @@ async def run_daily_newsletter():
     service = get_newsletter_service(db)
     await service.send_daily_newsletter()
 
+async def run_auto_trader_monitor():
+    """Scheduled job: ratchet trailing stops and close AutoTrader positions on SL/TP"""
+    symbols = auto_trader.monitored_symbols()
+    if not symbols:
+        await auto_trader.flush_stop_updates()
+        return []
+    try:
+        async with httpx.AsyncClient() as client:
+            response = await client.get(
+                f"{CRYPTOCOMPARE_API_URL}/pricemulti",
+                params={"fsyms": ",".join(symbols), "tsyms": "USD"},
+                timeout=15.0
+            )
+        if response.status_code != 200:
+            logger.warning(f"AutoTrader monitor: HTTP {response.status_code}")
+            return []
+        prices = {
+            symbol: data.get("USD")
+            for symbol, data in response.json().items() if isinstance(data, dict)
+        }
+    except Exception as e:
+        logger.error(f"AutoTrader monitor price error: {e}")
+        return []
+    return await auto_trader.check_prices(prices)
+
+async def resume_newsletter_jobs():
+    """Scheduled job resuming newsletter sends interrupted by a stopped worker"""
+    from services.newsletter import get_newsletter_service
+    await get_newsletter_service(db).resume_abandoned_jobs()
+
+@app.on_event("startup")
+async def apply_index_manifest():
+    """Create the MongoDB indexes declared in core/indexes.py (idempotent)"""
+    try:
+        created = await ensure_indexes(db)
+        logger.info(f"Index manifest applied on {len(created)} collections")
+    except Exception as e:
+        logger.error(f"Index manifest error: {e}")
+
 @app.on_event("startup")
 async def start_scheduler():
     """Start the newsletter scheduler"""
@@ -7710,8 +7630,80 @@ async def start_scheduler():
         id="daily_newsletter",
         replace_existing=True
     )
+    scheduler.add_job(
+        resume_newsletter_jobs,
+        IntervalTrigger(seconds=NEWSLETTER_JOB_LEASE_SECONDS),
+        id="newsletter_job_recovery",
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True
+    )
+    await alert_engine.initialize(
+        db,
+        # CoinGecko id -> ticker of the shared candle store (also used by signal evaluation)
+        symbol_resolver=lambda symbol: CRYPTO_MAPPING.get(symbol, {}).get("binance_symbol", symbol.upper())
+    )
+    scheduler.add_job(
+        alert_engine.run_cycle,
+        IntervalTrigger(seconds=ALERT_ENGINE_INTERVAL_SECONDS),
+        id="smart_alert_engine",
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True
+    )
+    scheduler.add_job(
+        run_auto_trading_cycle,
+        IntervalTrigger(minutes=AUTO_TRADING_SCAN_INTERVAL_MINUTES),
+        id="auto_trading_cycle",
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True
+    )
+    await auto_trader.initialize(db)
+    scheduler.add_job(
+        run_auto_trader_monitor,
+        IntervalTrigger(seconds=AUTO_TRADER_MONITOR_SECONDS),
+        id="auto_trader_monitor",
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True
+    )
+    scheduler.add_job(
+        run_signal_evaluation_cycle,
+        IntervalTrigger(minutes=SIGNAL_EVALUATION_INTERVAL_MINUTES),
+        id="signal_evaluation_cycle",
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True
+    )
+    translation_cache.initialize(db)
+    conversation_memory.initialize(db)
+    market_context_service.initialize(
+        sources={"market": fetch_comprehensive_market_data, "top_markets": fetch_top_markets},
+        renderer=lambda snapshot: render_market_context(snapshot["market"])
+    )
+    scheduler.add_job(
+        market_context_service.refresh,
+        IntervalTrigger(seconds=MARKET_CONTEXT_REFRESH_SECONDS),
+        id="market_context_refresh",
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True,
+        next_run_time=datetime.now(timezone.utc)
+    )
+    scheduler.add_job(
+        leaderboard_snapshot.refresh,
+        IntervalTrigger(seconds=LEADERBOARD_TTL_SECONDS),
+        args=[db],
+        id="academy_leaderboard_refresh",
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True
+    )
     scheduler.start()
     logger.info(f"Newsletter scheduler started - sends at {hour:02d}:{minute:02d} Europe/Paris")
+    logger.info(f"Auto-trading scanner started - every {AUTO_TRADING_SCAN_INTERVAL_MINUTES} min")
+    logger.info(f"Signal evaluator started - every {SIGNAL_EVALUATION_INTERVAL_MINUTES} min")
 
 @app.on_event("startup")
 async def create_admin_users():
@@ -7728,7 +7720,7 @@ async def create_admin_users():
             admin_doc = {
                 "id": admin_id,
                 "email": admin["email"],
-                "password": hash_password(admin["password"]),
+                "password": await hash_password(admin["password"]),
                 "name": admin["name"],
                 "trading_level": "advanced",
                 "created_at": datetime.now(timezone.utc).isoformat(),
@@ -7780,6 +7772,8 @@ app.add_middleware(
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    # Persist trailing stops moved since the last flush
+    await auto_trader.flush_stop_updates()
     client.close()
 
 
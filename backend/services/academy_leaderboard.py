@@ -0,0 +1,110 @@
+"""
+Academy Leaderboard - Classement XP de l'académie en instantané partagé
+Le top est construit par une seule agrégation (tri sur l'index total_xp,
+$lookup restreint au nom de l'utilisateur) puis conservé en mémoire.
+L'instantané est invalidé quand un gain d'XP peut modifier le top,
+et reconstruit au plus tard après LEADERBOARD_TTL_SECONDS.
+"""
+import asyncio
+import os
+import time
+from typing import Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+LEADERBOARD_SIZE = 20
+# Durée de vie maximale de l'instantané
+LEADERBOARD_TTL_SECONDS = int(os.environ.get('LEADERBOARD_TTL_SECONDS', '60'))
+
+
+def leaderboard_pipeline(size: int = LEADERBOARD_SIZE) -> List[Dict]:
+    return [
+        {"$sort": {"total_xp": -1}},
+        {"$lookup": {
+            "from": "users",
+            "localField": "user_id",
+            "foreignField": "id",
+            "pipeline": [{"$project": {"_id": 0, "name": 1}}],
+            "as": "user"
+        }},
+        # Progression orpheline (utilisateur supprimé): ignorée comme auparavant
+        {"$match": {"user": {"$ne": []}}},
+        {"$limit": size},
+        {"$project": {
+            "_id": 0,
+            "user_id": 1,
+            "total_xp": {"$ifNull": ["$total_xp", 0]},
+            "badges_count": {"$size": {"$ifNull": ["$badges", []]}},
+            "name": {"$arrayElemAt": ["$user.name", 0]}
+        }}
+    ]
+
+
+class LeaderboardSnapshot:
+    """Top XP partagé entre toutes les requêtes (une reconstruction à la fois)"""
+
+    def __init__(self, size: int = LEADERBOARD_SIZE, ttl: int = LEADERBOARD_TTL_SECONDS):
+        self.size = size
+        self.ttl = ttl
+        self._entries: List[Dict] = []
+        self._built_at = 0.0
+        self._dirty = True
+        self._lock = asyncio.Lock()
+        self.rebuilds = 0
+
+    def _fresh(self) -> bool:
+        return not self._dirty and time.monotonic() - self._built_at < self.ttl
+
+    async def _rebuild(self, db):
+        self._dirty = False
+        entries = await db.academy_progress.aggregate(leaderboard_pipeline(self.size)).to_list(self.size)
+        self._entries = entries
+        self._built_at = time.monotonic()
+        self.rebuilds += 1
+
+    async def get(self, db) -> List[Dict]:
+        if not self._fresh():
+            async with self._lock:
+                if not self._fresh():
+                    await self._rebuild(db)
+        return self._entries
+
+    async def refresh(self, db):
+        """Reconstruction forcée (tâche planifiée)"""
+        async with self._lock:
+            await self._rebuild(db)
+
+    def record_xp(self, user_id: str, total_xp: int):
+        """
+        Appelé après chaque gain d'XP: invalide l'instantané seulement si
+        l'utilisateur y figure ou peut y entrer avec son nouveau total
+        """
+        if self._dirty:
+            return
+        entries = self._entries
+        if (len(entries) < self.size
+                or total_xp >= entries[-1]["total_xp"]
+                or any(entry["user_id"] == user_id for entry in entries)):
+            self._dirty = True
+
+    def invalidate(self):
+        self._dirty = True
+
+    def rank_of(self, user_id: str) -> Optional[int]:
+        for rank, entry in enumerate(self._entries, start=1):
+            if entry["user_id"] == user_id:
+                return rank
+        return None
+
+    def stats(self) -> Dict:
+        return {
+            "entries": len(self._entries),
+            "age_seconds": round(time.monotonic() - self._built_at, 1) if self._built_at else None,
+            "dirty": self._dirty,
+            "rebuilds": self.rebuilds
+        }
+
+
+# Instance globale
+leaderboard_snapshot = LeaderboardSnapshot()
@@ -11,8 +11,8 @@ import logging
 
 # Import des services
 from services.technical_indicators import TechnicalIndicators, SignalGenerator, RiskManager
-from services.telegram_notifier import TelegramNotifier
-from services.auto_trader import AutoTrader, AutoTradeConfig
+from services.telegram_notifier import TelegramNotifier, telegram_notifier
+from services.auto_trader import auto_trader, AutoTradeConfig
 from services.backtester import backtester
 from services.multi_timeframe import mtf_analyzer
 
@@ -76,8 +76,6 @@ class TechnicalAnalysisRequest(BaseModel):
 indicators = TechnicalIndicators()
 signal_generator = SignalGenerator()
 risk_manager = RiskManager()
-telegram_notifier = TelegramNotifier()
-auto_trader = AutoTrader()
 
 
 # ==================== HEALTH ====================
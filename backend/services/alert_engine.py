@@ -0,0 +1,406 @@
+"""
+Moteur d'alertes intelligentes pour BULL SAGE
+Évaluation continue côté serveur de toutes les alertes non déclenchées
+sur un flux de prix partagé, avec livraison push (SSE + Telegram)
+
+Les alertes d'indicateurs (RSI, croisement MACD, cassure Bollinger, pic de
+volume) sont évaluées sur un état d'indicateurs incrémental par
+(symbole, intervalle), mis à jour une fois par bougie clôturée et partagé
+par toutes les alertes qui le surveillent.
+"""
+
+import asyncio
+import os
+import time
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Set, Tuple
+import logging
+
+import httpx
+from pymongo import UpdateOne
+
+from services.candle_store import candle_store
+from services.streaming_indicators import IndicatorState
+from services.telegram_notifier import telegram_notifier
+
+logger = logging.getLogger(__name__)
+
+COINGECKO_API_URL = os.environ.get('COINGECKO_API_URL', 'https://api.coingecko.com/api/v3')
+# Intervalle d'évaluation du moteur (secondes)
+ALERT_ENGINE_INTERVAL_SECONDS = int(os.environ.get('ALERT_ENGINE_INTERVAL_SECONDS', '15'))
+# Nombre max d'ids par requête /simple/price
+PRICE_BATCH_SIZE = 100
+# Événements conservés par utilisateur pour /alerts/check (sans flux SSE ouvert)
+PENDING_EVENTS_PER_USER = 50
+# Événements non consultés au-delà de ce délai abandonnés (utilisateur inactif)
+PENDING_EVENTS_TTL_SECONDS = 24 * 3600
+
+# Conditions supportées par type d'alerte d'indicateur
+INDICATOR_ALERT_CONDITIONS = {
+    "rsi": ("above", "below"),            # value = seuil RSI
+    "volume": ("above",),                 # value = multiple du volume moyen (ex: 2.0)
+    "macd": ("crosses_up", "crosses_down"),
+    "bollinger": ("above", "below"),      # clôture au-dessus / en-dessous des bandes
+}
+DEFAULT_INDICATOR_INTERVAL = "1h"
+
+# Métrique de l'instantané comparée à un seuil
+_THRESHOLD_METRICS = {"rsi": "rsi", "volume": "volume_ratio"}
+# (type, condition) -> (champ de l'instantané, valeur attendue)
+_EVENT_MATCHES = {
+    ("macd", "crosses_up"): ("macd_cross", "up"),
+    ("macd", "crosses_down"): ("macd_cross", "down"),
+    ("bollinger", "above"): ("bb_break", "up"),
+    ("bollinger", "below"): ("bb_break", "down"),
+}
+
+
+class AlertEngine:
+    """Index des seuils par flux (prix ou indicateur), évalué par bisection à chaque tick"""
+
+    def __init__(self):
+        self.db = None
+        self.notifier = telegram_notifier
+        self.symbol_resolver: Callable[[str], str] = lambda symbol: symbol.upper()
+        self.alerts: Dict[str, Dict] = {}
+        # Listes triées de (seuil, alert_id) par clé de flux
+        # clé prix: ("price", symbole) ; clé indicateur: (symbole, intervalle, métrique)
+        self._above: Dict[Tuple, List[Tuple[float, str]]] = {}
+        self._below: Dict[Tuple, List[Tuple[float, str]]] = {}
+        # Abonnés aux événements (symbole, intervalle, champ, valeur) -> alert_ids
+        self._events: Dict[Tuple, Set[str]] = {}
+        # Alertes répétables déjà déclenchées par clé, réarmées quand la condition redevient fausse
+        self._fired_repeat: Dict[Tuple, Set[str]] = {}
+        # État des indicateurs partagé par (symbole, intervalle)
+        self._states: Dict[Tuple[str, str], IndicatorState] = {}
+        self.prices: Dict[str, float] = {}
+        self.last_tick: Optional[str] = None
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        # user_id -> (dernier ajout, événements), du moins au plus récemment alimenté
+        self._pending: "OrderedDict[str, Tuple[float, deque]]" = OrderedDict()
+        self._lock = asyncio.Lock()
+
+    async def initialize(self, db, symbol_resolver: Callable[[str], str] = None):
+        """Charge toutes les alertes non déclenchées dans l'index"""
+        self.db = db
+        if symbol_resolver:
+            self.symbol_resolver = symbol_resolver
+        self.alerts.clear()
+        self._above.clear()
+        self._below.clear()
+        self._events.clear()
+
+        async for alert in db.smart_alerts.find(
+            {"triggered": False, "alert_type": {"$in": ["price", *INDICATOR_ALERT_CONDITIONS]}},
+            {"_id": 0}
+        ):
+            self.add_alert(alert)
+
+        logger.info(f"✅ Moteur d'alertes initialisé avec {len(self.alerts)} alertes")
+
+    # ---------- Index ----------
+
+    def _key(self, alert: Dict) -> Optional[Tuple]:
+        """Clé de flux d'une alerte (None si le type n'est pas géré par le moteur)"""
+        alert_type = alert.get("alert_type")
+        if alert_type == "price":
+            return ("price", alert["symbol"]) if alert["condition"] in ("above", "below") else None
+
+        if alert["condition"] not in INDICATOR_ALERT_CONDITIONS.get(alert_type, ()):
+            return None
+        interval = alert.get("interval") or DEFAULT_INDICATOR_INTERVAL
+        if alert_type in _THRESHOLD_METRICS:
+            return (alert["symbol"], interval, _THRESHOLD_METRICS[alert_type])
+        return (alert["symbol"], interval, *_EVENT_MATCHES[(alert_type, alert["condition"])])
+
+    def add_alert(self, alert: Dict):
+        """Ajoute une alerte à l'index (création ou chargement)"""
+        if alert.get("triggered"):
+            return
+        key = self._key(alert)
+        if key is None:
+            return
+
+        self.alerts[alert["id"]] = alert
+        if alert["alert_type"] in ("price", *_THRESHOLD_METRICS):
+            book = self._above if alert["condition"] == "above" else self._below
+            insort(book.setdefault(key, []), (float(alert["value"]), alert["id"]))
+        else:
+            self._events.setdefault(key, set()).add(alert["id"])
+
+    def remove_alert(self, alert_id: str):
+        """Retire une alerte de l'index (suppression ou déclenchement)"""
+        alert = self.alerts.pop(alert_id, None)
+        if not alert:
+            return
+        key = self._key(alert)
+        self._fired_repeat.get(key, set()).discard(alert_id)
+
+        if alert["alert_type"] in ("price", *_THRESHOLD_METRICS):
+            book = self._above if alert["condition"] == "above" else self._below
+            entries = book.get(key, [])
+            entry = (float(alert["value"]), alert_id)
+            i = bisect_left(entries, entry)
+            if i < len(entries) and entries[i] == entry:
+                entries.pop(i)
+        else:
+            self._events.get(key, set()).discard(alert_id)
+
+    def symbols(self) -> List[str]:
+        """Symboles ayant au moins une alerte de prix active"""
+        keys = [k for k, v in self._above.items() if v] + [k for k, v in self._below.items() if v]
+        return list({k[1] for k in keys if k[0] == "price"})
+
+    def indicator_streams(self) -> List[Tuple[str, str]]:
+        """Couples (symbole, intervalle) ayant au moins une alerte d'indicateur active"""
+        keys = [k for k, v in self._above.items() if v] + [k for k, v in self._below.items() if v]
+        keys += [k for k, v in self._events.items() if v]
+        return list({(k[0], k[1]) for k in keys if k[0] != "price"})
+
+    def count_for_user(self, user_id: str) -> int:
+        return sum(1 for a in self.alerts.values() if a["user_id"] == user_id)
+
+    # ---------- Évaluation ----------
+
+    def _match_threshold(self, key: Tuple, value: float) -> List[str]:
+        """Ids des alertes à seuil dont la condition est remplie pour la valeur donnée"""
+        above = self._above.get(key, [])
+        below = self._below.get(key, [])
+        # above: seuil <= valeur ; below: seuil >= valeur
+        hits = [aid for _, aid in above[:bisect_right(above, (value, "\uffff"))]]
+        hits += [aid for _, aid in below[bisect_left(below, (value, "")):]]
+        return hits
+
+    def _collect(self, key: Tuple, alert_ids: List[str], observed: Dict, now: str, fired: List[Dict]):
+        """Ajoute les déclenchements d'une clé en tenant compte des alertes répétables"""
+        already_fired = self._fired_repeat.get(key, set())
+        still_true = set()
+        for alert_id in alert_ids:
+            alert = self.alerts[alert_id]
+            if alert.get("repeat"):
+                still_true.add(alert_id)
+                if alert_id in already_fired:
+                    continue
+            fired.append({**alert, **observed, "triggered_at": now})
+        self._fired_repeat[key] = still_true
+
+    def _evaluate_snapshot(self, symbol: str, interval: str, snapshot: Dict, now: str, fired: List[Dict]):
+        """Confronte un instantané d'indicateurs à toutes les alertes abonnées"""
+        observed = {"current_price": snapshot["close"], "interval": interval}
+
+        for metric in _THRESHOLD_METRICS.values():
+            value = snapshot.get(metric)
+            key = (symbol, interval, metric)
+            if value is None:
+                continue
+            self._collect(key, self._match_threshold(key, value), {**observed, "indicator_value": round(value, 2)}, now, fired)
+
+        for field, expected in _EVENT_MATCHES.values():
+            key = (symbol, interval, field, expected)
+            if key in self._events:
+                hits = list(self._events[key]) if snapshot.get(field) == expected else []
+                self._collect(key, hits, observed, now, fired)
+
+    async def evaluate(self, prices: Dict[str, float]) -> List[Dict]:
+        """Évalue toutes les alertes de prix sur un tick et livre les déclenchements"""
+        now = datetime.now(timezone.utc).isoformat()
+        fired = []
+
+        async with self._lock:
+            for symbol, price in prices.items():
+                if not price:
+                    continue
+                key = ("price", symbol)
+                self._collect(key, self._match_threshold(key, price), {"current_price": price}, now, fired)
+            self._drop_fired(fired)
+
+        await self._dispatch(fired, now)
+        return fired
+
+    async def evaluate_indicators(self) -> List[Dict]:
+        """Met à jour chaque état d'indicateurs avec ses nouvelles bougies et évalue les alertes"""
+        now = datetime.now(timezone.utc).isoformat()
+        fired = []
+
+        for symbol, interval in self.indicator_streams():
+            ticker = self.symbol_resolver(symbol)
+            try:
+                state = self._states.get((symbol, interval))
+                if state is None:
+                    # Premier abonné: amorçage sur l'historique, une seule évaluation finale
+                    candles = await candle_store.get_candles(ticker, interval)
+                    if not candles:
+                        continue
+                    state = IndicatorState()
+                    for candle in candles:
+                        state.update(candle)
+                    self._states[(symbol, interval)] = state
+                    snapshots = [state.snapshot()]
+                else:
+                    # Bougies postérieures à l'état, quel que soit le consommateur qui a rafraîchi le cache
+                    candles = await candle_store.get_candles(ticker, interval, since=(state.last_time or 0) + 1)
+                    snapshots = [state.update(c) for c in candles]
+            except Exception as e:
+                logger.error(f"Erreur indicateurs {symbol}/{interval}: {e}")
+                continue
+
+            async with self._lock:
+                for snapshot in snapshots:
+                    start = len(fired)
+                    self._evaluate_snapshot(symbol, interval, snapshot, now, fired)
+                    self._drop_fired(fired[start:])
+
+        # Libérer les états qui n'ont plus d'abonnés
+        active = set(self.indicator_streams())
+        for stream in list(self._states):
+            if stream not in active:
+                del self._states[stream]
+
+        await self._dispatch(fired, now)
+        return fired
+
+    def _drop_fired(self, fired: List[Dict]):
+        for event in fired:
+            if not event.get("repeat"):
+                self.remove_alert(event["id"])
+
+    async def _dispatch(self, fired: List[Dict], now: str):
+        if fired:
+            await self._persist(fired, now)
+            await self._deliver(fired)
+
+    async def _persist(self, fired: List[Dict], now: str):
+        """Marque les déclenchements en une seule écriture groupée"""
+        if self.db is None:
+            return
+
+        ops = []
+        for event in fired:
+            if event.get("repeat"):
+                ops.append(UpdateOne({"id": event["id"]}, {"$set": {"last_triggered_at": now}}))
+            else:
+                ops.append(UpdateOne({"id": event["id"]}, {"$set": {"triggered": True, "triggered_at": now}}))
+
+        try:
+            await self.db.smart_alerts.bulk_write(ops, ordered=False)
+        except Exception as e:
+            logger.error(f"Erreur persistance alertes: {e}")
+
+    async def _deliver(self, fired: List[Dict]):
+        """Pousse les déclenchements vers les flux SSE et Telegram"""
+        for event in fired:
+            user_id = event["user_id"]
+            delivered = False
+            for queue in self._subscribers.get(user_id, ()):
+                try:
+                    queue.put_nowait(event)
+                    delivered = True
+                except asyncio.QueueFull:
+                    logger.warning(f"File SSE pleine pour {user_id}, alerte {event['id']} ignorée")
+            # Conservé pour /alerts/check uniquement si aucun flux ne l'a reçu
+            if not delivered:
+                self._buffer(user_id, event)
+
+        if getattr(self.notifier, "enabled", False):
+            await asyncio.gather(*(self._notify(event) for event in fired), return_exceptions=True)
+
+    async def _notify(self, event: Dict) -> bool:
+        name = event.get("symbol_name", event["symbol"])
+        if event["alert_type"] == "price":
+            return await self.notifier.send_price_alert(
+                symbol=name,
+                current_price=event["current_price"],
+                target_price=event["value"],
+                condition=event["condition"]
+            )
+
+        message = f"""
+🔔 <b>ALERTE {event['alert_type'].upper()} - {name} ({event['interval']})</b>
+
+📊 {event['message']}
+💰 Prix: <b>${event['current_price']:,.2f}</b>
+"""
+        if "indicator_value" in event:
+            message += f"📈 Valeur: {event['indicator_value']}\n"
+        message += f"\n⏰ {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')} UTC"
+        return await self.notifier.send_message(message)
+
+    # ---------- Flux de prix partagé ----------
+
+    async def fetch_prices(self, symbols: List[str]) -> Dict[str, float]:
+        """Récupère les prix de tous les symboles surveillés (une requête par lot)"""
+        prices = {}
+        async with httpx.AsyncClient() as client:
+            for i in range(0, len(symbols), PRICE_BATCH_SIZE):
+                batch = symbols[i:i + PRICE_BATCH_SIZE]
+                try:
+                    response = await client.get(
+                        f"{COINGECKO_API_URL}/simple/price",
+                        params={"ids": ",".join(batch), "vs_currencies": "usd"},
+                        timeout=15.0
+                    )
+                    if response.status_code == 200:
+                        for symbol, data in response.json().items():
+                            prices[symbol] = data.get("usd", 0)
+                    else:
+                        logger.warning(f"Flux de prix alertes: HTTP {response.status_code}")
+                except Exception as e:
+                    logger.error(f"Erreur flux de prix alertes: {e}")
+        return prices
+
+    async def run_cycle(self) -> int:
+        """Tick planifié: un seul appel de prix pour toutes les alertes de tous les utilisateurs"""
+        fired = 0
+        symbols = self.symbols()
+        if symbols:
+            prices = await self.fetch_prices(symbols)
+            if prices:
+                self.prices.update(prices)
+                self.last_tick = datetime.now(timezone.utc).isoformat()
+                fired += len(await self.evaluate(prices))
+
+        if self.indicator_streams():
+            fired += len(await self.evaluate_indicators())
+
+        self._evict_pending()
+        return fired
+
+    # ---------- Abonnements ----------
+
+    def subscribe(self, user_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=100)
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: str, queue: asyncio.Queue):
+        queues = self._subscribers.get(user_id)
+        if queues:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[user_id]
+
+    def _buffer(self, user_id: str, event: Dict):
+        entry = self._pending.pop(user_id, None)
+        events = entry[1] if entry else deque(maxlen=PENDING_EVENTS_PER_USER)
+        events.append(event)
+        self._pending[user_id] = (time.monotonic(), events)
+
+    def _evict_pending(self):
+        """Abandonne les événements des utilisateurs qui ne consultent plus leurs alertes"""
+        cutoff = time.monotonic() - PENDING_EVENTS_TTL_SECONDS
+        while self._pending:
+            user_id, (updated_at, _) = next(iter(self._pending.items()))
+            if updated_at > cutoff:
+                break
+            del self._pending[user_id]
+
+    def drain_pending(self, user_id: str) -> List[Dict]:
+        """Déclenchements non encore consultés par l'utilisateur"""
+        entry = self._pending.pop(user_id, None)
+        return list(entry[1]) if entry else []
+
+
+# Instance globale
+alert_engine = AlertEngine()
@@ -5,15 +5,27 @@ Mode Paper Trading uniquement pour la sécurité
 """
 
 import asyncio
-from typing import Dict, List, Optional
+import os
+import time
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 from dataclasses import dataclass, field
 from enum import Enum
 import logging
 import uuid
 
+from pymongo import UpdateOne
+
+from core.user_cache import user_cache
+
 logger = logging.getLogger(__name__)
 
+# Délai max avant persistance des stops suiveurs déplacés (écriture groupée)
+TRAILING_STOP_FLUSH_SECONDS = 30
+# Intervalle de surveillance des positions ouvertes (SL/TP, stops suiveurs)
+AUTO_TRADER_MONITOR_SECONDS = int(os.environ.get('AUTO_TRADER_MONITOR_SECONDS', '30'))
+
 
 class TradeStatus(Enum):
     PENDING = "pending"
@@ -67,6 +79,8 @@ class AutoTrade:
     pnl: Optional[float] = None
     pnl_percent: Optional[float] = None
     close_reason: Optional[str] = None
+    trailing_stop_percent: Optional[float] = None
+    water_mark: Optional[float] = None  # Plus haut (long) / plus bas (short) depuis l'entrée
 
 
 class AutoTrader:
@@ -78,6 +92,13 @@ class AutoTrader:
         self.active_trades: Dict[str, List[AutoTrade]] = {}
         self.daily_stats: Dict[str, Dict] = {}
         self._lock = asyncio.Lock()
+        # Index des déclencheurs par symbole: listes triées de (prix, trade_id)
+        self._triggers: Dict[str, Dict[str, List[Tuple[float, str]]]] = {}
+        self._trades_by_id: Dict[str, AutoTrade] = {}
+        self._trailing: Dict[str, Dict[str, AutoTrade]] = {}
+        # Stops déplacés en attente de persistance {trade_id: {stop_loss, water_mark}}
+        self._pending_stops: Dict[str, Dict] = {}
+        self._last_stop_flush = time.monotonic()
     
     async def initialize(self, db):
         """Initialise le service avec la base de données"""
@@ -96,8 +117,32 @@ class AutoTrader:
                             max_daily_loss_percent=config_doc.get("max_daily_loss_percent", 5.0),
                             min_confluence_score=config_doc.get("min_confluence_score", 60.0),
                             allowed_symbols=config_doc.get("allowed_symbols", ["BTC", "ETH", "SOL"]),
-                            risk_per_trade_percent=config_doc.get("risk_per_trade_percent", 1.0)
+                            risk_per_trade_percent=config_doc.get("risk_per_trade_percent", 1.0),
+                            trailing_stop_enabled=config_doc.get("trailing_stop_enabled", False),
+                            trailing_stop_percent=config_doc.get("trailing_stop_percent", 2.0)
                         )
+                
+                # Recharger les positions ouvertes (stops suiveurs persistés inclus)
+                async for trade_doc in self.db.auto_trades.find({"status": "open"}, {"_id": 0}):
+                    trade = AutoTrade(
+                        id=trade_doc["id"],
+                        user_id=trade_doc["user_id"],
+                        symbol=trade_doc["symbol"],
+                        side=trade_doc["side"],
+                        entry_price=trade_doc["entry_price"],
+                        quantity=trade_doc["quantity"],
+                        position_value=trade_doc["position_value"],
+                        stop_loss=trade_doc["stop_loss"],
+                        take_profit=trade_doc["take_profit"],
+                        status="open",
+                        signal_score=trade_doc.get("signal_score", 0),
+                        signal_reason=trade_doc.get("signal_reason", ""),
+                        created_at=trade_doc.get("created_at", datetime.utcnow()),
+                        trailing_stop_percent=trade_doc.get("trailing_stop_percent"),
+                        water_mark=trade_doc.get("water_mark")
+                    )
+                    self.active_trades.setdefault(trade.user_id, []).append(trade)
+                    self._index_trade(trade)
                 logger.info(f"✅ AutoTrader initialisé avec {len(self.configs)} configurations")
             except Exception as e:
                 logger.warning(f"⚠️ Erreur chargement configs auto-trade: {e}")
@@ -317,10 +362,16 @@ class AutoTrader:
             created_at=datetime.utcnow()
         )
         
+        config = self.configs.get(user_id)
+        if config and config.trailing_stop_enabled:
+            trade.trailing_stop_percent = config.trailing_stop_percent
+            trade.water_mark = current_price
+        
         # Ajouter à la liste active
         if user_id not in self.active_trades:
             self.active_trades[user_id] = []
         self.active_trades[user_id].append(trade)
+        self._index_trade(trade)
         
         # Sauvegarder en base
         if self.db:
@@ -338,6 +389,8 @@ class AutoTrader:
                     "status": "open",
                     "signal_score": signal.get("confluence_score", 0),
                     "signal_reason": signal.get("reason", "Signal automatique"),
+                    "trailing_stop_percent": trade.trailing_stop_percent,
+                    "water_mark": trade.water_mark,
                     "created_at": datetime.utcnow()
                 })
                 
@@ -346,6 +399,7 @@ class AutoTrader:
                     {"id": user_id},
                     {"$inc": {"paper_balance": -position["position_value"]}}
                 )
+                user_cache.invalidate(user_id)
             except Exception as e:
                 logger.error(f"Erreur sauvegarde trade: {e}")
         
@@ -367,38 +421,125 @@ class AutoTrader:
             "take_profit": position["take_profit"]
         }
     
+    # ---------- Index des déclencheurs ----------
+    
+    def _index_trade(self, trade: AutoTrade):
+        """Enregistre les niveaux SL/TP d'un trade ouvert dans l'index du symbole"""
+        triggers = self._triggers.setdefault(trade.symbol.upper(), {
+            "long_sl": [], "long_tp": [], "short_sl": [], "short_tp": []
+        })
+        insort(triggers[f"{trade.side}_sl"], (trade.stop_loss, trade.id))
+        insort(triggers[f"{trade.side}_tp"], (trade.take_profit, trade.id))
+        self._trades_by_id[trade.id] = trade
+        
+        if trade.trailing_stop_percent:
+            if trade.water_mark is None:
+                trade.water_mark = trade.entry_price
+            self._trailing.setdefault(trade.symbol.upper(), {})[trade.id] = trade
+    
+    def _unindex_trade(self, trade: AutoTrade):
+        """Retire un trade de l'index (fermeture)"""
+        triggers = self._triggers.get(trade.symbol.upper())
+        if triggers:
+            for key, level in ((f"{trade.side}_sl", trade.stop_loss), (f"{trade.side}_tp", trade.take_profit)):
+                entries = triggers[key]
+                i = bisect_left(entries, (level, trade.id))
+                if i < len(entries) and entries[i] == (level, trade.id):
+                    entries.pop(i)
+        self._trades_by_id.pop(trade.id, None)
+        self._trailing.get(trade.symbol.upper(), {}).pop(trade.id, None)
+    
+    def _move_stop(self, trade: AutoTrade, new_stop: float):
+        """Déplace le stop d'un trade: re-clé dans l'index et persistance différée"""
+        entries = self._triggers[trade.symbol.upper()][f"{trade.side}_sl"]
+        i = bisect_left(entries, (trade.stop_loss, trade.id))
+        if i < len(entries) and entries[i] == (trade.stop_loss, trade.id):
+            entries.pop(i)
+        trade.stop_loss = new_stop
+        insort(entries, (new_stop, trade.id))
+        self._pending_stops[trade.id] = {"stop_loss": new_stop, "water_mark": trade.water_mark}
+    
+    def _update_trailing_stops(self, symbol: str, current_price: float):
+        """Met à jour le plus haut/plus bas de chaque position suiveuse en O(1)"""
+        for trade in self._trailing.get(symbol, {}).values():
+            pct = trade.trailing_stop_percent / 100
+            if trade.side == "long":
+                if current_price <= trade.water_mark:
+                    continue
+                trade.water_mark = current_price
+                new_stop = round(current_price * (1 - pct), 2)
+                if new_stop > trade.stop_loss:
+                    self._move_stop(trade, new_stop)
+            else:
+                if current_price >= trade.water_mark:
+                    continue
+                trade.water_mark = current_price
+                new_stop = round(current_price * (1 + pct), 2)
+                if new_stop < trade.stop_loss:
+                    self._move_stop(trade, new_stop)
+    
+    async def flush_stop_updates(self):
+        """Persiste en une écriture groupée les stops suiveurs déplacés"""
+        self._last_stop_flush = time.monotonic()
+        if not self._pending_stops:
+            return
+        
+        pending, self._pending_stops = self._pending_stops, {}
+        if self.db is None:
+            return
+        
+        try:
+            await self.db.auto_trades.bulk_write([
+                UpdateOne({"id": trade_id, "status": "open"}, {"$set": fields})
+                for trade_id, fields in pending.items()
+            ], ordered=False)
+        except Exception as e:
+            logger.error(f"Erreur persistance stops suiveurs: {e}")
+    
     async def check_stop_loss_take_profit(self, symbol: str, current_price: float) -> List[Dict]:
         """Vérifie les SL/TP pour tous les trades actifs"""
         
+        symbol = symbol.upper()
         closed_trades = []
         
-        for user_id, trades in self.active_trades.items():
-            for trade in trades:
-                if trade.symbol.upper() != symbol.upper() or trade.status != "open":
-                    continue
-                
-                should_close = False
-                close_reason = ""
-                
-                if trade.side == "long":
-                    if current_price <= trade.stop_loss:
-                        should_close = True
-                        close_reason = "STOP_LOSS"
-                    elif current_price >= trade.take_profit:
-                        should_close = True
-                        close_reason = "TAKE_PROFIT"
-                else:
-                    if current_price >= trade.stop_loss:
-                        should_close = True
-                        close_reason = "STOP_LOSS"
-                    elif current_price <= trade.take_profit:
-                        should_close = True
-                        close_reason = "TAKE_PROFIT"
-                
-                if should_close:
+        self._update_trailing_stops(symbol, current_price)
+        
+        triggers = self._triggers.get(symbol)
+        if triggers:
+            # Long: SL si prix <= stop, TP si prix >= objectif
+            # Short: SL si prix >= stop, TP si prix <= objectif
+            hits = {}
+            for _, trade_id in triggers["long_sl"][bisect_left(triggers["long_sl"], (current_price, "")):]:
+                hits.setdefault(trade_id, "STOP_LOSS")
+            for _, trade_id in triggers["short_sl"][:bisect_right(triggers["short_sl"], (current_price, "\uffff"))]:
+                hits.setdefault(trade_id, "STOP_LOSS")
+            for _, trade_id in triggers["long_tp"][:bisect_right(triggers["long_tp"], (current_price, "\uffff"))]:
+                hits.setdefault(trade_id, "TAKE_PROFIT")
+            for _, trade_id in triggers["short_tp"][bisect_left(triggers["short_tp"], (current_price, "")):]:
+                hits.setdefault(trade_id, "TAKE_PROFIT")
+            
+            for trade_id, close_reason in hits.items():
+                trade = self._trades_by_id.get(trade_id)
+                if trade and trade.status == "open":
                     result = await self._close_trade(trade, current_price, close_reason)
                     closed_trades.append(result)
         
+        if time.monotonic() - self._last_stop_flush >= TRAILING_STOP_FLUSH_SECONDS:
+            await self.flush_stop_updates()
+        
+        return closed_trades
+    
+    def monitored_symbols(self) -> List[str]:
+        """Symboles ayant au moins une position ouverte"""
+        return [symbol for symbol, triggers in self._triggers.items() if any(triggers.values())]
+    
+    async def check_prices(self, prices: Dict[str, float]) -> List[Dict]:
+        """Passe de surveillance planifiée: un prix par symbole surveillé"""
+        closed_trades = []
+        async with self._lock:
+            for symbol, price in prices.items():
+                if price:
+                    closed_trades += await self.check_stop_loss_take_profit(symbol, price)
         return closed_trades
     
     async def _close_trade(self, trade: AutoTrade, exit_price: float, reason: str) -> Dict:
@@ -420,6 +561,9 @@ class AutoTrader:
         trade.pnl_percent = pnl_percent
         trade.close_reason = reason
         
+        self._unindex_trade(trade)
+        self._pending_stops.pop(trade.id, None)
+        
         # Mettre à jour en base
         if self.db:
             try:
@@ -431,7 +575,9 @@ class AutoTrader:
                         "closed_at": trade.closed_at,
                         "pnl": pnl,
                         "pnl_percent": pnl_percent,
-                        "close_reason": reason
+                        "close_reason": reason,
+                        "stop_loss": trade.stop_loss,
+                        "water_mark": trade.water_mark
                     }}
                 )
                 
@@ -440,6 +586,7 @@ class AutoTrader:
                     {"id": trade.user_id},
                     {"$inc": {"paper_balance": trade.position_value + pnl}}
                 )
+                user_cache.invalidate(trade.user_id)
             except Exception as e:
                 logger.error(f"Erreur fermeture trade: {e}")
         
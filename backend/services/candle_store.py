@@ -0,0 +1,136 @@
+"""
+Candle Store - Bougies OHLCV partagées par (symbole, intervalle)
+Une seule récupération CryptoCompare par bougie clôturée, quel que soit
+le nombre de consommateurs (alertes, évaluation des signaux...)
+"""
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+import logging
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+CRYPTOCOMPARE_API_URL = "https://min-api.cryptocompare.com/data"
+
+# intervalle -> (endpoint CryptoCompare, aggregate, durée en secondes)
+INTERVALS = {
+    "1m": ("histominute", 1, 60),
+    "5m": ("histominute", 5, 300),
+    "15m": ("histominute", 15, 900),
+    "1h": ("histohour", 1, 3600),
+    "4h": ("histohour", 4, 14400),
+    "1d": ("histoday", 1, 86400),
+}
+
+# Bougies conservées en mémoire par (symbole, intervalle)
+MAX_CANDLES = int(os.environ.get('CANDLE_STORE_MAX_CANDLES', '1000'))
+# Bougies chargées au premier accès
+WARMUP_CANDLES = 200
+
+
+class CandleStore:
+    """Cache mémoire de bougies clôturées, rafraîchi au plus une fois par bougie"""
+
+    def __init__(self, max_candles: int = MAX_CANDLES):
+        self.max_candles = max_candles
+        self._candles: Dict[Tuple[str, str], deque] = {}
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+
+    @staticmethod
+    def interval_seconds(interval: str) -> int:
+        return INTERVALS[interval][2]
+
+    def _is_stale(self, key: Tuple[str, str], now: float) -> bool:
+        candles = self._candles.get(key)
+        if not candles:
+            return True
+        # La bougie suivante est clôturée une fois sa propre durée écoulée
+        step = INTERVALS[key[1]][2]
+        return now >= candles[-1]["time"] + 2 * step
+
+    async def _fetch(self, symbol: str, interval: str, limit: int) -> List[Dict]:
+        endpoint, aggregate, step = INTERVALS[interval]
+        async with httpx.AsyncClient() as client:
+            response = await client.get(
+                f"{CRYPTOCOMPARE_API_URL}/{endpoint}",
+                params={"fsym": symbol, "tsym": "USD", "limit": limit, "aggregate": aggregate},
+                timeout=15.0
+            )
+        if response.status_code != 200:
+            logger.warning(f"CandleStore {symbol}/{interval}: HTTP {response.status_code}")
+            return []
+
+        data = response.json()
+        if data.get("Response") != "Success":
+            return []
+
+        points = data.get("Data", [])
+        if isinstance(points, dict):
+            points = points.get("Data", [])
+
+        now = time.time()
+        candles = []
+        for p in points:
+            # Ignorer la bougie en cours de formation et les trous sans cotation
+            if p["time"] + step > now or not p.get("close"):
+                continue
+            candles.append({
+                "time": p["time"],
+                "open": float(p["open"]),
+                "high": float(p["high"]),
+                "low": float(p["low"]),
+                "close": float(p["close"]),
+                "volume": float(p.get("volumefrom", 0) or 0)
+            })
+        return candles
+
+    async def _refresh(self, symbol: str, interval: str) -> List[Dict]:
+        """
+        Met à jour le cache si une nouvelle bougie est clôturée.
+        Retourne les bougies ajoutées par cet appel uniquement: le cache étant partagé,
+        un autre consommateur peut les avoir déjà ajoutées (utiliser get_candles(since=...)).
+        """
+        symbol = symbol.upper()
+        key = (symbol, interval)
+        if not self._is_stale(key, time.time()):
+            return []
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            if not self._is_stale(key, time.time()):
+                return []
+
+            candles = self._candles.get(key)
+            if candles:
+                # Ne récupérer que ce qui manque depuis la dernière bougie connue
+                step = INTERVALS[interval][2]
+                missing = int((time.time() - candles[-1]["time"]) // step) + 1
+                fetched = await self._fetch(symbol, interval, min(missing, self.max_candles))
+            else:
+                fetched = await self._fetch(symbol, interval, WARMUP_CANDLES)
+                candles = self._candles.setdefault(key, deque(maxlen=self.max_candles))
+
+            last_time = candles[-1]["time"] if candles else 0
+            new = [c for c in fetched if c["time"] > last_time]
+            candles.extend(new)
+            return new
+
+    async def get_candles(self, symbol: str, interval: str, since: Optional[int] = None) -> List[Dict]:
+        """Bougies clôturées (optionnellement depuis un timestamp unix)"""
+        try:
+            await self._refresh(symbol, interval)
+        except Exception as e:
+            logger.error(f"CandleStore refresh {symbol}/{interval}: {e}")
+
+        candles = self._candles.get((symbol.upper(), interval), ())
+        if since is None:
+            return list(candles)
+        return [c for c in candles if c["time"] >= since]
+
+
+# Instance globale
+candle_store = CandleStore()
@@ -0,0 +1,163 @@
+"""
+Chat Memory - Mémoire de conversation bornée de l'assistant
+Seuls les derniers échanges sont renvoyés tels quels au modèle, dans un
+budget de tokens propre au modèle; les échanges plus anciens sont condensés
+dans un résumé glissant (collection chat_memory), généré en tâche de fond
+après la réponse et jamais sur le chemin de la requête.
+"""
+import asyncio
+import os
+from typing import Dict, List, Optional, Tuple
+import logging
+
+from services.llm_gateway import llm_gateway, estimate_tokens, PRIORITY_BATCH
+
+logger = logging.getLogger(__name__)
+
+# Échanges (question + réponse) conservés mot pour mot
+CHAT_MEMORY_TURNS = int(os.environ.get('CHAT_MEMORY_TURNS', '10'))
+# Échanges sortis de la fenêtre accumulés avant de relancer le résumé
+SUMMARY_BATCH_TURNS = 4
+SUMMARY_MODEL = "grok-3-fast"
+SUMMARY_MAX_TOKENS = 600
+# Échanges repris au plus par résumé (les plus récents hors fenêtre)
+SUMMARY_MAX_FOLD_TURNS = 40
+
+# Budget de tokens des échanges renvoyés au modèle (hors prompt système et résumé)
+MODEL_HISTORY_BUDGETS = {
+    "grok-3-latest": 6000,
+    "grok-3-fast": 4000,
+}
+DEFAULT_HISTORY_BUDGET = 4000
+
+
+def history_budget(model: str) -> int:
+    return MODEL_HISTORY_BUDGETS.get(model, DEFAULT_HISTORY_BUDGET)
+
+
+def summary_message(summary: str) -> Dict:
+    return {"role": "system", "content": f"Résumé de la conversation précédente:\n{summary}"}
+
+
+def fit_history(history: List[Dict], model: str, max_turns: int = CHAT_MEMORY_TURNS) -> List[Dict]:
+    """
+    Derniers messages (hors message système) dans la fenêtre et le budget du modèle.
+    Les échanges les plus anciens sont retirés en premier, par paire question/réponse.
+    """
+    window = history[-max_turns * 2:] if max_turns else history[-1:]
+    if window and window[0]["role"] == "assistant":
+        window = window[1:]
+    budget = history_budget(model)
+    # Le dernier message (question en cours) est toujours conservé
+    while len(window) > 1 and estimate_tokens(window) > budget:
+        window = window[2:] if len(window) > 2 and window[0]["role"] == "user" else window[1:]
+    return window
+
+
+def _turn_messages(turn: Dict) -> List[Dict]:
+    return [
+        {"role": "user", "content": turn.get("message", "")},
+        {"role": "assistant", "content": turn.get("response", "")},
+    ]
+
+
+class ConversationMemory:
+    """Fenêtre + résumé glissant par utilisateur, à partir de chat_history"""
+
+    def __init__(self, turns: int = CHAT_MEMORY_TURNS):
+        self.turns = turns
+        self.db = None
+        # Un seul résumé en cours par utilisateur
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def initialize(self, db):
+        self.db = db
+
+    async def _state(self, user_id: str) -> Dict:
+        return await self.db.chat_memory.find_one({"user_id": user_id}, {"_id": 0}) or {}
+
+    async def window(self, user_id: str, limit: Optional[int] = None,
+                     projection: Optional[Dict] = None) -> List[Dict]:
+        """Derniers échanges de la fenêtre, du plus ancien au plus récent"""
+        limit = min(limit or self.turns, self.turns)
+        turns = await self.db.chat_history.find(
+            {"user_id": user_id},
+            projection or {"_id": 0, "message": 1, "response": 1, "timestamp": 1}
+        ).sort("timestamp", -1).limit(limit).to_list(limit)
+        return list(reversed(turns))
+
+    async def load(self, user_id: str) -> Tuple[Optional[str], List[Dict]]:
+        """(résumé, messages user/assistant de la fenêtre) à injecter dans LlmChat"""
+        state, turns = await asyncio.gather(self._state(user_id), self.window(user_id))
+        summarized_until = state.get("summarized_until")
+        messages = []
+        for turn in turns:
+            if summarized_until and turn.get("timestamp", "") <= summarized_until:
+                continue
+            messages.extend(_turn_messages(turn))
+        return state.get("summary"), messages
+
+    def schedule_summary(self, user_id: str):
+        """Relance le résumé en tâche de fond si assez d'échanges sont sortis de la fenêtre"""
+        if self.db is None:
+            return
+        task = self._tasks.get(user_id)
+        if task and not task.done():
+            return
+        task = asyncio.create_task(self._summarize(user_id))
+        self._tasks[user_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(user_id, None))
+
+    async def _summarize(self, user_id: str):
+        try:
+            state = await self._state(user_id)
+            query = {"user_id": user_id}
+            if state.get("summarized_until"):
+                query["timestamp"] = {"$gt": state["summarized_until"]}
+            # Échanges non résumés, hors fenêtre (la fenêtre est sautée)
+            overflow = await self.db.chat_history.find(
+                query, {"_id": 0, "message": 1, "response": 1, "timestamp": 1}
+            ).sort("timestamp", -1).skip(self.turns).limit(SUMMARY_MAX_FOLD_TURNS).to_list(SUMMARY_MAX_FOLD_TURNS)
+            if len(overflow) < SUMMARY_BATCH_TURNS:
+                return
+            overflow.reverse()
+
+            transcript = "\n\n".join(
+                f"Utilisateur: {turn.get('message', '')}\nBULL SAGE: {turn.get('response', '')}"
+                for turn in overflow
+            )
+            prompt = f"""Mets à jour le résumé d'une conversation entre un trader et son assistant BULL SAGE.
+Conserve les faits utiles pour la suite: actifs suivis, positions et niveaux évoqués,
+objectifs, préférences et conseils déjà donnés. 10 lignes maximum, en français.
+
+Résumé actuel:
+{state.get('summary') or 'Aucun'}
+
+Nouveaux échanges:
+{transcript}"""
+
+            response = await llm_gateway.complete(
+                PRIORITY_BATCH,
+                model=SUMMARY_MODEL,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.3,
+                max_tokens=SUMMARY_MAX_TOKENS
+            )
+            summary = (response.choices[0].message.content or "").strip()
+            if not summary:
+                return
+
+            await self.db.chat_memory.update_one(
+                {"user_id": user_id},
+                {"$set": {"summary": summary, "summarized_until": overflow[-1]["timestamp"]}},
+                upsert=True
+            )
+        except Exception as e:
+            logger.error(f"Chat summary error for {user_id}: {e}")
+
+    async def clear(self, user_id: str):
+        await self.db.chat_memory.delete_many({"user_id": user_id})
+
+
+# Instance globale
+conversation_memory = ConversationMemory()
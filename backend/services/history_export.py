@@ -0,0 +1,145 @@
+"""
+History Export - Export de l'historique utilisateur en NDJSON ou CSV
+Les documents sont lus par lots depuis un curseur Motor et sérialisés au fil
+de l'eau: la mémoire reste constante quel que soit le volume exporté.
+Les filtres de dates s'appuient sur les index (user_id, date) du manifeste.
+"""
+import csv
+import io
+import json
+import os
+from datetime import datetime, timezone, timedelta
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+# Documents lus par aller-retour MongoDB
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', '1000'))
+# Lignes accumulées avant l'envoi d'un fragment de réponse
+ROWS_PER_CHUNK = 200
+
+# Par jeu de données: segments (filtre, champ date, format de date) et colonnes CSV.
+# Les trades paper ont deux formes: manuels/Smart Invest (timestamp) et
+# auto-trading (created_at seul); chacune est lue sur son propre index.
+EXPORT_DATASETS: Dict[str, Dict] = {
+    "journal": {
+        "collection": "journal",
+        "segments": [({}, "created_at", "iso")],
+        "columns": ["id", "symbol", "symbol_name", "trade_type", "entry_price", "exit_price", "quantity",
+                    "entry_date", "exit_date", "timeframe", "stop_loss", "take_profit", "risk_reward_ratio",
+                    "status", "pnl_amount", "pnl_percent", "emotion_before", "emotion_after",
+                    "strategy_used", "reason_entry", "reason_exit", "lessons_learned", "created_at"],
+    },
+    "paper_trades": {
+        "collection": "paper_trades",
+        "segments": [
+            ({}, "timestamp", "iso"),
+            ({"timestamp": None}, "created_at", "iso"),
+        ],
+        "columns": ["id", "symbol", "coin_id", "type", "source", "amount", "quantity", "price",
+                    "entry_price", "exit_price", "total_value", "amount_usd", "profit_loss",
+                    "status", "timestamp", "created_at"],
+    },
+    "auto_trades": {
+        "collection": "auto_trades",
+        # Dates stockées en datetime UTC naïf par l'auto-trader
+        "segments": [({}, "created_at", "naive_datetime")],
+        "columns": ["id", "symbol", "side", "entry_price", "exit_price", "quantity", "position_value",
+                    "stop_loss", "take_profit", "status", "pnl", "pnl_percent", "close_reason",
+                    "signal_score", "signal_reason", "created_at", "closed_at"],
+    },
+    "signals": {
+        "collection": "signals",
+        "segments": [({}, "created_at", "iso")],
+        "columns": ["id", "symbol", "symbol_name", "signal_type", "entry_price", "stop_loss",
+                    "take_profit_1", "take_profit_2", "timeframe", "confidence", "reason",
+                    "price_at_signal", "status", "result_pnl", "created_at", "hit_at"],
+    },
+}
+
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _parse_bound(value: str, is_end: bool) -> datetime:
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    if is_end and len(value) == 10:
+        # Date seule: la journée de fin est incluse
+        parsed += timedelta(days=1)
+    return parsed.astimezone(timezone.utc)
+
+
+def parse_date_range(start: Optional[str], end: Optional[str]) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """Bornes [start, end[ en UTC (ISO 8601, date seule acceptée); ValueError si invalide"""
+    start_at = _parse_bound(start, False) if start else None
+    end_at = _parse_bound(end, True) if end else None
+    if start_at and end_at and start_at >= end_at:
+        raise ValueError("start must be before end")
+    return start_at, end_at
+
+
+def _range(start_at: Optional[datetime], end_at: Optional[datetime], date_format: str) -> Dict:
+    def convert(moment):
+        if date_format == "naive_datetime":
+            return moment.replace(tzinfo=None)
+        return moment.isoformat()
+
+    condition = {}
+    if start_at:
+        condition["$gte"] = convert(start_at)
+    if end_at:
+        condition["$lt"] = convert(end_at)
+    # Sans borne: le document doit porter la date du segment
+    return condition or {"$ne": None}
+
+
+def _cursors(db, dataset: Dict, user_id: str, start_at, end_at):
+    collection = db[dataset["collection"]]
+    for extra, date_field, date_format in dataset["segments"]:
+        query = {"user_id": user_id, **extra, date_field: _range(start_at, end_at, date_format)}
+        yield collection.find(query, {"_id": 0, "user_id": 0}) \
+            .sort([(date_field, 1), ("id", 1)]) \
+            .batch_size(EXPORT_BATCH_SIZE)
+
+
+def _cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str, ensure_ascii=False)
+    return value
+
+
+def _json_default(value):
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+
+async def stream_export(db, dataset_name: str, user_id: str, export_format: str,
+                        start_at: Optional[datetime] = None,
+                        end_at: Optional[datetime] = None) -> AsyncIterator[str]:
+    """Fragments texte de l'export (une ligne par document)"""
+    dataset = EXPORT_DATASETS[dataset_name]
+    buffer = io.StringIO()
+    writer = None
+    if export_format == "csv":
+        columns: List[str] = dataset["columns"]
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+
+    rows = 0
+    for cursor in _cursors(db, dataset, user_id, start_at, end_at):
+        async for doc in cursor:
+            if writer:
+                writer.writerow([_cell(doc.get(column)) for column in columns])
+            else:
+                buffer.write(json.dumps(doc, default=_json_default, ensure_ascii=False))
+                buffer.write("\n")
+            rows += 1
+            if rows % ROWS_PER_CHUNK == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate(0)
+
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,224 @@
+"""
+Journal Stats - Statistiques du journal de trading matérialisées par utilisateur
+Chaque clôture de trade est intégrée en O(1) au document journal_stats
+(sommes courantes, état de la série, pic d'équité pour le drawdown).
+La lecture des statistiques se limite à une recherche indexée.
+
+Reconstruction / backfill:
+    python -m services.journal_stats            # tous les utilisateurs
+    python -m services.journal_stats <user_id>  # un utilisateur
+"""
+import asyncio
+import sys
+from datetime import datetime, timezone
+from typing import Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+# Tentatives d'écriture optimiste avant reconstruction complète
+MAX_UPDATE_RETRIES = 3
+
+
+def _key(value: str) -> str:
+    """Clé de sous-document sûre pour MongoDB (pas de '.' ni de '$')"""
+    return str(value).replace(".", "_").replace("$", "_")
+
+
+def empty_stats(user_id: str) -> Dict:
+    return {
+        "user_id": user_id,
+        "version": 0,
+        "total": 0,
+        "winning": 0,
+        "losing": 0,
+        "total_pnl": 0.0,
+        "win_pnl_sum": 0.0,
+        "loss_pnl_sum": 0.0,
+        "gross_profit": 0.0,
+        "gross_loss": 0.0,
+        "best_trade": None,
+        "worst_trade": None,
+        "rr_sum": 0.0,
+        "symbols": {},
+        "timeframes": {},
+        "weekdays": {},
+        "streak_status": None,
+        "streak_count": 0,
+        "cumulative_pnl": 0.0,
+        "equity_peak": 0.0,
+        "max_drawdown": 0.0,
+        "last_exit_date": None,
+    }
+
+
+def apply_closed_trade(stats: Dict, trade: Dict) -> Dict:
+    """Intègre un trade clôturé aux statistiques (dans l'ordre des clôtures)"""
+    status = trade["status"]
+    pnl = trade.get("pnl_percent", 0) or 0
+    is_win = status == "closed_profit"
+
+    stats["total"] += 1
+    stats["total_pnl"] += pnl
+    if is_win:
+        stats["winning"] += 1
+        stats["win_pnl_sum"] += pnl
+    elif status == "closed_loss":
+        stats["losing"] += 1
+        stats["loss_pnl_sum"] += pnl
+    if pnl > 0:
+        stats["gross_profit"] += pnl
+    elif pnl < 0:
+        stats["gross_loss"] += -pnl
+    stats["best_trade"] = pnl if stats["best_trade"] is None else max(stats["best_trade"], pnl)
+    stats["worst_trade"] = pnl if stats["worst_trade"] is None else min(stats["worst_trade"], pnl)
+    stats["rr_sum"] += trade.get("risk_reward_ratio", 0) or 0
+
+    # Compteur par clé sûre, symbole d'affichage conservé à côté
+    name = trade.get("symbol", "unknown")
+    symbol = stats["symbols"].get(_key(name))
+    if not isinstance(symbol, dict):
+        # Ancien format: compteur seul
+        symbol = stats["symbols"][_key(name)] = {"name": name, "count": symbol or 0}
+    symbol["count"] += 1
+
+    timeframe = stats["timeframes"].setdefault(_key(trade.get("timeframe", "unknown")), {"wins": 0, "total": 0})
+    timeframe["total"] += 1
+    timeframe["wins"] += int(is_win)
+
+    exit_date = trade.get("exit_date")
+    if exit_date:
+        weekday = str(datetime.fromisoformat(exit_date.replace("Z", "+00:00")).weekday())
+        day = stats["weekdays"].setdefault(weekday, {"wins": 0, "total": 0})
+        day["total"] += 1
+        day["wins"] += int(is_win)
+        stats["last_exit_date"] = exit_date
+
+    # Série: même statut que la clôture précédente
+    if stats["streak_status"] == status:
+        stats["streak_count"] += 1
+    else:
+        stats["streak_status"] = status
+        stats["streak_count"] = 1
+
+    # Drawdown: écart entre le pic d'équité et l'équité courante
+    stats["cumulative_pnl"] += pnl
+    stats["equity_peak"] = max(stats["equity_peak"], stats["cumulative_pnl"])
+    stats["max_drawdown"] = max(stats["max_drawdown"], stats["equity_peak"] - stats["cumulative_pnl"])
+    return stats
+
+
+async def rebuild_journal_stats(db, user_id: str) -> Dict:
+    """Recalcule les statistiques d'un utilisateur en rejouant ses clôtures"""
+    stats = empty_stats(user_id)
+    cursor = db.journal.find(
+        {"user_id": user_id, "status": {"$ne": "open"}},
+        {"_id": 0, "status": 1, "pnl_percent": 1, "risk_reward_ratio": 1,
+         "symbol": 1, "timeframe": 1, "exit_date": 1}
+    ).sort("exit_date", 1)
+    async for trade in cursor:
+        apply_closed_trade(stats, trade)
+
+    stats["updated_at"] = datetime.now(timezone.utc).isoformat()
+    await db.journal_stats.replace_one({"user_id": user_id}, stats, upsert=True)
+    return stats
+
+
+async def rebuild_all_journal_stats(db) -> int:
+    """Backfill: reconstruit les statistiques de tous les utilisateurs ayant un journal"""
+    user_ids = await db.journal.distinct("user_id")
+    for user_id in user_ids:
+        await rebuild_journal_stats(db, user_id)
+    return len(user_ids)
+
+
+async def record_closed_trade(db, trade: Dict):
+    """
+    Intègre une clôture au document de l'utilisateur (lecture + écriture
+    conditionnée par la version, pour rester cohérent en cas de clôtures concurrentes)
+    """
+    user_id = trade["user_id"]
+    for _ in range(MAX_UPDATE_RETRIES):
+        stats = await db.journal_stats.find_one({"user_id": user_id}, {"_id": 0})
+        if stats is None:
+            # Première clôture ou utilisateur non migré: reconstruction complète
+            await rebuild_journal_stats(db, user_id)
+            return
+
+        version = stats.get("version", 0)
+        apply_closed_trade(stats, trade)
+        stats["version"] = version + 1
+        stats["updated_at"] = datetime.now(timezone.utc).isoformat()
+        result = await db.journal_stats.replace_one({"user_id": user_id, "version": version}, stats)
+        if result.matched_count:
+            return
+
+    logger.warning(f"Journal stats contention for {user_id}, rebuilding")
+    await rebuild_journal_stats(db, user_id)
+
+
+async def get_journal_stats(db, user_id: str) -> Optional[Dict]:
+    """Statistiques du journal (une recherche indexée, reconstruction si absent)"""
+    stats = await db.journal_stats.find_one({"user_id": user_id}, {"_id": 0})
+    if stats is None:
+        stats = await rebuild_journal_stats(db, user_id)
+    if not stats["total"]:
+        return None
+
+    total = stats["total"]
+    winning = stats["winning"]
+    losing = stats["losing"]
+    gross_profit = stats["gross_profit"]
+    gross_loss = stats["gross_loss"]
+
+    symbols = stats.get("symbols", {})
+    timeframes = stats.get("timeframes", {})
+    weekdays = stats.get("weekdays", {})
+
+    def _win_rate(bucket):
+        return bucket["wins"] / bucket["total"] if bucket["total"] > 0 else 0
+
+    def _count(bucket):
+        return bucket["count"] if isinstance(bucket, dict) else bucket
+
+    best_day = max(weekdays.items(), key=lambda x: _win_rate(x[1]))[0] if weekdays else None
+    most_traded = max(symbols.items(), key=lambda x: _count(x[1])) if symbols else None
+    streak = stats.get("streak_count", 0)
+
+    return {
+        "total_trades": total,
+        "winning_trades": winning,
+        "losing_trades": losing,
+        "win_rate": round(winning / total * 100, 1),
+        "total_pnl": round(stats["total_pnl"], 2),
+        "average_win": round(stats["win_pnl_sum"] / winning, 2) if winning else 0,
+        "average_loss": round(stats["loss_pnl_sum"] / losing, 2) if losing else 0,
+        "best_trade": round(stats["best_trade"] or 0, 2),
+        "worst_trade": round(stats["worst_trade"] or 0, 2),
+        "profit_factor": round(gross_profit / gross_loss if gross_loss > 0 else gross_profit, 2),
+        "average_rr": round(stats["rr_sum"] / total, 2),
+        "most_traded_symbol": (
+            most_traded[1].get("name", most_traded[0]) if isinstance(most_traded[1], dict) else most_traded[0]
+        ) if most_traded else "N/A",
+        "best_timeframe": max(timeframes.items(), key=lambda x: _win_rate(x[1]))[0] if timeframes else "N/A",
+        "best_day_of_week": WEEKDAYS[int(best_day)] if best_day is not None else "N/A",
+        "current_streak": streak if stats.get("streak_status") == "closed_profit" else -streak,
+        "max_drawdown": round(stats["max_drawdown"], 2)
+    }
+
+
+async def _main(args):
+    from core.config import db
+
+    if args:
+        for user_id in args:
+            stats = await rebuild_journal_stats(db, user_id)
+            print(f"{user_id}: {stats['total']} closed trades")
+    else:
+        count = await rebuild_all_journal_stats(db)
+        print(f"Journal stats rebuilt for {count} users")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main(sys.argv[1:]))
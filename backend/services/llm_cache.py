@@ -0,0 +1,115 @@
+"""
+LLM Response Cache - Réponses LLM réutilisées pendant une durée de vie
+La clé est le hash du modèle et des messages normalisés (espaces compactés):
+un même prompt envoyé par plusieurs utilisateurs dans la fenêtre ne coûte
+qu'un appel. Les appels simultanés sur un même prompt sont regroupés.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Tuple
+import logging
+
+from services.llm_gateway import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get('LLM_CACHE_MAX_ENTRIES', '500'))
+
+
+def prompt_key(model: str, messages: List[Dict]) -> str:
+    normalized = [
+        [message.get("role"), " ".join(str(message.get("content") or "").split())]
+        for message in messages
+    ]
+    raw = json.dumps([model, normalized], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LeaderCancelled(Exception):
+    """L'appel regroupé a été annulé: chaque appelant en attente relance le sien"""
+
+
+class LlmResponseCache:
+    def __init__(self, max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        # clé -> (expiration, réponse, tokens estimés)
+        self._entries: "OrderedDict[str, Tuple[float, str, int]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.tokens_saved = 0
+
+    async def get_or_call(self, model: str, messages: List[Dict], ttl: int,
+                          call: Callable[[], Awaitable[str]]) -> str:
+        """
+        Réponse en cache pour ce prompt, sinon `call()` (un seul appel par prompt).
+        Les erreurs ne sont pas mises en cache.
+        """
+        key = prompt_key(model, messages)
+        entry = self._entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.tokens_saved += entry[2]
+            return entry[1]
+
+        future = self._inflight.get(key)
+        if future is not None:
+            try:
+                response = await asyncio.shield(future)
+            except LeaderCancelled:
+                # La requête qui portait l'appel a été annulée: celle-ci prend le relais
+                return await self.get_or_call(model, messages, ttl, call)
+            self.coalesced += 1
+            self.tokens_saved += estimate_tokens(messages) + len(response) // 4
+            return response
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        self.misses += 1
+        try:
+            response = await call()
+        except asyncio.CancelledError:
+            # Les appelants regroupés ne sont pas annulés avec la requête d'origine
+            future.set_exception(LeaderCancelled())
+            future.exception()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Évite l'avertissement "exception never retrieved" sans appel regroupé
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        if response:
+            self._entries[key] = (time.monotonic() + ttl, response, estimate_tokens(messages) + len(response) // 4)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        future.set_result(response)
+        return response
+
+    def stats(self) -> Dict:
+        now = time.monotonic()
+        lookups = self.hits + self.coalesced + self.misses
+        return {
+            "entries": len(self._entries),
+            "live_entries": sum(1 for expires_at, _, _ in self._entries.values() if expires_at > now),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "coalesced": self.coalesced,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.coalesced) / lookups, 3) if lookups else None,
+            "tokens_saved": self.tokens_saved,
+            "inflight": len(self._inflight)
+        }
+
+
+# Instance globale
+llm_response_cache = LlmResponseCache()
@@ -0,0 +1,209 @@
+"""
+LLM Gateway - Point d'accès unique aux API LLM (xAI, compatible OpenAI)
+- un client AsyncOpenAI partagé par clé d'API (pool de connexions HTTP réutilisé)
+- file d'attente à priorités: chat interactif avant analyses, traductions et newsletter
+- nombre de requêtes simultanées borné et budget de tokens par minute
+- métriques: profondeur de file, temps d'attente, tokens consommés
+"""
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from collections import deque
+from typing import AsyncIterator, Dict, List, Optional
+import logging
+
+from openai import AsyncOpenAI
+
+logger = logging.getLogger(__name__)
+
+XAI_API_KEY = os.environ.get('XAI_API_KEY') or os.environ.get('OPENAI_API_KEY')
+XAI_BASE_URL = "https://api.x.ai/v1"
+
+LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', '8'))
+# Budget de tokens par minute glissante (0 = illimité)
+LLM_TOKENS_PER_MINUTE = int(os.environ.get('LLM_TOKENS_PER_MINUTE', '100000'))
+
+# Priorités (plus petit = servi en premier)
+PRIORITY_INTERACTIVE = 0
+PRIORITY_STANDARD = 1
+PRIORITY_BATCH = 2
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_STANDARD: "standard", PRIORITY_BATCH: "batch"}
+
+BUDGET_WINDOW_SECONDS = 60
+# Temps d'attente conservés par priorité pour les percentiles
+WAIT_SAMPLES_KEPT = 500
+
+
+def estimate_tokens(messages: List[Dict], max_tokens: int = 0) -> int:
+    """Estimation grossière (~4 caractères par token) du prompt + réponse maximale"""
+    chars = sum(len(str(message.get("content") or "")) for message in messages)
+    return chars // 4 + max_tokens
+
+
+def _percentile(samples, ratio: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return round(ordered[min(int(len(ordered) * ratio), len(ordered) - 1)], 3)
+
+
+class LlmGateway:
+    """Ordonnanceur des appels LLM du processus"""
+
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 tokens_per_minute: int = LLM_TOKENS_PER_MINUTE):
+        self.max_concurrency = max_concurrency
+        self.tokens_per_minute = tokens_per_minute
+        self._clients: Dict[str, AsyncOpenAI] = {}
+        self._waiters: List = []
+        self._sequence = itertools.count()
+        self._in_flight = 0
+        # Fenêtre glissante: [instant, tokens] réservés puis ajustés au réel
+        self._window: deque = deque()
+        self._window_tokens = 0
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+        self._waits = {priority: deque(maxlen=WAIT_SAMPLES_KEPT) for priority in PRIORITY_NAMES}
+        self.completed = 0
+        self.errors = 0
+        self.tokens_used = 0
+
+    def client(self, api_key: Optional[str] = None) -> AsyncOpenAI:
+        """Client partagé pour cette clé (créé au premier usage)"""
+        key = api_key or XAI_API_KEY or ""
+        if key not in self._clients:
+            self._clients[key] = AsyncOpenAI(api_key=key, base_url=XAI_BASE_URL)
+        return self._clients[key]
+
+    # ----- Budget de tokens -----
+
+    def _prune_window(self, now: float):
+        while self._window and self._window[0][0] <= now - BUDGET_WINDOW_SECONDS:
+            self._window_tokens -= self._window.popleft()[1]
+
+    def _budget_delay(self, tokens: int) -> float:
+        if not self.tokens_per_minute:
+            return 0
+        now = time.monotonic()
+        self._prune_window(now)
+        # Une requête plus grosse que le budget passe seule pour ne pas bloquer la file
+        if not self._window or self._window_tokens + tokens <= self.tokens_per_minute:
+            return 0
+        return self._window[0][0] + BUDGET_WINDOW_SECONDS - now
+
+    # ----- File d'attente -----
+
+    def _dispatch(self):
+        self._wakeup = None
+        while self._waiters and self._in_flight < self.max_concurrency:
+            _, _, tokens, future = self._waiters[0]
+            if future.done():
+                # Appelant annulé pendant l'attente
+                heapq.heappop(self._waiters)
+                continue
+            delay = self._budget_delay(tokens)
+            if delay > 0:
+                if self._wakeup is None:
+                    self._wakeup = asyncio.get_running_loop().call_later(delay, self._dispatch)
+                return
+            heapq.heappop(self._waiters)
+            self._in_flight += 1
+            reservation = [time.monotonic(), tokens]
+            if self.tokens_per_minute:
+                self._window.append(reservation)
+                self._window_tokens += tokens
+            future.set_result(reservation)
+
+    async def _acquire(self, priority: int, tokens: int) -> List:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        enqueued_at = time.monotonic()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), tokens, future))
+        self._dispatch()
+        try:
+            reservation = await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release(future.result(), None)
+            raise
+        self._waits.setdefault(priority, deque(maxlen=WAIT_SAMPLES_KEPT)).append(time.monotonic() - enqueued_at)
+        return reservation
+
+    def _release(self, reservation: List, actual_tokens: Optional[int]):
+        self._in_flight -= 1
+        if actual_tokens is not None:
+            self.tokens_used += actual_tokens
+            if self.tokens_per_minute and any(entry is reservation for entry in self._window):
+                self._window_tokens += actual_tokens - reservation[1]
+                reservation[1] = actual_tokens
+        self._dispatch()
+
+    # ----- Appels -----
+
+    async def complete(self, priority: int = PRIORITY_STANDARD, client: Optional[AsyncOpenAI] = None,
+                       api_key: Optional[str] = None, **request):
+        """chat.completions.create exécuté dans un créneau de la file"""
+        estimated = estimate_tokens(request.get("messages", []), request.get("max_tokens", 0))
+        reservation = await self._acquire(priority, estimated)
+        actual = None
+        try:
+            response = await (client or self.client(api_key)).chat.completions.create(**request)
+            usage = getattr(response, "usage", None)
+            actual = getattr(usage, "total_tokens", None) or estimated
+            self.completed += 1
+            return response
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self._release(reservation, actual)
+
+    async def stream(self, priority: int = PRIORITY_INTERACTIVE, client: Optional[AsyncOpenAI] = None,
+                     api_key: Optional[str] = None, **request) -> AsyncIterator:
+        """Réponse en flux; le créneau est tenu jusqu'à la fin du flux"""
+        messages = request.get("messages", [])
+        reservation = await self._acquire(priority, estimate_tokens(messages, request.get("max_tokens", 0)))
+        output_chars = 0
+        try:
+            response = await (client or self.client(api_key)).chat.completions.create(stream=True, **request)
+            async for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    output_chars += len(chunk.choices[0].delta.content)
+                yield chunk
+            self.completed += 1
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self._release(reservation, estimate_tokens(messages) + output_chars // 4)
+
+    def stats(self) -> Dict:
+        if self.tokens_per_minute:
+            self._prune_window(time.monotonic())
+        depth = {name: 0 for name in PRIORITY_NAMES.values()}
+        for priority, _, _, future in self._waiters:
+            if not future.done():
+                depth[PRIORITY_NAMES.get(priority, str(priority))] += 1
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self._in_flight,
+            "queue_depth": depth,
+            "tokens_per_minute_budget": self.tokens_per_minute or None,
+            "tokens_last_minute": self._window_tokens if self.tokens_per_minute else None,
+            "tokens_used": self.tokens_used,
+            "completed": self.completed,
+            "errors": self.errors,
+            "wait_seconds": {
+                PRIORITY_NAMES.get(priority, str(priority)): {
+                    "p50": _percentile(samples, 0.5),
+                    "p95": _percentile(samples, 0.95),
+                    "max": round(max(samples), 3) if samples else None
+                }
+                for priority, samples in self._waits.items()
+            }
+        }
+
+
+# Instance globale
+llm_gateway = LlmGateway()
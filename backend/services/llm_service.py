@@ -2,16 +2,21 @@
 LLM Service - Compatible wrapper using Grok (xAI) API
 Uses xAI API which is OpenAI-compatible
 """
+import asyncio
+import json
 import os
 import logging
-from typing import Optional
-from openai import AsyncOpenAI
+from typing import AsyncIterator, Optional
+
+from services.llm_gateway import llm_gateway, PRIORITY_INTERACTIVE, PRIORITY_STANDARD, PRIORITY_BATCH
+from services.translation_cache import translation_cache
+from services.llm_cache import llm_response_cache
+from services.chat_memory import CHAT_MEMORY_TURNS, fit_history, summary_message
 
 logger = logging.getLogger(__name__)
 
 # Get API key from environment (Grok/xAI)
 XAI_API_KEY = os.environ.get('XAI_API_KEY') or os.environ.get('OPENAI_API_KEY')
-XAI_BASE_URL = "https://api.x.ai/v1"
 
 
 class UserMessage:
@@ -23,27 +28,37 @@ class UserMessage:
 class LlmChat:
     """
     Compatible LLM Chat wrapper that uses Grok (xAI) API.
-    xAI API is OpenAI-compatible.
+    xAI API is OpenAI-compatible. Calls go through the shared LLM gateway
+    (pooled client, priority queue, concurrency and token budget).
+    With cache_ttl set, identical conversations reuse the cached response
+    for that many seconds.
+    History is bounded: only the last max_turns exchanges (within the token
+    budget of the model) are sent, after an optional summary of earlier turns.
     """
     
     def __init__(
         self, 
         api_key: Optional[str] = None,
         session_id: Optional[str] = None,
-        system_message: Optional[str] = None
+        system_message: Optional[str] = None,
+        priority: int = PRIORITY_INTERACTIVE,
+        cache_ttl: Optional[int] = None,
+        history: Optional[list] = None,
+        summary: Optional[str] = None,
+        max_turns: int = CHAT_MEMORY_TURNS
     ):
         self.api_key = api_key or XAI_API_KEY
         self.session_id = session_id
+        self.priority = priority
+        self.cache_ttl = cache_ttl
+        self.max_turns = max_turns
         self.system_message = system_message or "Tu es un assistant IA expert en trading et marchés financiers."
         self.model = "grok-3-latest"  # Modèle Grok
         self.provider = "xai"
         self.messages = []
         
-        # Initialize xAI client (OpenAI-compatible)
-        self.client = AsyncOpenAI(
-            api_key=self.api_key,
-            base_url=XAI_BASE_URL
-        )
+        # Shared xAI client (OpenAI-compatible)
+        self.client = llm_gateway.client(self.api_key)
         
         # Add system message to conversation
         if self.system_message:
@@ -51,6 +66,16 @@ class LlmChat:
                 "role": "system",
                 "content": self.system_message
             })
+        # Earlier turns: rolling summary, then the verbatim window
+        if summary:
+            self.messages.append(summary_message(summary))
+        self.messages.extend(history or [])
+    
+    def _trim_history(self):
+        """Keep system messages and the window of recent turns that fits the model budget"""
+        head = [m for m in self.messages if m["role"] == "system"]
+        turns = [m for m in self.messages if m["role"] != "system"]
+        self.messages = head + fit_history(turns, self.model, self.max_turns)
     
     def with_model(self, provider: str, model: str) -> 'LlmChat':
         """Set the model to use"""
@@ -66,17 +91,25 @@ class LlmChat:
                 "role": "user",
                 "content": message.text
             })
+            self._trim_history()
             
-            # Call OpenAI API
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=self.messages,
-                temperature=0.7,
-                max_tokens=2000
-            )
+            async def complete() -> str:
+                response = await llm_gateway.complete(
+                    self.priority,
+                    client=self.client,
+                    model=self.model,
+                    messages=self.messages,
+                    temperature=0.7,
+                    max_tokens=2000
+                )
+                return response.choices[0].message.content
             
-            # Extract response text
-            assistant_message = response.choices[0].message.content
+            if self.cache_ttl:
+                assistant_message = await llm_response_cache.get_or_call(
+                    self.model, self.messages, self.cache_ttl, complete
+                )
+            else:
+                assistant_message = await complete()
             
             # Add assistant response to history
             self.messages.append({
@@ -92,6 +125,43 @@ class LlmChat:
             # Return a fallback response
             return f"Désolé, une erreur s'est produite lors de l'analyse. Erreur: {str(e)}"
     
+    async def stream_message(self, message: UserMessage) -> AsyncIterator[str]:
+        """
+        Send a message and yield the response text deltas as they arrive.
+        The assembled response is added to history once the stream ends;
+        errors are raised to the caller (part of the answer may already be sent).
+        """
+        self.messages.append({
+            "role": "user",
+            "content": message.text
+        })
+        self._trim_history()
+        
+        stream = llm_gateway.stream(
+            self.priority,
+            client=self.client,
+            model=self.model,
+            messages=self.messages,
+            temperature=0.7,
+            max_tokens=2000
+        )
+        
+        parts = []
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                parts.append(delta)
+                yield delta
+        
+        assistant_message = "".join(parts)
+        self.messages.append({
+            "role": "assistant",
+            "content": assistant_message
+        })
+        logger.info(f"LLM stream completed ({len(assistant_message)} chars)")
+    
     def clear_history(self):
         """Clear conversation history"""
         self.messages = []
@@ -107,18 +177,16 @@ async def get_ai_response(
     prompt: str,
     system_message: str = "Tu es un assistant IA expert en trading et marchés financiers.",
     model: str = "grok-3-latest",
-    api_key: Optional[str] = None
+    api_key: Optional[str] = None,
+    priority: int = PRIORITY_STANDARD
 ) -> str:
     """
     Simple one-shot AI query function using Grok (xAI)
     """
     try:
-        client = AsyncOpenAI(
+        response = await llm_gateway.complete(
+            priority,
             api_key=api_key or XAI_API_KEY,
-            base_url=XAI_BASE_URL
-        )
-        
-        response = await client.chat.completions.create(
             model=model,
             messages=[
                 {"role": "system", "content": system_message},
@@ -135,13 +203,49 @@ async def get_ai_response(
         return f"Erreur IA: {str(e)}"
 
 
-# Cache pour les traductions (évite de retraduire les mêmes textes)
-_translation_cache = {}
+# Textes envoyés au LLM par requête de traduction (les lots partent en parallèle)
+TRANSLATION_BATCH_SIZE = int(os.environ.get('TRANSLATION_BATCH_SIZE', '20'))
+
+
+async def _translate_batch(batch: list[str]) -> dict[str, str]:
+    """Traduit un lot via une sortie JSON indexée; les entrées manquantes sont ignorées"""
+    payload = json.dumps([{"id": i, "text": text} for i, text in enumerate(batch)], ensure_ascii=False)
+    prompt = f"""Traduis les textes suivants de l'anglais vers le français de manière naturelle et professionnelle.
+Garde le même ton journalistique et financier.
+Réponds UNIQUEMENT avec un objet JSON de la forme {{"translations": [{{"id": 0, "text": "..."}}]}},
+avec un élément par texte d'entrée et le même "id". Ne rajoute aucun commentaire.
+
+Textes à traduire (JSON):
+{payload}"""
+
+    response = await llm_gateway.complete(
+        PRIORITY_BATCH,
+        model="grok-3-fast",  # Modèle Grok rapide pour les traductions
+        messages=[
+            {"role": "system", "content": "Tu es un traducteur professionnel spécialisé dans la finance et les marchés. Tu traduis de l'anglais vers le français."},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.3,
+        max_tokens=4000
+    )
+
+    content = response.choices[0].message.content or ""
+    # Tolère un bloc ```json ... ``` autour de l'objet
+    data = json.loads(content[content.find("{"):content.rfind("}") + 1])
+    translations = {}
+    for entry in data.get("translations", []):
+        index = entry.get("id")
+        text = entry.get("text")
+        if isinstance(index, int) and 0 <= index < len(batch) and isinstance(text, str) and text.strip():
+            translations[batch[index]] = text.strip()
+    return translations
+
 
 async def translate_to_french(texts: list[dict], fields: list[str] = ["title", "summary"]) -> list[dict]:
     """
     Traduit une liste de textes de l'anglais vers le français.
-    Utilise un cache pour éviter les traductions redondantes.
+    Les traductions sont partagées via translation_cache (mémoire LRU + MongoDB):
+    chaque texte n'est traduit qu'une fois, tous workers et redémarrages confondus.
     
     Args:
         texts: Liste de dictionnaires contenant les textes à traduire
@@ -154,61 +258,47 @@ async def translate_to_french(texts: list[dict], fields: list[str] = ["title", "
         return texts
     
     try:
-        client = AsyncOpenAI(
-            api_key=XAI_API_KEY,
-            base_url=XAI_BASE_URL
-        )
-        
-        # Préparer les textes à traduire (non cachés)
-        texts_to_translate = []
-        for item in texts:
-            for field in fields:
-                text = item.get(field, "")
-                if text and text not in _translation_cache:
-                    texts_to_translate.append(text)
-        
-        # Si tous les textes sont cachés, retourner directement
-        if texts_to_translate:
-            # Créer le prompt de traduction batch
-            batch_text = "\n---\n".join(texts_to_translate[:20])  # Limiter à 20 textes
-            
-            prompt = f"""Traduis les textes suivants de l'anglais vers le français de manière naturelle et professionnelle.
-Garde le même ton journalistique et financier.
-Retourne UNIQUEMENT les traductions, séparées par "---" (exactement comme l'entrée).
-Ne rajoute aucun commentaire.
+        originals = list(dict.fromkeys(
+            item.get(field) for item in texts for field in fields if item.get(field)
+        ))
+        known = await translation_cache.lookup(originals)
+        misses = [text for text in originals if text not in known]
 
-Textes à traduire:
-{batch_text}"""
-            
-            response = await client.chat.completions.create(
-                model="grok-3-fast",  # Modèle Grok rapide pour les traductions
-                messages=[
-                    {"role": "system", "content": "Tu es un traducteur professionnel spécialisé dans la finance et les marchés. Tu traduis de l'anglais vers le français."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-                max_tokens=4000
-            )
-            
-            translations = response.choices[0].message.content.split("---")
-            translations = [t.strip() for t in translations]
-            
-            # Mettre en cache les traductions
-            for i, original in enumerate(texts_to_translate[:len(translations)]):
-                if i < len(translations):
-                    _translation_cache[original] = translations[i]
+        translated = 0
+        if misses:
+            owned = await translation_cache.claim(misses)
+            batches = [owned[i:i + TRANSLATION_BATCH_SIZE] for i in range(0, len(owned), TRANSLATION_BATCH_SIZE)]
+            fresh = {}
+            try:
+                results = await asyncio.gather(*(_translate_batch(batch) for batch in batches), return_exceptions=True)
+                for result in results:
+                    if isinstance(result, Exception):
+                        logger.error(f"Translation batch error: {result}")
+                        continue
+                    fresh.update(result)
+            finally:
+                # Les réservations non traduites sont libérées pour une prochaine tentative
+                await translation_cache.store(fresh, failed=[text for text in owned if text not in fresh])
+            known.update(fresh)
+            translated = len(fresh)
+
+            # Textes traduits en parallèle par une autre requête ou un autre worker
+            pending = [text for text in misses if text not in known]
+            if pending:
+                known.update(await translation_cache.wait_inflight(pending))
+                known.update(await translation_cache.lookup([text for text in pending if text not in known]))
         
-        # Appliquer les traductions (depuis le cache)
+        # Appliquer les traductions
         result = []
         for item in texts:
             new_item = item.copy()
             for field in fields:
                 text = item.get(field, "")
-                if text and text in _translation_cache:
-                    new_item[field] = _translation_cache[text]
+                if text and text in known:
+                    new_item[field] = known[text]
             result.append(new_item)
         
-        logger.info(f"Traduit {len(texts_to_translate)} textes en français")
+        logger.info(f"Traduit {translated} textes en français")
         return result
         
     except Exception as e:
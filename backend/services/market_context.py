@@ -0,0 +1,99 @@
+"""
+Market Context - Instantané partagé des données marché pour les prompts IA
+Les données (prix, Fear & Greed, news, macro, calendrier) sont récupérées en
+tâche de fond à cadence fixe, avec le bloc de contexte déjà rendu.
+Le chat, le briefing et la newsletter lisent l'instantané sans appel externe.
+"""
+import asyncio
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+MARKET_CONTEXT_REFRESH_SECONDS = int(os.environ.get('MARKET_CONTEXT_REFRESH_SECONDS', '120'))
+
+
+class MarketContextService:
+    """
+    Chaque source (nom -> coroutine de récupération) est rafraîchie ensemble.
+    Une section revenue vide (API en erreur) conserve sa valeur précédente.
+    """
+
+    def __init__(self):
+        self._sources: Dict[str, Callable[[], Awaitable[Any]]] = {}
+        self._renderer: Optional[Callable[[Dict], str]] = None
+        self._snapshot: Optional[Dict] = None
+        self._refreshed_at = 0.0
+        self._lock = asyncio.Lock()
+        self.refresh_count = 0
+        self.last_duration = None
+
+    def initialize(self, sources: Dict[str, Callable[[], Awaitable[Any]]],
+                   renderer: Optional[Callable[[Dict], str]] = None):
+        """
+        sources: sections de l'instantané; renderer: construit le bloc de
+        contexte texte à partir de l'instantané (calculé une fois par rafraîchissement)
+        """
+        self._sources = sources
+        self._renderer = renderer
+
+    @staticmethod
+    def _merge(previous: Any, current: Any) -> Any:
+        if isinstance(current, dict) and isinstance(previous, dict):
+            return {key: MarketContextService._merge(previous.get(key), value) for key, value in current.items()}
+        if current in (None, [], {}) and previous not in (None, [], {}):
+            return previous
+        return current
+
+    async def refresh(self) -> Dict:
+        async with self._lock:
+            start = time.monotonic()
+            names = list(self._sources)
+            results = await asyncio.gather(*(self._sources[name]() for name in names), return_exceptions=True)
+
+            previous = self._snapshot or {}
+            snapshot = {}
+            for name, result in zip(names, results):
+                if isinstance(result, Exception):
+                    logger.error(f"Market context source {name} failed: {result}")
+                    result = None
+                snapshot[name] = self._merge(previous.get(name), result)
+
+            if self._renderer:
+                try:
+                    snapshot["context"] = self._renderer(snapshot)
+                except Exception as e:
+                    logger.error(f"Market context rendering failed: {e}")
+                    snapshot["context"] = previous.get("context", "")
+            snapshot["refreshed_at"] = datetime.now(timezone.utc).isoformat()
+
+            self._snapshot = snapshot
+            self._refreshed_at = time.monotonic()
+            self.refresh_count += 1
+            self.last_duration = round(time.monotonic() - start, 2)
+            return snapshot
+
+    async def get(self) -> Dict:
+        """Dernier instantané (le premier appel attend la première récupération)"""
+        if self._snapshot is None:
+            async with self._lock:
+                pass
+            if self._snapshot is None:
+                return await self.refresh()
+        return self._snapshot
+
+    def stats(self) -> Dict:
+        return {
+            "sources": list(self._sources),
+            "refreshed_at": self._snapshot.get("refreshed_at") if self._snapshot else None,
+            "age_seconds": round(time.monotonic() - self._refreshed_at, 1) if self._snapshot else None,
+            "refresh_count": self.refresh_count,
+            "last_duration_seconds": self.last_duration
+        }
+
+
+# Instance globale
+market_context = MarketContextService()
@@ -1,6 +1,7 @@
 """Newsletter Service - Daily market analysis newsletter"""
 import asyncio
 import os
+import time
 from datetime import datetime, timezone
 from typing import List, Dict, Any, Optional
 import aiosmtplib
@@ -8,23 +9,109 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import httpx
 import logging
-from openai import AsyncOpenAI
+
+from core.indexes import log_expiry, NEWSLETTER_LOG_RETENTION_DAYS
+from services.market_context import market_context
+from services.llm_gateway import llm_gateway, PRIORITY_BATCH
+from services.llm_cache import llm_response_cache
+from services.smtp_delivery import NewsletterDelivery
+from services.newsletter_jobs import NewsletterJobStore, new_owner
+from services.newsletter_templates import render_shared, render_watchlist
 
 logger = logging.getLogger(__name__)
 
 # Grok (xAI) Configuration
 XAI_API_KEY = os.environ.get('XAI_API_KEY') or os.environ.get('OPENAI_API_KEY')
-XAI_BASE_URL = "https://api.x.ai/v1"
+# Contenu commun (marché, analyse IA, sections rendues) réutilisé pendant ce délai
+NEWSLETTER_CONTENT_TTL_SECONDS = int(os.environ.get('NEWSLETTER_CONTENT_TTL_SECONDS', '900'))
+# Fragments watchlist gardés en mémoire (vidés au-delà)
+PERSONAL_FRAGMENTS_KEPT = 5000
+# Analyse IA réutilisée par les envois et aperçus rapprochés (secondes)
+NEWSLETTER_ANALYSIS_CACHE_TTL = 1800
+
+# Section "Trades des Meilleurs": traders classés et trades récents par trader
+TOP_TRADERS_COUNT = 5
+TRADES_PER_TRADER = 2
+TOP_TRADES_SHOWN = 5
+
+
+def _latest_trades_lookup(time_field: str, match: Dict, as_field: str) -> Dict:
+    """Latest trades of the trader sorted on one stored time field (index user_<field>_id)"""
+    return {"$lookup": {
+        "from": "paper_trades",
+        "localField": "user_id",
+        "foreignField": "user_id",
+        "pipeline": [
+            {"$match": match},
+            {"$sort": {time_field: -1, "id": -1}},
+            {"$limit": TRADES_PER_TRADER},
+            {"$project": {
+                "_id": 0,
+                "id": 1,
+                "symbol": {"$ifNull": ["$symbol", "$coin_id"]},
+                "type": 1,
+                "executed_at": f"${time_field}"
+            }}
+        ],
+        "as": as_field
+    }}
+
+
+def top_traders_pipeline() -> List[Dict]:
+    """
+    Best realized P&L from paper_ledger (index realized_pnl_user), trader name
+    and latest trades joined by sub-pipelines (users id_unique, paper_trades
+    on user_id), flattened to one row per trade. Traders whose account was
+    deleted are left out. Trades are ordered by execution time: "timestamp"
+    for manual trades, "created_at" for Smart Invest and auto-trading; each
+    kind is read from its own index, then both are merged. The P&L shown is
+    the trader's realized P&L from the ledger (open buys carry no profit_loss
+    of their own).
+    """
+    return [
+        {"$match": {"realized_pnl": {"$gt": 0}}},
+        {"$sort": {"realized_pnl": -1, "user_id": 1}},
+        {"$lookup": {
+            "from": "users",
+            "localField": "user_id",
+            "foreignField": "id",
+            "pipeline": [{"$project": {"_id": 0, "name": 1}}],
+            "as": "user"
+        }},
+        {"$match": {"user": {"$ne": []}}},
+        {"$limit": TOP_TRADERS_COUNT},
+        _latest_trades_lookup("timestamp", {"timestamp": {"$exists": True}}, "manual_trades"),
+        _latest_trades_lookup("created_at", {"timestamp": {"$exists": False}}, "other_trades"),
+        {"$set": {"trades": {"$slice": [
+            {"$sortArray": {
+                "input": {"$concatArrays": ["$manual_trades", "$other_trades"]},
+                "sortBy": {"executed_at": -1, "id": -1}
+            }},
+            TRADES_PER_TRADER
+        ]}}},
+        {"$unwind": "$trades"},
+        {"$limit": TOP_TRADES_SHOWN},
+        {"$project": {
+            "_id": 0,
+            "trader": {"$ifNull": [{"$arrayElemAt": ["$user.name", 0]}, "Trader Anonyme"]},
+            "symbol": {"$ifNull": ["$trades.symbol", ""]},
+            "action": {"$ifNull": ["$trades.type", ""]},
+            "profit": {"$ifNull": ["$realized_pnl", 0]}
+        }}
+    ]
+
 
 class NewsletterService:
     def __init__(self, db, llm_client=None):
         self.db = db
-        # Initialize xAI client for Grok
-        self.llm_client = llm_client or AsyncOpenAI(
-            api_key=XAI_API_KEY,
-            base_url=XAI_BASE_URL
-        )
+        # Shared xAI client for Grok (calls are queued by the LLM gateway)
+        self.llm_client = llm_client or llm_gateway.client(XAI_API_KEY)
         self.smtp_config = None
+        self._content: Optional[Dict[str, Any]] = None
+        self._content_built_at = 0.0
+        self._content_lock = asyncio.Lock()
+        # Watchlist fragments already rendered, by (content, watchlist)
+        self._fragments: Dict[tuple, str] = {}
     
     async def load_smtp_config(self):
         """Load SMTP configuration from database"""
@@ -46,7 +133,7 @@ class NewsletterService:
         return config
     
     async def get_market_data(self) -> Dict[str, Any]:
-        """Fetch current market data for newsletter"""
+        """Market data for the newsletter, read from the shared market snapshot"""
         market_data = {
             "top_cryptos": [],
             "top_gainers": [],
@@ -56,48 +143,33 @@ class NewsletterService:
         }
         
         try:
-            async with httpx.AsyncClient() as client:
-                # Get top cryptos from CryptoCompare
-                response = await client.get(
-                    "https://min-api.cryptocompare.com/data/top/mktcapfull",
-                    params={"limit": 10, "tsym": "USD"},
-                    timeout=15.0
-                )
-                if response.status_code == 200:
-                    data = response.json()
-                    for item in data.get("Data", [])[:10]:
-                        coin_info = item.get("CoinInfo", {})
-                        raw = item.get("RAW", {}).get("USD", {})
-                        market_data["top_cryptos"].append({
-                            "symbol": coin_info.get("Name", ""),
-                            "name": coin_info.get("FullName", ""),
-                            "price": raw.get("PRICE", 0),
-                            "change_24h": raw.get("CHANGEPCT24HOUR", 0),
-                            "market_cap": raw.get("MKTCAP", 0),
-                            "volume_24h": raw.get("VOLUME24HOURTO", 0)
-                        })
-                
-                # Sort for gainers/losers
-                sorted_by_change = sorted(
-                    market_data["top_cryptos"], 
-                    key=lambda x: x.get("change_24h", 0), 
-                    reverse=True
-                )
-                market_data["top_gainers"] = sorted_by_change[:3]
-                market_data["top_losers"] = sorted_by_change[-3:]
-                
-                # Fear & Greed Index
-                fg_response = await client.get(
-                    "https://api.alternative.me/fng/",
-                    timeout=10.0
-                )
-                if fg_response.status_code == 200:
-                    fg_data = fg_response.json()
-                    if fg_data.get("data"):
-                        market_data["fear_greed_index"] = {
-                            "value": int(fg_data["data"][0].get("value", 50)),
-                            "label": fg_data["data"][0].get("value_classification", "Neutral")
-                        }
+            snapshot = await market_context.get()
+            for coin in (snapshot.get("top_markets") or [])[:10]:
+                market_data["top_cryptos"].append({
+                    "symbol": (coin.get("symbol") or "").upper(),
+                    "name": coin.get("name", ""),
+                    "price": coin.get("current_price") or 0,
+                    "change_24h": coin.get("price_change_percentage_24h") or 0,
+                    "market_cap": coin.get("market_cap") or 0,
+                    "volume_24h": coin.get("total_volume") or 0
+                })
+            
+            # Sort for gainers/losers
+            sorted_by_change = sorted(
+                market_data["top_cryptos"], 
+                key=lambda x: x.get("change_24h", 0), 
+                reverse=True
+            )
+            market_data["top_gainers"] = sorted_by_change[:3]
+            market_data["top_losers"] = sorted_by_change[-3:]
+            
+            # Fear & Greed Index
+            fear_greed = (snapshot.get("market") or {}).get("fear_greed")
+            if fear_greed:
+                market_data["fear_greed_index"] = {
+                    "value": int(fear_greed.get("value", 50)),
+                    "label": fear_greed.get("value_classification", "Neutral")
+                }
                 
         except Exception as e:
             logger.error(f"Error fetching market data: {e}")
@@ -128,40 +200,9 @@ class NewsletterService:
         return trending
     
     async def get_top_traders_activity(self) -> List[Dict]:
-        """Get recent trades from top performing users (paper trading)"""
+        """Recent trades of the best paper traders (one aggregation, see top_traders_pipeline)"""
         try:
-            # Get users with best performance
-            pipeline = [
-                {"$match": {"result": "win"}},
-                {"$group": {
-                    "_id": "$user_id",
-                    "wins": {"$sum": 1},
-                    "total_profit": {"$sum": "$profit_loss"}
-                }},
-                {"$sort": {"total_profit": -1}},
-                {"$limit": 5}
-            ]
-            
-            top_traders = await self.db.paper_trades.aggregate(pipeline).to_list(5)
-            
-            # Get their recent trades
-            recent_trades = []
-            for trader in top_traders:
-                user = await self.db.users.find_one({"id": trader["_id"]}, {"name": 1, "email": 1})
-                trades = await self.db.paper_trades.find(
-                    {"user_id": trader["_id"]},
-                    {"_id": 0}
-                ).sort("created_at", -1).limit(2).to_list(2)
-                
-                for trade in trades:
-                    recent_trades.append({
-                        "trader": user.get("name", "Trader Anonyme") if user else "Trader",
-                        "symbol": trade.get("symbol", ""),
-                        "action": trade.get("action", ""),
-                        "profit": trade.get("profit_loss", 0)
-                    })
-            
-            return recent_trades[:5]
+            return await self.db.paper_ledger.aggregate(top_traders_pipeline()).to_list(TOP_TRADES_SHOWN)
         except Exception as e:
             logger.error(f"Error fetching top traders: {e}")
             return []
@@ -222,15 +263,23 @@ Génère en français:
 3. TIPS: 3 conseils de trading concrets pour aujourd'hui
 4. FORMAT: JSON avec les clés summary, btc_outlook, tips (array)"""
 
-            response = await self.llm_client.chat.completions.create(
-                model="grok-3-fast",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=500,
-                temperature=0.7
-            )
+            messages = [{"role": "user", "content": prompt}]
+            
+            async def complete() -> str:
+                response = await llm_gateway.complete(
+                    PRIORITY_BATCH,
+                    client=self.llm_client,
+                    model="grok-3-fast",
+                    messages=messages,
+                    max_tokens=500,
+                    temperature=0.7
+                )
+                return response.choices[0].message.content
             
             import json
-            content = response.choices[0].message.content
+            content = await llm_response_cache.get_or_call(
+                "grok-3-fast", messages, NEWSLETTER_ANALYSIS_CACHE_TTL, complete
+            )
             # Try to parse JSON from response
             if "{" in content:
                 json_str = content[content.find("{"):content.rfind("}")+1]
@@ -252,152 +301,74 @@ Génère en français:
         trending: List,
         top_trades: List
     ) -> str:
-        """Generate HTML newsletter content"""
-        
-        date_str = datetime.now().strftime("%d/%m/%Y")
-        
-        # Format top cryptos table
-        crypto_rows = ""
-        for crypto in market_data.get("top_cryptos", [])[:7]:
-            change = crypto.get("change_24h", 0)
-            change_color = "#22c55e" if change >= 0 else "#ef4444"
-            change_icon = "▲" if change >= 0 else "▼"
-            crypto_rows += f"""
-            <tr>
-                <td style="padding: 12px; border-bottom: 1px solid #333;">{crypto.get('symbol', '')}</td>
-                <td style="padding: 12px; border-bottom: 1px solid #333;">${crypto.get('price', 0):,.2f}</td>
-                <td style="padding: 12px; border-bottom: 1px solid #333; color: {change_color};">{change_icon} {abs(change):.2f}%</td>
-            </tr>
-            """
-        
-        # Format trending tokens
-        trending_html = ""
-        for token in trending[:5]:
-            change = token.get("price_change_24h", 0)
-            change_color = "#22c55e" if change >= 0 else "#ef4444"
-            trending_html += f"""
-            <div style="background: #1a1a2e; padding: 10px; border-radius: 8px; margin: 5px 0;">
-                <strong>{token.get('name', 'Unknown')}</strong>
-                <span style="color: {change_color}; float: right;">{change:+.1f}%</span>
-            </div>
-            """
-        
-        # Format top trades
-        trades_html = ""
-        for trade in top_trades[:5]:
-            profit = trade.get("profit", 0)
-            profit_color = "#22c55e" if profit >= 0 else "#ef4444"
-            trades_html += f"""
-            <div style="background: #1a1a2e; padding: 10px; border-radius: 8px; margin: 5px 0;">
-                <strong>{trade.get('trader', 'Trader')}</strong> - {trade.get('symbol', '')} ({trade.get('action', '')})
-                <span style="color: {profit_color}; float: right;">${profit:+.2f}</span>
-            </div>
-            """
-        
-        # Format tips
-        tips_html = ""
-        for tip in analysis.get("trade_tips", []):
-            tips_html += f"<li style='margin: 8px 0;'>{tip}</li>"
-        
-        # Fear & Greed
-        fg = market_data.get("fear_greed_index", {})
-        fg_value = fg.get("value", 50) if fg else 50
-        fg_label = fg.get("label", "Neutral") if fg else "Neutral"
-        fg_color = "#ef4444" if fg_value < 30 else "#22c55e" if fg_value > 70 else "#eab308"
-        
-        html = f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-</head>
-<body style="margin: 0; padding: 0; background-color: #0a0a0f; font-family: Arial, sans-serif;">
-    <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-        
-        <!-- Header -->
-        <div style="text-align: center; padding: 30px 0; background: linear-gradient(135deg, #FFD700 0%, #FFA500 100%); border-radius: 16px;">
-            <h1 style="margin: 0; color: #000; font-size: 28px;">🐂 BULL SAGE</h1>
-            <p style="margin: 5px 0 0; color: #333;">Newsletter Quotidienne - {date_str}</p>
-        </div>
-        
-        <!-- Summary -->
-        <div style="background: #16162a; border-radius: 12px; padding: 20px; margin: 20px 0; border-left: 4px solid #FFD700;">
-            <h2 style="color: #FFD700; margin-top: 0;">📊 Résumé du Marché</h2>
-            <p style="color: #e5e5e5; line-height: 1.6;">{analysis.get('summary', 'Analyse en cours...')}</p>
-        </div>
-        
-        <!-- Fear & Greed -->
-        <div style="background: #16162a; border-radius: 12px; padding: 20px; margin: 20px 0; text-align: center;">
-            <h3 style="color: #9ca3af; margin-top: 0;">Fear & Greed Index</h3>
-            <div style="font-size: 48px; font-weight: bold; color: {fg_color};">{fg_value}</div>
-            <div style="color: {fg_color}; font-size: 18px;">{fg_label}</div>
-        </div>
-        
-        <!-- Top Cryptos -->
-        <div style="background: #16162a; border-radius: 12px; padding: 20px; margin: 20px 0;">
-            <h2 style="color: #FFD700; margin-top: 0;">💰 Top Cryptomonnaies</h2>
-            <table style="width: 100%; border-collapse: collapse; color: #e5e5e5;">
-                <thead>
-                    <tr style="border-bottom: 2px solid #FFD700;">
-                        <th style="padding: 12px; text-align: left;">Crypto</th>
-                        <th style="padding: 12px; text-align: left;">Prix</th>
-                        <th style="padding: 12px; text-align: left;">24h</th>
-                    </tr>
-                </thead>
-                <tbody>
-                    {crypto_rows}
-                </tbody>
-            </table>
-        </div>
-        
-        <!-- BTC Outlook -->
-        <div style="background: linear-gradient(135deg, #f7931a22 0%, #16162a 100%); border-radius: 12px; padding: 20px; margin: 20px 0;">
-            <h2 style="color: #f7931a; margin-top: 0;">₿ Bitcoin Outlook</h2>
-            <p style="color: #e5e5e5; line-height: 1.6;">{analysis.get('btc_outlook', 'Analyse Bitcoin en cours...')}</p>
-        </div>
-        
-        <!-- Trending DeFi -->
-        <div style="background: #16162a; border-radius: 12px; padding: 20px; margin: 20px 0;">
-            <h2 style="color: #FFD700; margin-top: 0;">🔥 Tendances DeFi</h2>
-            {trending_html if trending_html else '<p style="color: #9ca3af;">Aucune donnée disponible</p>'}
-        </div>
-        
-        <!-- Top Traders -->
-        <div style="background: #16162a; border-radius: 12px; padding: 20px; margin: 20px 0;">
-            <h2 style="color: #FFD700; margin-top: 0;">🏆 Trades des Meilleurs</h2>
-            {trades_html if trades_html else '<p style="color: #9ca3af;">Aucun trade récent</p>'}
-        </div>
-        
-        <!-- Trading Tips -->
-        <div style="background: #16162a; border-radius: 12px; padding: 20px; margin: 20px 0; border-left: 4px solid #22c55e;">
-            <h2 style="color: #22c55e; margin-top: 0;">💡 Conseils du Jour</h2>
-            <ul style="color: #e5e5e5; padding-left: 20px; line-height: 1.8;">
-                {tips_html}
-            </ul>
-        </div>
-        
-        <!-- Risk Warning -->
-        <div style="background: #ef444422; border-radius: 12px; padding: 15px; margin: 20px 0; text-align: center;">
-            <p style="color: #fca5a5; margin: 0; font-size: 14px;">
-                {analysis.get('risk_warning', '⚠️ Le trading comporte des risques.')}
-            </p>
-        </div>
-        
-        <!-- Footer -->
-        <div style="text-align: center; padding: 20px; color: #666;">
-            <p style="margin: 5px 0;">BULL SAGE - Votre Assistant Trading IA</p>
-            <p style="margin: 5px 0; font-size: 12px;">
-                <a href="#" style="color: #FFD700;">Se désabonner</a>
-            </p>
-        </div>
-        
-    </div>
-</body>
-</html>
+        """Generate HTML newsletter content (shared sections only)"""
+        head, tail = render_shared(datetime.now().strftime("%d/%m/%Y"), market_data, analysis, trending, top_trades)
+        return head + tail
+    
+    async def get_watchlist_prices(self) -> Dict[str, Dict]:
+        """Prices by CoinGecko id from the shared market snapshot (watchlist section)"""
+        snapshot = await market_context.get()
+        coins = ((snapshot.get("market") or {}).get("crypto") or []) + (snapshot.get("top_markets") or [])
+        return {
+            coin["id"]: {
+                "symbol": (coin.get("symbol") or "").upper(),
+                "price": coin.get("current_price") or 0,
+                "change_24h": coin.get("price_change_percentage_24h") or 0
+            }
+            for coin in coins if coin.get("id")
+        }
+    
+    async def get_shared_content(self) -> Dict[str, Any]:
         """
-        
-        return html
+        Content common to every recipient, rendered once and cached for
+        NEWSLETTER_CONTENT_TTL_SECONDS (test sends and the daily run share it).
+        """
+        async with self._content_lock:
+            if self._content and time.monotonic() - self._content_built_at < NEWSLETTER_CONTENT_TTL_SECONDS:
+                return self._content
+            
+            market_data, trending, top_trades, prices = await asyncio.gather(
+                self.get_market_data(),
+                self.get_trending_tokens(),
+                self.get_top_traders_activity(),
+                self.get_watchlist_prices()
+            )
+            analysis = await self.generate_ai_analysis(market_data)
+            
+            now = datetime.now()
+            head, tail = render_shared(now.strftime("%d/%m/%Y"), market_data, analysis, trending, top_trades)
+            self._content = {
+                "subject": f"🐂 BULL SAGE - Newsletter du {now.strftime('%d/%m/%Y')}",
+                "html_head": head,
+                "html_tail": tail,
+                "prices": prices,
+                "generated_at": datetime.now(timezone.utc).isoformat()
+            }
+            self._content_built_at = time.monotonic()
+            return self._content
+    
+    def personalize(self, content: Dict[str, Any], watchlist: Optional[List[str]]) -> str:
+        """Full HTML for one recipient: shared sections around the watchlist fragment"""
+        key = (content.get("generated_at"), tuple(watchlist or ()))
+        fragment = self._fragments.get(key)
+        if fragment is None:
+            if len(self._fragments) >= PERSONAL_FRAGMENTS_KEPT:
+                self._fragments.clear()
+            fragment = render_watchlist(content.get("prices") or {}, watchlist or [])
+            self._fragments[key] = fragment
+        return content["html_head"] + fragment + content["html_tail"]
+    
+    def build_message(self, to_email: str, html_content: str, subject: Optional[str] = None) -> MIMEMultipart:
+        """Newsletter email for one recipient"""
+        message = MIMEMultipart("alternative")
+        message["From"] = self.smtp_config.get("from_email", self.smtp_config.get("username"))
+        message["To"] = to_email
+        message["Subject"] = subject or f"🐂 BULL SAGE - Newsletter du {datetime.now().strftime('%d/%m/%Y')}"
+        
+        # Add HTML content
+        html_part = MIMEText(html_content, "html", "utf-8")
+        message.attach(html_part)
+        return message
     
     async def send_newsletter(self, to_email: str, html_content: str) -> bool:
         """Send newsletter email via SMTP"""
@@ -409,14 +380,7 @@ Génère en français:
             return False
         
         try:
-            message = MIMEMultipart("alternative")
-            message["From"] = self.smtp_config.get("from_email", self.smtp_config.get("username"))
-            message["To"] = to_email
-            message["Subject"] = f"🐂 BULL SAGE - Newsletter du {datetime.now().strftime('%d/%m/%Y')}"
-            
-            # Add HTML content
-            html_part = MIMEText(html_content, "html", "utf-8")
-            message.attach(html_part)
+            message = self.build_message(to_email, html_content)
             
             # Send email
             await aiosmtplib.send(
@@ -435,8 +399,12 @@ Génère en français:
             logger.error(f"Failed to send newsletter to {to_email}: {e}")
             return False
     
-    async def send_daily_newsletter(self):
-        """Main function to generate and send daily newsletter to all subscribers"""
+    async def send_daily_newsletter(self, job_id: Optional[str] = None):
+        """
+        Generate and send the newsletter to all subscribers as a resumable job.
+        The job id defaults to the day ("daily_YYYY-MM-DD"): a second trigger the
+        same day, from this or another worker, does not send it twice.
+        """
         logger.info("Starting daily newsletter generation...")
         
         # Load SMTP config
@@ -445,52 +413,83 @@ Génère en français:
             logger.warning("Newsletter disabled or SMTP not configured")
             return {"sent": 0, "failed": 0, "disabled": True}
         
-        # Get all subscribed users
-        subscribers = await self.db.users.find(
-            {"newsletter_subscribed": {"$ne": False}},
-            {"email": 1, "name": 1}
-        ).to_list(10000)
+        job_id = job_id or f"daily_{datetime.now().strftime('%Y-%m-%d')}"
+        jobs = NewsletterJobStore(self.db)
+        owner = new_owner()
+        job = await jobs.claim(job_id, owner)
+        if job is None:
+            logger.info(f"Newsletter job {job_id} already running or completed")
+            return {"sent": 0, "failed": 0, "job_id": job_id, "skipped": True}
         
-        if not subscribers:
+        if not job.get("total"):
             logger.info("No subscribers found")
-            return {"sent": 0, "failed": 0, "no_subscribers": True}
-        
-        # Generate newsletter content
-        market_data = await self.get_market_data()
-        trending = await self.get_trending_tokens()
-        top_trades = await self.get_top_traders_activity()
-        analysis = await self.generate_ai_analysis(market_data)
-        
-        html_content = self.generate_html_newsletter(
-            market_data, analysis, trending, top_trades
+            await jobs.finish(job_id, owner)
+            return {"sent": 0, "failed": 0, "job_id": job_id, "no_subscribers": True}
+        
+        # Content is generated once per job and reused when the job is resumed
+        content = job.get("content")
+        if not content or "html_head" not in content:
+            content = await self.get_shared_content()
+            if not await jobs.save_content(job_id, owner, content):
+                return {"sent": 0, "failed": 0, "job_id": job_id, "skipped": True}
+        else:
+            logger.info(f"Resuming newsletter job {job_id} after {job.get('last_user_id')}")
+        
+        # Send batch by batch (pooled SMTP connections, bounded workers, rate limit),
+        # checkpointing after each batch
+        delivery = NewsletterDelivery(
+            self.db, self.smtp_config, job_id,
+            # The lease is renewed on every outcome flush, not only between batches
+            on_flush=lambda: jobs.heartbeat(job_id, owner)
         )
+        resumed = job.get("resumes", 0) > 0
+        try:
+            async for batch in jobs.subscriber_batches(job.get("last_user_id")):
+                pending = batch
+                if resumed:
+                    done = await jobs.already_sent(job_id, [subscriber["id"] for subscriber in batch])
+                    pending = [subscriber for subscriber in batch if subscriber["id"] not in done]
+                sent, failed = await delivery.send_batch(
+                    pending,
+                    lambda subscriber: self.build_message(
+                        subscriber["email"],
+                        self.personalize(content, subscriber.get("watchlist")),
+                        content["subject"]
+                    )
+                )
+                if not await jobs.checkpoint(job_id, owner, batch[-1]["id"], sent, failed):
+                    logger.warning(f"Newsletter job {job_id} taken over by another worker, stopping")
+                    return {"sent": delivery.sent, "failed": delivery.failed, "job_id": job_id, "taken_over": True}
+        except Exception as e:
+            logger.error(f"Newsletter job {job_id} interrupted: {e}")
+            await jobs.finish(job_id, owner, status="failed", error=str(e))
+            raise
+        finally:
+            await delivery.close()
         
-        # Send to all subscribers
-        sent = 0
-        failed = 0
-        
-        for subscriber in subscribers:
-            email = subscriber.get("email")
-            if email:
-                success = await self.send_newsletter(email, html_content)
-                if success:
-                    sent += 1
-                else:
-                    failed += 1
-                
-                # Small delay to avoid rate limiting
-                await asyncio.sleep(0.5)
+        job = await jobs.finish(job_id, owner) or job
+        sent, failed = job.get("sent", 0), job.get("failed", 0)
         
         # Log the newsletter send
         await self.db.newsletter_logs.insert_one({
+            "run_id": job_id,
             "sent_at": datetime.now(timezone.utc).isoformat(),
-            "subscribers_count": len(subscribers),
+            "subscribers_count": job.get("total", 0),
             "sent": sent,
-            "failed": failed
+            "failed": failed,
+            "expires_at": log_expiry(NEWSLETTER_LOG_RETENTION_DAYS)
         })
         
         logger.info(f"Newsletter completed: {sent} sent, {failed} failed")
-        return {"sent": sent, "failed": failed, "total": len(subscribers)}
+        return {"sent": sent, "failed": failed, "total": job.get("total", 0), "job_id": job_id}
+    
+    async def resume_abandoned_jobs(self):
+        """Take over newsletter jobs left running by a stopped worker"""
+        for job_id in await NewsletterJobStore(self.db).abandoned_jobs():
+            try:
+                await self.send_daily_newsletter(job_id=job_id)
+            except Exception as e:
+                logger.error(f"Could not resume newsletter job {job_id}: {e}")
 
 
 # Singleton instance
@@ -0,0 +1,143 @@
+"""
+Newsletter Jobs - Envois de newsletter repris après redémarrage
+Chaque envoi est un job (collection newsletter_jobs, _id = identifiant du job):
+- un seul worker le détient à la fois (bail renouvelé pendant et après chaque lot)
+- les abonnés sont lus par lots, triés par id, depuis le dernier point de reprise
+- un job dont le bail a expiré (processus arrêté) est repris par un autre worker
+"""
+import os
+import socket
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import AsyncIterator, Dict, List, Optional
+import logging
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+NEWSLETTER_JOB_BATCH_SIZE = int(os.environ.get('NEWSLETTER_JOB_BATCH_SIZE', '500'))
+# Sans signe de vie pendant ce délai, le job est considéré abandonné
+NEWSLETTER_JOB_LEASE_SECONDS = 300
+# Un job en échec est relancé automatiquement au plus ce nombre de fois, le jour même
+NEWSLETTER_JOB_MAX_RESUMES = 5
+NEWSLETTER_JOB_RETRY_HOURS = 24
+
+SUBSCRIBERS_QUERY = {"newsletter_subscribed": {"$ne": False}}
+
+
+def new_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class NewsletterJobStore:
+    def __init__(self, db):
+        self.db = db
+
+    def _lease_cutoff(self, now: datetime) -> datetime:
+        return now - timedelta(seconds=NEWSLETTER_JOB_LEASE_SECONDS)
+
+    async def claim(self, job_id: str, owner: str) -> Optional[Dict]:
+        """
+        Crée le job ou reprend un job abandonné ou en échec; None si un autre
+        worker le détient ou s'il est déjà terminé.
+        """
+        now = datetime.now(timezone.utc)
+        job = {
+            "_id": job_id,
+            "status": "running",
+            "owner": owner,
+            "started_at": now,
+            "heartbeat_at": now,
+            "last_user_id": None,
+            "total": await self.db.users.count_documents(SUBSCRIBERS_QUERY),
+            "sent": 0,
+            "failed": 0,
+            "resumes": 0
+        }
+        try:
+            await self.db.newsletter_jobs.insert_one(job)
+            return job
+        except DuplicateKeyError:
+            # Job abandonné (bail expiré) ou en échec: reprise au dernier point de reprise
+            return await self.db.newsletter_jobs.find_one_and_update(
+                {"_id": job_id, "$or": [
+                    {"status": "running", "heartbeat_at": {"$lt": self._lease_cutoff(now)}},
+                    {"status": "failed"}
+                ]},
+                {"$set": {"status": "running", "owner": owner, "heartbeat_at": now}, "$inc": {"resumes": 1}},
+                return_document=ReturnDocument.AFTER
+            )
+
+    async def save_content(self, job_id: str, owner: str, content: Dict) -> bool:
+        """Contenu figé du job (réutilisé tel quel en cas de reprise)"""
+        result = await self.db.newsletter_jobs.update_one(
+            {"_id": job_id, "owner": owner},
+            {"$set": {"content": content, "heartbeat_at": datetime.now(timezone.utc)}}
+        )
+        return result.matched_count == 1
+
+    async def checkpoint(self, job_id: str, owner: str, last_user_id: str, sent: int, failed: int) -> bool:
+        """Enregistre la progression; False si le bail a été repris par un autre worker"""
+        result = await self.db.newsletter_jobs.update_one(
+            {"_id": job_id, "owner": owner},
+            {
+                "$set": {"last_user_id": last_user_id, "heartbeat_at": datetime.now(timezone.utc)},
+                "$inc": {"sent": sent, "failed": failed}
+            }
+        )
+        return result.matched_count == 1
+
+    async def heartbeat(self, job_id: str, owner: str) -> bool:
+        """Renouvelle le bail en cours de lot; False si le job a été repris"""
+        result = await self.db.newsletter_jobs.update_one(
+            {"_id": job_id, "owner": owner},
+            {"$set": {"heartbeat_at": datetime.now(timezone.utc)}}
+        )
+        return result.matched_count == 1
+
+    async def finish(self, job_id: str, owner: str, status: str = "completed", error: Optional[str] = None) -> Optional[Dict]:
+        return await self.db.newsletter_jobs.find_one_and_update(
+            {"_id": job_id, "owner": owner},
+            {"$set": {"status": status, "error": error, "finished_at": datetime.now(timezone.utc)}},
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def abandoned_jobs(self) -> List[str]:
+        """Jobs en cours dont le worker ne donne plus signe de vie, et jobs récents en échec"""
+        now = datetime.now(timezone.utc)
+        jobs = await self.db.newsletter_jobs.find(
+            {"$or": [
+                {"status": "running", "heartbeat_at": {"$lt": self._lease_cutoff(now)}},
+                {
+                    "status": "failed",
+                    "resumes": {"$lt": NEWSLETTER_JOB_MAX_RESUMES},
+                    "started_at": {"$gte": now - timedelta(hours=NEWSLETTER_JOB_RETRY_HOURS)}
+                }
+            ]},
+            {"_id": 1}
+        ).to_list(100)
+        return [job["_id"] for job in jobs]
+
+    async def subscriber_batches(self, after_user_id: Optional[str]) -> AsyncIterator[List[Dict]]:
+        """Abonnés par lots triés par id, après le point de reprise (mémoire constante)"""
+        query = dict(SUBSCRIBERS_QUERY)
+        if after_user_id:
+            query["id"] = {"$gt": after_user_id}
+        cursor = self.db.users.find(query, {"_id": 0, "id": 1, "email": 1, "name": 1, "watchlist": 1}) \
+            .sort("id", 1).batch_size(NEWSLETTER_JOB_BATCH_SIZE)
+        batch = []
+        async for subscriber in cursor:
+            batch.append(subscriber)
+            if len(batch) >= NEWSLETTER_JOB_BATCH_SIZE:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    async def already_sent(self, job_id: str, user_ids: List[str]) -> set:
+        """Destinataires du lot déjà servis avant l'interruption"""
+        return set(await self.db.newsletter_deliveries.distinct(
+            "user_id", {"run_id": job_id, "status": "sent", "user_id": {"$in": user_ids}}
+        ))
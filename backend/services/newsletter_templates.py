@@ -0,0 +1,192 @@
+"""
+Newsletter Templates - Gabarits Jinja2 de la newsletter, compilés au chargement
+Les sections communes sont rendues une fois par envoi puis coupées autour de
+l'emplacement personnel; seul le petit fragment "Votre watchlist" est rendu
+par destinataire (et réutilisé entre destinataires ayant la même watchlist).
+"""
+from typing import Dict, Iterable, List, Tuple
+
+from jinja2 import DictLoader, Environment
+from markupsafe import Markup
+
+# Emplacement du fragment personnel dans le gabarit commun
+PERSONAL_SLOT = "<!-- personal -->"
+# Cryptos affichées au plus dans la section watchlist
+WATCHLIST_MAX_COINS = 8
+
+SHARED_TEMPLATE = """
+<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+</head>
+<body style="margin: 0; padding: 0; background-color: #0a0a0f; font-family: Arial, sans-serif;">
+    <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
+
+        <!-- Header -->
+        <div style="text-align: center; padding: 30px 0; background: linear-gradient(135deg, #FFD700 0%, #FFA500 100%); border-radius: 16px;">
+            <h1 style="margin: 0; color: #000; font-size: 28px;">🐂 BULL SAGE</h1>
+            <p style="margin: 5px 0 0; color: #333;">Newsletter Quotidienne - {{ date_str }}</p>
+        </div>
+
+        <!-- Summary -->
+        <div style="background: #16162a; border-radius: 12px; padding: 20px; margin: 20px 0; border-left: 4px solid #FFD700;">
+            <h2 style="color: #FFD700; margin-top: 0;">📊 Résumé du Marché</h2>
+            <p style="color: #e5e5e5; line-height: 1.6;">{{ analysis.summary or 'Analyse en cours...' }}</p>
+        </div>
+
+        <!-- Fear & Greed -->
+        <div style="background: #16162a; border-radius: 12px; padding: 20px; margin: 20px 0; text-align: center;">
+            <h3 style="color: #9ca3af; margin-top: 0;">Fear & Greed Index</h3>
+            <div style="font-size: 48px; font-weight: bold; color: {{ fg_color }};">{{ fg_value }}</div>
+            <div style="color: {{ fg_color }}; font-size: 18px;">{{ fg_label }}</div>
+        </div>
+
+        {{ personal_slot }}
+
+        <!-- Top Cryptos -->
+        <div style="background: #16162a; border-radius: 12px; padding: 20px; margin: 20px 0;">
+            <h2 style="color: #FFD700; margin-top: 0;">💰 Top Cryptomonnaies</h2>
+            <table style="width: 100%; border-collapse: collapse; color: #e5e5e5;">
+                <thead>
+                    <tr style="border-bottom: 2px solid #FFD700;">
+                        <th style="padding: 12px; text-align: left;">Crypto</th>
+                        <th style="padding: 12px; text-align: left;">Prix</th>
+                        <th style="padding: 12px; text-align: left;">24h</th>
+                    </tr>
+                </thead>
+                <tbody>
+                    {%- for crypto in top_cryptos %}
+                    <tr>
+                        <td style="padding: 12px; border-bottom: 1px solid #333;">{{ crypto.symbol }}</td>
+                        <td style="padding: 12px; border-bottom: 1px solid #333;">{{ crypto.price | usd }}</td>
+                        <td style="padding: 12px; border-bottom: 1px solid #333; color: {{ crypto.change_24h | change_color }};">{{ crypto.change_24h | change_icon }} {{ '%.2f' | format((crypto.change_24h or 0) | abs) }}%</td>
+                    </tr>
+                    {%- endfor %}
+                </tbody>
+            </table>
+        </div>
+
+        <!-- BTC Outlook -->
+        <div style="background: linear-gradient(135deg, #f7931a22 0%, #16162a 100%); border-radius: 12px; padding: 20px; margin: 20px 0;">
+            <h2 style="color: #f7931a; margin-top: 0;">₿ Bitcoin Outlook</h2>
+            <p style="color: #e5e5e5; line-height: 1.6;">{{ analysis.btc_outlook or 'Analyse Bitcoin en cours...' }}</p>
+        </div>
+
+        <!-- Trending DeFi -->
+        <div style="background: #16162a; border-radius: 12px; padding: 20px; margin: 20px 0;">
+            <h2 style="color: #FFD700; margin-top: 0;">🔥 Tendances DeFi</h2>
+            {%- for token in trending %}
+            <div style="background: #1a1a2e; padding: 10px; border-radius: 8px; margin: 5px 0;">
+                <strong>{{ token.name or 'Unknown' }}</strong>
+                <span style="color: {{ token.price_change_24h | change_color }}; float: right;">{{ token.price_change_24h | pct }}</span>
+            </div>
+            {%- else %}
+            <p style="color: #9ca3af;">Aucune donnée disponible</p>
+            {%- endfor %}
+        </div>
+
+        <!-- Top Traders -->
+        <div style="background: #16162a; border-radius: 12px; padding: 20px; margin: 20px 0;">
+            <h2 style="color: #FFD700; margin-top: 0;">🏆 Trades des Meilleurs</h2>
+            {%- for trade in top_trades %}
+            <div style="background: #1a1a2e; padding: 10px; border-radius: 8px; margin: 5px 0;">
+                <strong>{{ trade.trader or 'Trader' }}</strong> - {{ trade.symbol }} ({{ trade.action }})
+                <span style="color: {{ trade.profit | change_color }}; float: right;">${{ '%+.2f' | format(trade.profit or 0) }}</span>
+            </div>
+            {%- else %}
+            <p style="color: #9ca3af;">Aucun trade récent</p>
+            {%- endfor %}
+        </div>
+
+        <!-- Trading Tips -->
+        <div style="background: #16162a; border-radius: 12px; padding: 20px; margin: 20px 0; border-left: 4px solid #22c55e;">
+            <h2 style="color: #22c55e; margin-top: 0;">💡 Conseils du Jour</h2>
+            <ul style="color: #e5e5e5; padding-left: 20px; line-height: 1.8;">
+                {%- for tip in analysis.trade_tips %}
+                <li style='margin: 8px 0;'>{{ tip }}</li>
+                {%- endfor %}
+            </ul>
+        </div>
+
+        <!-- Risk Warning -->
+        <div style="background: #ef444422; border-radius: 12px; padding: 15px; margin: 20px 0; text-align: center;">
+            <p style="color: #fca5a5; margin: 0; font-size: 14px;">
+                {{ analysis.risk_warning or '⚠️ Le trading comporte des risques.' }}
+            </p>
+        </div>
+
+        <!-- Footer -->
+        <div style="text-align: center; padding: 20px; color: #666;">
+            <p style="margin: 5px 0;">BULL SAGE - Votre Assistant Trading IA</p>
+            <p style="margin: 5px 0; font-size: 12px;">
+                <a href="#" style="color: #FFD700;">Se désabonner</a>
+            </p>
+        </div>
+
+    </div>
+</body>
+</html>
+"""
+
+WATCHLIST_TEMPLATE = """
+        <!-- Watchlist -->
+        <div style="background: #16162a; border-radius: 12px; padding: 20px; margin: 20px 0; border-left: 4px solid #3b82f6;">
+            <h2 style="color: #3b82f6; margin-top: 0;">👀 Votre Watchlist</h2>
+            {%- for coin in coins %}
+            <div style="background: #1a1a2e; padding: 10px; border-radius: 8px; margin: 5px 0; color: #e5e5e5;">
+                <strong>{{ coin.symbol }}</strong> {{ coin.price | usd }}
+                <span style="color: {{ coin.change_24h | change_color }}; float: right;">{{ coin.change_24h | pct }}</span>
+            </div>
+            {%- endfor %}
+        </div>
+"""
+
+
+def _change_color(value) -> str:
+    return "#22c55e" if (value or 0) >= 0 else "#ef4444"
+
+
+_environment = Environment(
+    loader=DictLoader({"shared.html": SHARED_TEMPLATE, "watchlist.html": WATCHLIST_TEMPLATE}),
+    autoescape=True
+)
+_environment.filters.update({
+    "usd": lambda value: f"${(value or 0):,.2f}",
+    "pct": lambda value: f"{(value or 0):+.1f}%",
+    "change_color": _change_color,
+    "change_icon": lambda value: "▲" if (value or 0) >= 0 else "▼",
+})
+
+# Compilés une seule fois
+_shared_template = _environment.get_template("shared.html")
+_watchlist_template = _environment.get_template("watchlist.html")
+
+
+def render_shared(date_str: str, market_data: Dict, analysis: Dict,
+                  trending: List, top_trades: List) -> Tuple[str, str]:
+    """Sections communes, coupées autour de l'emplacement personnel: (avant, après)"""
+    fg = market_data.get("fear_greed_index") or {}
+    fg_value = fg.get("value", 50)
+    html = _shared_template.render(
+        date_str=date_str,
+        analysis=analysis,
+        fg_value=fg_value,
+        fg_label=fg.get("label", "Neutral"),
+        fg_color="#ef4444" if fg_value < 30 else "#22c55e" if fg_value > 70 else "#eab308",
+        top_cryptos=market_data.get("top_cryptos", [])[:7],
+        trending=trending[:5],
+        top_trades=top_trades[:5],
+        personal_slot=Markup(PERSONAL_SLOT)
+    )
+    head, _, tail = html.partition(PERSONAL_SLOT)
+    return head, tail
+
+
+def render_watchlist(prices: Dict[str, Dict], watchlist: Iterable[str]) -> str:
+    """Fragment watchlist à partir de l'instantané de prix partagé ("" si rien à montrer)"""
+    coins = [prices[coin_id] for coin_id in watchlist if coin_id in prices][:WATCHLIST_MAX_COINS]
+    if not coins:
+        return ""
+    return _watchlist_template.render(coins=coins)
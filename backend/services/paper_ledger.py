@@ -0,0 +1,245 @@
+"""
+Paper Ledger - Registre de positions du paper trading par utilisateur
+Chaque trade exécuté met à jour le document paper_ledger de l'utilisateur:
+lots FIFO et prix de revient par symbole, P&L réalisé, compteurs et
+agrégats journaliers. Les statistiques lisent ces valeurs précalculées.
+
+Cohérence: le registre n'est pas écrit dans la même transaction que le trade
+(paper_trades) et le solde (users) — MongoDB n'offre les transactions multi-
+documents qu'en replica set, ce que le déploiement ne garantit pas. Un arrêt
+entre ces écritures laisse un registre en retard sur paper_trades, qui reste
+la source de vérité: rebuild_ledger le recalcule (à la demande ou via
+POST /api/admin/paper-ledger/rebuild).
+"""
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Agrégats journaliers conservés
+DAILY_BUCKETS_KEPT = 90
+# Derniers trades conservés pour l'historique des statistiques
+RECENT_TRADES_KEPT = 10
+MAX_UPDATE_RETRIES = 3
+# Quantité résiduelle considérée comme nulle
+EPSILON = 1e-12
+
+
+def _key(value: str) -> str:
+    """Clé de sous-document sûre pour MongoDB (pas de '.' ni de '$')"""
+    return str(value).replace(".", "_").replace("$", "_")
+
+
+def normalize_trade(trade: Dict) -> Optional[Dict]:
+    """Champs communs aux trades manuels, Smart Invest et auto-trading"""
+    symbol = trade.get("symbol") or trade.get("coin_id")
+    amount = trade.get("amount", trade.get("quantity"))
+    if trade.get("type") == "sell":
+        price = trade.get("price", trade.get("exit_price"))
+    else:
+        price = trade.get("price", trade.get("entry_price"))
+    if not symbol or amount is None or price is None or trade.get("type") not in ("buy", "sell"):
+        return None
+    return {
+        "symbol": symbol,
+        "type": trade["type"],
+        "amount": float(amount),
+        "price": float(price),
+        "timestamp": trade.get("timestamp") or trade.get("created_at") or ""
+    }
+
+
+def exit_trade(trade: Dict) -> Dict:
+    """
+    Vente équivalente à la clôture SL/TP d'un achat auto-trading: la sortie est
+    enregistrée sur le document d'achat (exit_price, closed_at), sans trade séparé
+    """
+    return {
+        "user_id": trade["user_id"],
+        "coin_id": trade["coin_id"],
+        "type": "sell",
+        "quantity": trade["quantity"],
+        "exit_price": trade["exit_price"],
+        "created_at": trade["closed_at"]
+    }
+
+
+# Sorties SL/TP rejouées comme des ventes à leur date de clôture
+_EXITS_PIPELINE = [
+    {"$match": {"type": "buy", "status": "closed", "close_reason": {"$exists": True}}},
+    {"$project": {"_id": 0, "coin_id": 1, "type": {"$literal": "sell"}, "quantity": 1,
+                  "exit_price": 1, "created_at": "$closed_at"}}
+]
+
+
+def empty_ledger(user_id: str) -> Dict:
+    return {
+        "user_id": user_id,
+        "version": 0,
+        "total_trades": 0,
+        "buy_trades": 0,
+        "sell_trades": 0,
+        "total_volume": 0.0,
+        "realized_pnl": 0.0,
+        "symbol_counts": {},
+        "positions": {},
+        "best_trade": None,
+        "worst_trade": None,
+        "daily": {},
+        "recent_trades": [],
+    }
+
+
+def _close_lots(lots: List[List[float]], quantity: float):
+    """Consomme les lots FIFO; retourne (quantité appariée, coût des lots appariés)"""
+    matched = 0.0
+    cost = 0.0
+    while lots and quantity - matched > EPSILON:
+        lot_amount, lot_price = lots[0]
+        take = min(lot_amount, quantity - matched)
+        matched += take
+        cost += take * lot_price
+        if lot_amount - take > EPSILON:
+            lots[0][0] = lot_amount - take
+        else:
+            lots.pop(0)
+    return matched, cost
+
+
+def apply_trade(ledger: Dict, trade: Dict) -> Dict:
+    """Intègre un trade normalisé au registre (dans l'ordre d'exécution)"""
+    symbol = _key(trade["symbol"])
+    side = trade["type"]
+    amount = trade["amount"]
+    price = trade["price"]
+    value = amount * price
+    day = trade["timestamp"][:10] if trade["timestamp"] else "unknown"
+
+    ledger["total_trades"] += 1
+    ledger["buy_trades" if side == "buy" else "sell_trades"] += 1
+    ledger["total_volume"] += value
+    ledger["symbol_counts"][symbol] = ledger["symbol_counts"].get(symbol, 0) + 1
+
+    bucket = ledger["daily"].setdefault(day, {"buys": 0, "sells": 0, "volume": 0.0, "realized_pnl": 0.0})
+    bucket["buys" if side == "buy" else "sells"] += 1
+    bucket["volume"] += value
+
+    # Position: lots FIFO d'un seul sens (long ou short)
+    position = ledger["positions"].setdefault(symbol, {"side": None, "lots": []})
+    closing = position["side"] is not None and position["side"] != ("long" if side == "buy" else "short")
+    remaining = amount
+
+    if closing:
+        matched, cost = _close_lots(position["lots"], amount)
+        if matched > 0:
+            if position["side"] == "long":
+                pnl = matched * price - cost
+            else:
+                pnl = cost - matched * price
+            pnl_percent = (pnl / cost * 100) if cost > 0 else 0
+            ledger["realized_pnl"] += pnl
+            bucket["realized_pnl"] += pnl
+
+            closed = {"symbol": trade["symbol"], "pnl": pnl, "pnl_percent": pnl_percent}
+            if ledger["best_trade"] is None or pnl > ledger["best_trade"]["pnl"]:
+                ledger["best_trade"] = closed
+            if ledger["worst_trade"] is None or pnl < ledger["worst_trade"]["pnl"]:
+                ledger["worst_trade"] = closed
+        remaining = amount - matched
+        if not position["lots"]:
+            position["side"] = None
+
+    if remaining > EPSILON:
+        # Ouverture ou renforcement (le surplus d'une vente ouvre un short)
+        position["side"] = "long" if side == "buy" else "short"
+        position["lots"].append([remaining, price])
+
+    position["amount"] = sum(lot[0] for lot in position["lots"])
+    position["cost_basis"] = sum(lot[0] * lot[1] for lot in position["lots"])
+    position["avg_price"] = position["cost_basis"] / position["amount"] if position["amount"] > EPSILON else 0
+
+    if len(ledger["daily"]) > DAILY_BUCKETS_KEPT:
+        for old_day in sorted(ledger["daily"])[:-DAILY_BUCKETS_KEPT]:
+            del ledger["daily"][old_day]
+
+    ledger["recent_trades"] = ([{
+        "symbol": trade["symbol"],
+        "type": side,
+        "amount": amount,
+        "price": price,
+        "value": round(value, 2),
+        "timestamp": day if trade["timestamp"] else ""
+    }] + ledger["recent_trades"])[:RECENT_TRADES_KEPT]
+    return ledger
+
+
+async def rebuild_ledger(db, user_id: str) -> Dict:
+    """Reconstruit le registre en rejouant les trades de l'utilisateur"""
+    ledger = empty_ledger(user_id)
+    cursor = db.paper_trades.aggregate([
+        {"$match": {"user_id": user_id}},
+        {"$unionWith": {"coll": "paper_trades", "pipeline": [{"$match": {"user_id": user_id}}, *_EXITS_PIPELINE]}},
+        {"$addFields": {"_executed_at": {"$ifNull": ["$timestamp", "$created_at"]}}},
+        {"$sort": {"_executed_at": 1}},
+        {"$project": {"_id": 0, "symbol": 1, "coin_id": 1, "type": 1, "amount": 1, "quantity": 1,
+                      "price": 1, "entry_price": 1, "exit_price": 1, "timestamp": 1, "created_at": 1}}
+    ], allowDiskUse=True)
+    async for trade in cursor:
+        normalized = normalize_trade(trade)
+        if normalized:
+            apply_trade(ledger, normalized)
+
+    ledger["updated_at"] = datetime.now(timezone.utc).isoformat()
+    await db.paper_ledger.replace_one({"user_id": user_id}, ledger, upsert=True)
+    return ledger
+
+
+async def rebuild_all_ledgers(db) -> int:
+    """Réalignement: reconstruit le registre de tous les utilisateurs ayant des trades"""
+    user_ids = await db.paper_trades.distinct("user_id")
+    for user_id in user_ids:
+        await rebuild_ledger(db, user_id)
+    return len(user_ids)
+
+
+async def record_trade(db, trade: Dict):
+    """
+    Intègre un trade exécuté au registre de l'utilisateur. L'écriture est
+    conditionnée par la version du document (atomique sur un seul document,
+    mais distincte de l'insertion du trade: voir l'en-tête du module).
+    """
+    normalized = normalize_trade(trade)
+    if not normalized:
+        return
+    user_id = trade["user_id"]
+
+    for _ in range(MAX_UPDATE_RETRIES):
+        ledger = await db.paper_ledger.find_one({"user_id": user_id}, {"_id": 0})
+        if ledger is None:
+            # Premier trade ou utilisateur non migré: le trade est déjà en base
+            await rebuild_ledger(db, user_id)
+            return
+
+        version = ledger.get("version", 0)
+        apply_trade(ledger, normalized)
+        ledger["version"] = version + 1
+        ledger["updated_at"] = datetime.now(timezone.utc).isoformat()
+        result = await db.paper_ledger.replace_one({"user_id": user_id, "version": version}, ledger)
+        if result.matched_count:
+            return
+
+    logger.warning(f"Paper ledger contention for {user_id}, rebuilding")
+    await rebuild_ledger(db, user_id)
+
+
+async def get_ledger(db, user_id: str) -> Dict:
+    """Registre précalculé (une recherche indexée, reconstruction si absent)"""
+    ledger = await db.paper_ledger.find_one({"user_id": user_id}, {"_id": 0})
+    if ledger is None:
+        ledger = await rebuild_ledger(db, user_id)
+    return ledger
+
+
+async def reset_ledger(db, user_id: str):
+    await db.paper_ledger.replace_one({"user_id": user_id}, empty_ledger(user_id), upsert=True)
@@ -0,0 +1,273 @@
+"""
+Signal Evaluator - Évaluation groupée des signaux actifs sur le chemin des prix
+Utilise les plus hauts/plus bas des bougies depuis la création de chaque signal
+(CandleStore partagé) pour détecter le premier contact TP1/TP2/SL, même entre
+deux évaluations, puis met à jour tous les signaux en une seule écriture groupée
+"""
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+import logging
+
+import httpx
+import numpy as np
+from pymongo import UpdateOne
+
+from services.candle_store import candle_store
+from services.signal_stats import rollup_operations
+
+logger = logging.getLogger(__name__)
+
+COINGECKO_API_URL = os.environ.get('COINGECKO_API_URL', 'https://api.coingecko.com/api/v3')
+# Intervalle de l'évaluation planifiée (minutes)
+SIGNAL_EVALUATION_INTERVAL_MINUTES = int(os.environ.get('SIGNAL_EVALUATION_INTERVAL_MINUTES', '5'))
+# Intervalle des bougies utilisées pour suivre le chemin des prix
+EVALUATION_CANDLE_INTERVAL = "1h"
+# Durée de vie des prix courants partagés entre évaluations (secondes)
+PRICE_CACHE_TTL = 30
+# Âge d'expiration par timeframe (heures)
+EXPIRY_HOURS = {"daily": 168, "1h": 24, "4h": 24}
+
+_price_cache = {"data": {}, "timestamp": 0.0}
+
+
+def first_touch(mask: np.ndarray) -> int:
+    """Index du premier True (len(mask) si aucun)"""
+    return int(np.argmax(mask)) if mask.any() else len(mask)
+
+
+def path_start(times: np.ndarray, created_ts: float, step: int) -> int:
+    """
+    Index de la première bougie (horodatée à l'ouverture) clôturée après la
+    création du signal: les bougies entièrement antérieures sont ignorées.
+    """
+    return int(np.searchsorted(times, created_ts - step, side="right"))
+
+
+def _pnl_percent(signal_type: str, entry_price: float, exit_price: float) -> float:
+    if signal_type == "BUY":
+        return ((exit_price - entry_price) / entry_price) * 100
+    return ((entry_price - exit_price) / entry_price) * 100
+
+
+def resolve_outcome(signal: Dict, highs: np.ndarray, lows: np.ndarray) -> Optional[Dict]:
+    """
+    Premier niveau touché sur le chemin (highs/lows chronologiques).
+    À égalité dans une même bougie, le stop est retenu (hypothèse prudente).
+    """
+    if len(highs) == 0:
+        return None
+
+    stop_loss = signal["stop_loss"]
+    tp1 = signal["take_profit_1"]
+    tp2 = signal.get("take_profit_2")
+
+    if signal["signal_type"] == "BUY":
+        sl_idx = first_touch(lows <= stop_loss)
+        tp1_idx = first_touch(highs >= tp1)
+        tp2_idx = first_touch(highs >= tp2) if tp2 else len(highs)
+    elif signal["signal_type"] == "SELL":
+        sl_idx = first_touch(highs >= stop_loss)
+        tp1_idx = first_touch(lows <= tp1)
+        tp2_idx = first_touch(lows <= tp2) if tp2 else len(highs)
+    else:
+        return None
+
+    first = min(sl_idx, tp1_idx, tp2_idx)
+    if first == len(highs):
+        return None
+
+    if sl_idx == first:
+        status, level = "hit_sl", stop_loss
+    elif tp2_idx == first:
+        status, level = "hit_tp2", tp2
+    else:
+        status, level = "hit_tp1", tp1
+
+    return {
+        "status": status,
+        "index": first,
+        "level": level,
+        "pnl_percent": _pnl_percent(signal["signal_type"], signal["entry_price"], level)
+    }
+
+
+async def fetch_current_prices(symbols: List[str]) -> Dict[str, float]:
+    """Prix courants de tous les symboles en une requête, partagés quelques secondes"""
+    now = time.time()
+    cached = _price_cache["data"]
+    if now - _price_cache["timestamp"] < PRICE_CACHE_TTL and all(s in cached for s in symbols):
+        return {s: cached[s] for s in symbols}
+
+    prices = {}
+    try:
+        async with httpx.AsyncClient() as client:
+            response = await client.get(
+                f"{COINGECKO_API_URL}/simple/price",
+                params={"ids": ",".join(symbols), "vs_currencies": "usd"},
+                timeout=15.0
+            )
+            if response.status_code == 200:
+                for symbol, data in response.json().items():
+                    prices[symbol] = data.get("usd", 0)
+    except Exception as e:
+        logger.error(f"Error fetching prices for evaluation: {e}")
+
+    if prices:
+        _price_cache["data"] = {**cached, **prices}
+        _price_cache["timestamp"] = now
+    return prices
+
+
+async def evaluate_active_signals(db, symbol_resolver: Callable[[str], str], user_id: Optional[str] = None) -> Dict:
+    """
+    Évalue tous les signaux actifs (d'un utilisateur ou de tous) en un passage:
+    bougies partagées par symbole, recherche vectorisée du premier contact,
+    une seule écriture groupée pour les résultats et les expirations.
+    """
+    query = {"status": "active"}
+    if user_id:
+        query["user_id"] = user_id
+
+    active_signals = await db.signals.find(query, {"_id": 0}).to_list(None)
+    if not active_signals:
+        return {"total_evaluated": 0, "updated": 0, "results": []}
+
+    symbols = list({s["symbol"] for s in active_signals})
+    current_prices = await fetch_current_prices(symbols)
+
+    # Bougies par symbole, en tableaux numpy (une récupération partagée par symbole)
+    series = {}
+    for symbol in symbols:
+        try:
+            candles = await candle_store.get_candles(symbol_resolver(symbol), EVALUATION_CANDLE_INTERVAL)
+        except Exception as e:
+            logger.warning(f"Candles unavailable for {symbol}: {e}")
+            candles = []
+        series[symbol] = (
+            np.array([c["time"] for c in candles], dtype=np.int64),
+            np.array([c["high"] for c in candles], dtype=float),
+            np.array([c["low"] for c in candles], dtype=float),
+            candles[-1]["close"] if candles else None
+        )
+
+    now = datetime.now(timezone.utc)
+    # Marque les clôtures de ce passage (une évaluation concurrente peut clôturer les mêmes signaux)
+    evaluation_id = uuid.uuid4().hex
+    step = candle_store.interval_seconds(EVALUATION_CANDLE_INTERVAL)
+    operations = []
+    closed = []
+    results = []
+
+    for signal in active_signals:
+        symbol = signal["symbol"]
+        times, highs, lows, last_close = series[symbol]
+        current_price = current_prices.get(symbol) or last_close
+
+        created_at = datetime.fromisoformat(signal["created_at"].replace("Z", "+00:00"))
+        created_ts = created_at.timestamp()
+
+        # Bougies clôturées après la création du signal, puis le prix courant en dernier point
+        start = path_start(times, created_ts, step)
+        path_highs = highs[start:]
+        path_lows = lows[start:]
+        if current_price:
+            path_highs = np.append(path_highs, current_price)
+            path_lows = np.append(path_lows, current_price)
+
+        if len(path_highs) == 0:
+            results.append({
+                "signal_id": signal["id"],
+                "symbol": symbol,
+                "status": "error",
+                "message": "Could not fetch current price"
+            })
+            continue
+
+        outcome = resolve_outcome(signal, path_highs, path_lows)
+        entry_price = signal["entry_price"]
+        signal_type = signal["signal_type"]
+        update = None
+
+        if outcome:
+            idx = start + outcome["index"]
+            hit_at = (
+                datetime.fromtimestamp(int(times[idx]) + step, timezone.utc).isoformat()
+                if idx < len(times) else now.isoformat()
+            )
+            update = {
+                "status": outcome["status"],
+                "result_pnl": round(outcome["pnl_percent"], 2),
+                "evaluated_at": now.isoformat(),
+                "evaluation_id": evaluation_id,
+                "price_at_evaluation": outcome["level"],
+                "hit_at": hit_at
+            }
+        else:
+            # Expiration (7 jours pour daily, 1 jour pour 1h/4h)
+            age_hours = (now - created_at).total_seconds() / 3600
+            max_age = EXPIRY_HOURS.get(signal["timeframe"])
+            if max_age and age_hours > max_age and current_price:
+                update = {
+                    "status": "expired",
+                    "result_pnl": round(_pnl_percent(signal_type, entry_price, current_price), 2),
+                    "evaluated_at": now.isoformat(),
+                    "evaluation_id": evaluation_id,
+                    "price_at_evaluation": current_price
+                }
+
+        if update:
+            operations.append(UpdateOne({"id": signal["id"], "status": "active"}, {"$set": update}))
+            closed.append((update.get("hit_at", update["evaluated_at"]), signal, update))
+            results.append({
+                "signal_id": signal["id"],
+                "user_id": signal["user_id"],
+                "symbol": signal["symbol_name"],
+                "signal_type": signal_type,
+                "old_status": "active",
+                "new_status": update["status"],
+                "entry_price": entry_price,
+                "current_price": current_price,
+                "pnl_percent": update["result_pnl"]
+            })
+        elif current_price:
+            tp1 = signal["take_profit_1"]
+            stop_loss = signal["stop_loss"]
+            results.append({
+                "signal_id": signal["id"],
+                "symbol": signal["symbol_name"],
+                "signal_type": signal_type,
+                "status": "active",
+                "entry_price": entry_price,
+                "current_price": current_price,
+                "unrealized_pnl": round(_pnl_percent(signal_type, entry_price, current_price), 2),
+                "tp1_distance": round(((tp1 - current_price) / current_price) * 100, 2) if signal_type == "BUY" else round(((current_price - tp1) / current_price) * 100, 2),
+                "sl_distance": round(((current_price - stop_loss) / current_price) * 100, 2) if signal_type == "BUY" else round(((stop_loss - current_price) / current_price) * 100, 2)
+            })
+
+    updated = 0
+    if operations:
+        await db.signals.bulk_write(operations, ordered=False)
+
+        # Seules les clôtures effectivement appliquées par ce passage alimentent les synthèses
+        owned = set(await db.signals.distinct("id", {
+            "id": {"$in": [signal["id"] for _, signal, _ in closed]},
+            "evaluation_id": evaluation_id
+        }))
+        closed = [item for item in closed if item[1]["id"] in owned]
+        updated = len(closed)
+
+        # Synthèses par utilisateur, clôtures appliquées dans l'ordre chronologique
+        stats_operations = []
+        for _, signal, update in sorted(closed, key=lambda item: item[0]):
+            stats_operations += rollup_operations(signal, {**signal, **update})
+        if stats_operations:
+            await db.signal_stats.bulk_write(stats_operations, ordered=True)
+
+    return {
+        "total_evaluated": len(active_signals),
+        "updated": updated,
+        "results": results
+    }
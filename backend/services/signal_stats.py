@@ -0,0 +1,342 @@
+"""
+Signal Stats - Statistiques des signaux par utilisateur (document de synthèse)
+Chaque changement de statut applique un delta ($inc) sur le document
+signal_stats de l'utilisateur: la lecture des statistiques ne dépend plus
+du nombre de signaux. Le document est (re)construit par une agrégation $facet.
+Les séries suivent l'ordre des clôtures (hit_at, sinon evaluated_at) dans les
+deux chemins; "version" est incrémenté à chaque écriture pour que la
+reconstruction n'écrase pas un delta appliqué pendant son agrégation.
+"""
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+WIN_STATUSES = ("hit_tp1", "hit_tp2")
+
+_WIN_EXPR = {"$cond": [{"$in": ["$status", list(WIN_STATUSES)]}, 1, 0]}
+
+# Heure de clôture: niveau touché, sinon évaluation (expiration, statut manuel)
+_CLOSED_AT_EXPR = {"$ifNull": ["$hit_at", "$evaluated_at", "$created_at"]}
+
+REBUILD_ATTEMPTS = 3
+
+
+def _key(value: str) -> str:
+    """Clé de sous-document sûre pour MongoDB (pas de '.' ni de '$')"""
+    return str(value).replace(".", "_").replace("$", "_")
+
+
+def signal_contribution(signal: Optional[Dict]) -> Dict[str, float]:
+    """Contribution d'un signal aux compteurs de synthèse (chemins à plat)"""
+    if not signal:
+        return {}
+
+    status = signal.get("status", "active")
+    is_win = 1 if status in WIN_STATUSES else 0
+    pnl = signal.get("result_pnl")
+    symbol = _key(signal.get("symbol", ""))
+    timeframe = _key(signal.get("timeframe", ""))
+
+    contribution = {
+        "total": 1,
+        f"status.{status}": 1,
+        f"by_symbol.{symbol}.total": 1,
+        f"by_symbol.{symbol}.wins": is_win,
+        f"by_timeframe.{timeframe}.total": 1,
+        f"by_timeframe.{timeframe}.wins": is_win,
+    }
+    if pnl is not None:
+        month = _key(signal.get("created_at", "")[:7])
+        contribution.update({
+            "closed": 1,
+            "total_pnl": pnl,
+            "gross_profit": pnl if pnl > 0 else 0,
+            "gross_loss": -pnl if pnl < 0 else 0,
+            "win_pnl_count": 1 if pnl > 0 else 0,
+            "loss_pnl_count": 1 if pnl < 0 else 0,
+            f"by_symbol.{symbol}.pnl": pnl,
+            f"by_timeframe.{timeframe}.pnl": pnl,
+            f"monthly.{month}.signals": 1,
+            f"monthly.{month}.wins": is_win,
+            f"monthly.{month}.pnl": pnl,
+        })
+    return contribution
+
+
+def rollup_operations(before: Optional[Dict], after: Optional[Dict]) -> List[UpdateOne]:
+    """
+    Opérations de mise à jour du document de synthèse pour un changement
+    de signal (création: before=None, suppression: after=None)
+    """
+    signal = after or before
+    if not signal:
+        return []
+
+    delta = signal_contribution(after)
+    for path, value in signal_contribution(before).items():
+        delta[path] = delta.get(path, 0) - value
+    delta = {path: value for path, value in delta.items() if value}
+
+    now = datetime.now(timezone.utc).isoformat()
+    update = {"$set": {"updated_at": now}, "$inc": {"version": 1}}
+    update["$inc"].update(delta)
+    if after:
+        update["$set"][f"by_symbol.{_key(after.get('symbol', ''))}.name"] = after.get("symbol_name", after.get("symbol"))
+
+    # Sans upsert: un document absent est reconstruit par $facet à la première lecture
+    operations = [UpdateOne({"user_id": signal["user_id"]}, update)]
+
+    # Série en cours: avancée à chaque clôture, dans l'ordre des clôtures
+    if before and after and before.get("status") == "active" and after.get("status") != "active":
+        is_win = after["status"] in WIN_STATUSES
+        streak = {"$ifNull": ["$current_streak", 0]}
+        next_streak = (
+            {"$cond": [{"$gt": [streak, 0]}, {"$add": [streak, 1]}, 1]} if is_win
+            else {"$cond": [{"$lt": [streak, 0]}, {"$subtract": [streak, 1]}, -1]}
+        )
+        operations.append(UpdateOne({"user_id": signal["user_id"]}, [
+            {"$set": {"current_streak": next_streak, "version": {"$add": [{"$ifNull": ["$version", 0]}, 1]}}},
+            {"$set": {"max_streak": {"$max": [{"$ifNull": ["$max_streak", 0]}, {"$abs": "$current_streak"}]}}}
+        ]))
+    return operations
+
+
+async def apply_signal_change(db, before: Optional[Dict], after: Optional[Dict]):
+    operations = rollup_operations(before, after)
+    if operations:
+        await db.signal_stats.bulk_write(operations, ordered=True)
+
+
+def _streaks(statuses: List[str]):
+    """Série en cours (signée) et plus longue série, statuts de la clôture la plus récente à la plus ancienne"""
+    current_streak = 0
+    max_streak = 0
+    temp_streak = 0
+    last_result = None
+
+    for status in statuses:
+        is_win = status in WIN_STATUSES
+        if last_result is None:
+            last_result = is_win
+            current_streak = 1 if is_win else -1
+            temp_streak = 1
+        elif is_win == last_result:
+            temp_streak += 1
+            if current_streak > 0:
+                current_streak = temp_streak
+            else:
+                current_streak = -temp_streak
+        else:
+            max_streak = max(max_streak, abs(temp_streak))
+            temp_streak = 1
+            last_result = is_win
+            current_streak = 1 if is_win else -1
+    max_streak = max(max_streak, abs(temp_streak))
+    return current_streak, max_streak
+
+
+async def _aggregate_signal_stats(db, user_id: str) -> Dict:
+    """Document de synthèse d'un utilisateur calculé en une agrégation $facet"""
+    closed_only = {"$match": {"result_pnl": {"$ne": None}}}
+    facets = await db.signals.aggregate([
+        {"$match": {"user_id": user_id}},
+        {"$facet": {
+            "by_status": [{"$group": {"_id": "$status", "count": {"$sum": 1}}}],
+            "pnl": [closed_only, {"$group": {
+                "_id": None,
+                "closed": {"$sum": 1},
+                "total_pnl": {"$sum": "$result_pnl"},
+                "gross_profit": {"$sum": {"$cond": [{"$gt": ["$result_pnl", 0]}, "$result_pnl", 0]}},
+                "gross_loss": {"$sum": {"$cond": [{"$lt": ["$result_pnl", 0]}, {"$abs": "$result_pnl"}, 0]}},
+                "win_pnl_count": {"$sum": {"$cond": [{"$gt": ["$result_pnl", 0]}, 1, 0]}},
+                "loss_pnl_count": {"$sum": {"$cond": [{"$lt": ["$result_pnl", 0]}, 1, 0]}}
+            }}],
+            "by_symbol": [{"$group": {
+                "_id": "$symbol",
+                "name": {"$first": "$symbol_name"},
+                "total": {"$sum": 1},
+                "wins": {"$sum": _WIN_EXPR},
+                "pnl": {"$sum": {"$ifNull": ["$result_pnl", 0]}}
+            }}],
+            "by_timeframe": [{"$group": {
+                "_id": "$timeframe",
+                "total": {"$sum": 1},
+                "wins": {"$sum": _WIN_EXPR},
+                "pnl": {"$sum": {"$ifNull": ["$result_pnl", 0]}}
+            }}],
+            "monthly": [closed_only, {"$group": {
+                "_id": {"$substrCP": ["$created_at", 0, 7]},
+                "signals": {"$sum": 1},
+                "wins": {"$sum": _WIN_EXPR},
+                "pnl": {"$sum": "$result_pnl"}
+            }}],
+            "outcomes": [
+                {"$match": {"status": {"$ne": "active"}}},
+                {"$set": {"closed_at": _CLOSED_AT_EXPR}},
+                {"$sort": {"closed_at": -1, "id": -1}},
+                {"$project": {"_id": 0, "status": 1}}
+            ]
+        }}
+    ]).to_list(1)
+    facet = facets[0] if facets else {}
+
+    status_counts = {row["_id"]: row["count"] for row in facet.get("by_status", [])}
+    pnl = (facet.get("pnl") or [{}])[0]
+    current_streak, max_streak = _streaks([row["status"] for row in facet.get("outcomes", [])])
+
+    rollup = {
+        "user_id": user_id,
+        "total": sum(status_counts.values()),
+        "status": status_counts,
+        "closed": pnl.get("closed", 0),
+        "total_pnl": pnl.get("total_pnl", 0),
+        "gross_profit": pnl.get("gross_profit", 0),
+        "gross_loss": pnl.get("gross_loss", 0),
+        "win_pnl_count": pnl.get("win_pnl_count", 0),
+        "loss_pnl_count": pnl.get("loss_pnl_count", 0),
+        "by_symbol": {
+            _key(row["_id"]): {"name": row.get("name") or row["_id"], "total": row["total"], "wins": row["wins"], "pnl": row["pnl"]}
+            for row in facet.get("by_symbol", [])
+        },
+        "by_timeframe": {
+            _key(row["_id"]): {"total": row["total"], "wins": row["wins"], "pnl": row["pnl"]}
+            for row in facet.get("by_timeframe", [])
+        },
+        "monthly": {
+            _key(row["_id"]): {"signals": row["signals"], "wins": row["wins"], "pnl": row["pnl"]}
+            for row in facet.get("monthly", []) if row["_id"]
+        },
+        "current_streak": current_streak,
+        "max_streak": max_streak,
+        "updated_at": datetime.now(timezone.utc).isoformat()
+    }
+    return rollup
+
+
+async def rebuild_signal_stats(db, user_id: str) -> Dict:
+    """
+    Reconstruit le document de synthèse. Le remplacement n'a lieu que si
+    aucun delta n'a été appliqué depuis la lecture de la version; sinon
+    l'agrégation est relancée, puis le document incrémental est conservé.
+    """
+    for _ in range(REBUILD_ATTEMPTS):
+        current = await db.signal_stats.find_one({"user_id": user_id}, {"_id": 0, "version": 1})
+        rollup = await _aggregate_signal_stats(db, user_id)
+
+        if current is None:
+            rollup["version"] = 1
+            try:
+                await db.signal_stats.insert_one(rollup)
+            except DuplicateKeyError:
+                continue
+            rollup.pop("_id", None)
+            return rollup
+
+        version = current.get("version")
+        rollup["version"] = (version or 0) + 1
+        result = await db.signal_stats.replace_one({"user_id": user_id, "version": version}, rollup)
+        if result.matched_count:
+            return rollup
+
+    return await db.signal_stats.find_one({"user_id": user_id}, {"_id": 0}) or rollup
+
+
+async def get_signal_stats(db, user_id: str, rebuild: bool = False) -> Dict:
+    """Statistiques complètes à partir du document de synthèse (reconstruit si absent)"""
+    rollup = None if rebuild else await db.signal_stats.find_one({"user_id": user_id}, {"_id": 0})
+    if rollup is None:
+        rollup = await rebuild_signal_stats(db, user_id)
+
+    status = rollup.get("status", {})
+    hit_tp1 = status.get("hit_tp1", 0)
+    hit_tp2 = status.get("hit_tp2", 0)
+    hit_sl = status.get("hit_sl", 0)
+    completed = hit_tp1 + hit_tp2 + hit_sl
+    wins = hit_tp1 + hit_tp2
+
+    gross_profit = rollup.get("gross_profit", 0)
+    gross_loss = rollup.get("gross_loss", 0)
+    win_pnl_count = rollup.get("win_pnl_count", 0)
+    loss_pnl_count = rollup.get("loss_pnl_count", 0)
+
+    by_symbol = {}
+    for symbol, data in rollup.get("by_symbol", {}).items():
+        if not data.get("total"):
+            continue
+        by_symbol[symbol] = {
+            "total": data["total"],
+            "wins": data.get("wins", 0),
+            "pnl": round(data.get("pnl", 0), 2),
+            "name": data.get("name", symbol),
+            "win_rate": round(data.get("wins", 0) / data["total"] * 100, 1)
+        }
+
+    by_timeframe = {}
+    for timeframe, data in rollup.get("by_timeframe", {}).items():
+        if not data.get("total"):
+            continue
+        by_timeframe[timeframe] = {
+            "total": data["total"],
+            "wins": data.get("wins", 0),
+            "pnl": round(data.get("pnl", 0), 2),
+            "win_rate": round(data.get("wins", 0) / data["total"] * 100, 1)
+        }
+
+    monthly_performance = []
+    for month, data in sorted(rollup.get("monthly", {}).items(), reverse=True):
+        if not data.get("signals"):
+            continue
+        monthly_performance.append({
+            "month": month,
+            "signals": data["signals"],
+            "wins": data.get("wins", 0),
+            "win_rate": round(data.get("wins", 0) / data["signals"] * 100, 1),
+            "pnl": round(data.get("pnl", 0), 2)
+        })
+        if len(monthly_performance) == 6:
+            break
+
+    # Meilleur/pire signal et derniers signaux clôturés: lectures indexées bornées
+    closed_query = {"user_id": user_id, "result_pnl": {"$ne": None}}
+    projection = {"_id": 0, "symbol_name": 1, "signal_type": 1, "status": 1, "result_pnl": 1, "created_at": 1}
+    best = await db.signals.find(closed_query, projection).sort("result_pnl", -1).limit(1).to_list(1)
+    worst = await db.signals.find(closed_query, projection).sort("result_pnl", 1).limit(1).to_list(1)
+    recent = await db.signals.find(
+        {"user_id": user_id, "status": {"$ne": "active"}}, projection
+    ).sort("created_at", -1).limit(5).to_list(5)
+
+    def _summary(signal):
+        return {"symbol": signal.get("symbol_name"), "pnl": signal.get("result_pnl", 0), "type": signal.get("signal_type")}
+
+    return {
+        "total_signals": rollup.get("total", 0),
+        "active": status.get("active", 0),
+        "hit_tp1": hit_tp1,
+        "hit_tp2": hit_tp2,
+        "hit_sl": hit_sl,
+        "expired": status.get("expired", 0),
+        "win_rate": round(wins / completed * 100, 1) if completed > 0 else 0,
+        "total_pnl": round(rollup.get("total_pnl", 0), 2),
+        "avg_win": round(gross_profit / win_pnl_count, 2) if win_pnl_count else 0,
+        "avg_loss": round(gross_loss / loss_pnl_count, 2) if loss_pnl_count else 0,
+        "profit_factor": round(gross_profit / gross_loss if gross_loss > 0 else gross_profit, 2),
+        "best_signal": _summary(best[0]) if best else None,
+        "worst_signal": _summary(worst[0]) if worst else None,
+        "current_streak": rollup.get("current_streak", 0),
+        "max_streak": rollup.get("max_streak", 0),
+        "by_symbol": by_symbol,
+        "by_timeframe": by_timeframe,
+        "monthly_performance": monthly_performance,
+        "recent_signals": [
+            {
+                "symbol": s.get("symbol_name"),
+                "type": s.get("signal_type"),
+                "status": s.get("status"),
+                "pnl": s.get("result_pnl", 0),
+                "date": s.get("created_at", "")[:10]
+            }
+            for s in recent
+        ]
+    }
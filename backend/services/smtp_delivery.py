@@ -0,0 +1,219 @@
+"""
+SMTP Delivery - Envoi en masse de la newsletter
+- petit pool de connexions SMTP persistantes (STARTTLS + AUTH une seule fois)
+- workers bornés alimentés par une file, débit plafonné (messages/seconde)
+- nouvelles tentatives avec backoff exponentiel sur les erreurs temporaires
+- résultat par destinataire enregistré par lots (collection newsletter_deliveries)
+"""
+import asyncio
+import os
+import time
+from datetime import datetime, timezone
+from email.message import Message
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+import logging
+
+import aiosmtplib
+
+from core.indexes import log_expiry, NEWSLETTER_LOG_RETENTION_DAYS
+
+logger = logging.getLogger(__name__)
+
+NEWSLETTER_SMTP_CONNECTIONS = int(os.environ.get('NEWSLETTER_SMTP_CONNECTIONS', '3'))
+NEWSLETTER_SEND_WORKERS = int(os.environ.get('NEWSLETTER_SEND_WORKERS', '6'))
+# Débit maximal vers le fournisseur SMTP (0 = illimité)
+NEWSLETTER_SEND_RATE = float(os.environ.get('NEWSLETTER_SEND_RATE', '10'))
+NEWSLETTER_SEND_RETRIES = int(os.environ.get('NEWSLETTER_SEND_RETRIES', '3'))
+RETRY_BASE_DELAY_SECONDS = 2
+SMTP_TIMEOUT_SECONDS = 30
+# Résultats accumulés avant écriture groupée (perdus au plus en cas d'arrêt brutal)
+OUTCOME_BATCH_SIZE = 100
+# Écriture au moins toutes les N secondes à faible débit (le bail du job en dépend)
+OUTCOME_FLUSH_SECONDS = 30
+
+
+class RateLimiter:
+    """Espace les envois à 1/rate seconde (créneaux réservés dans l'ordre d'arrivée)"""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate if rate > 0 else 0
+        self._next_slot = 0.0
+
+    async def wait(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class SmtpConnectionPool:
+    """Connexions authentifiées réutilisées d'un envoi à l'autre"""
+
+    def __init__(self, config: Dict, size: int = NEWSLETTER_SMTP_CONNECTIONS):
+        self.config = config
+        self._slots = asyncio.Semaphore(size)
+        self._idle: List[aiosmtplib.SMTP] = []
+        self.connections_opened = 0
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        smtp = aiosmtplib.SMTP(
+            hostname=self.config.get("host", "smtp.gmail.com"),
+            port=self.config.get("port", 587),
+            username=self.config.get("username"),
+            password=self.config.get("password"),
+            start_tls=True,
+            timeout=SMTP_TIMEOUT_SECONDS
+        )
+        await smtp.connect()
+        self.connections_opened += 1
+        return smtp
+
+    @staticmethod
+    async def _discard(smtp: Optional[aiosmtplib.SMTP]):
+        if smtp is None:
+            return
+        try:
+            smtp.close()
+        except Exception:
+            pass
+
+    async def send(self, message: Message):
+        async with self._slots:
+            smtp = self._idle.pop() if self._idle else None
+            try:
+                if smtp is None or not smtp.is_connected:
+                    await self._discard(smtp)
+                    smtp = await self._connect()
+                await smtp.send_message(message)
+            except aiosmtplib.SMTPRecipientsRefused:
+                # Refus du destinataire: la session reste utilisable
+                self._idle.append(smtp)
+                raise
+            except Exception:
+                await self._discard(smtp)
+                raise
+            self._idle.append(smtp)
+
+    async def close(self):
+        while self._idle:
+            smtp = self._idle.pop()
+            try:
+                await smtp.quit()
+            except Exception:
+                await self._discard(smtp)
+
+
+def _is_permanent(error: Exception) -> bool:
+    """Erreurs définitives (adresse refusée, 5xx): pas de nouvelle tentative"""
+    if isinstance(error, aiosmtplib.SMTPRecipientsRefused):
+        return True
+    code = getattr(error, "code", None)
+    return isinstance(code, int) and 500 <= code < 600
+
+
+class NewsletterDelivery:
+    """Un envoi de newsletter vers une suite de destinataires"""
+
+    def __init__(self, db, smtp_config: Dict, run_id: str,
+                 workers: int = NEWSLETTER_SEND_WORKERS, rate: float = NEWSLETTER_SEND_RATE,
+                 on_flush: Optional[Callable[[], Awaitable]] = None):
+        self.db = db
+        self.run_id = run_id
+        # Appelé après chaque écriture groupée (ex: renouvellement du bail du job)
+        self.on_flush = on_flush
+        self.workers = max(1, workers)
+        self.pool = SmtpConnectionPool(smtp_config)
+        self.limiter = RateLimiter(rate)
+        self._outcomes: List[Dict] = []
+        self._flushed_at = time.monotonic()
+        self.sent = 0
+        self.failed = 0
+
+    async def _send_with_retry(self, message: Message) -> Tuple[int, Optional[str]]:
+        attempt = 0
+        while True:
+            attempt += 1
+            await self.limiter.wait()
+            try:
+                await self.pool.send(message)
+                return attempt, None
+            except Exception as e:
+                if _is_permanent(e) or attempt > NEWSLETTER_SEND_RETRIES:
+                    return attempt, str(e)
+                await asyncio.sleep(RETRY_BASE_DELAY_SECONDS * 2 ** (attempt - 1))
+
+    async def _flush(self):
+        self._flushed_at = time.monotonic()
+        if not self._outcomes:
+            return
+        outcomes, self._outcomes = self._outcomes, []
+        try:
+            await self.db.newsletter_deliveries.insert_many(outcomes, ordered=False)
+        except Exception as e:
+            logger.error(f"Could not record newsletter outcomes: {e}")
+        if self.on_flush:
+            try:
+                await self.on_flush()
+            except Exception as e:
+                logger.error(f"Newsletter flush callback error: {e}")
+
+    async def _record(self, recipient: Dict, attempts: int, error: Optional[str]):
+        if error:
+            self.failed += 1
+            logger.error(f"Failed to send newsletter to {recipient['email']}: {error}")
+        else:
+            self.sent += 1
+        self._outcomes.append({
+            "run_id": self.run_id,
+            "user_id": recipient.get("id"),
+            "email": recipient["email"],
+            "status": "failed" if error else "sent",
+            "attempts": attempts,
+            "error": error,
+            "at": datetime.now(timezone.utc).isoformat(),
+            "expires_at": log_expiry(NEWSLETTER_LOG_RETENTION_DAYS)
+        })
+        if (len(self._outcomes) >= OUTCOME_BATCH_SIZE
+                or time.monotonic() - self._flushed_at >= OUTCOME_FLUSH_SECONDS):
+            await self._flush()
+
+    async def _worker(self, queue: asyncio.Queue, build_message: Callable[[Dict], Message]):
+        while True:
+            recipient = await queue.get()
+            try:
+                if recipient is None:
+                    return
+                attempts, error = await self._send_with_retry(build_message(recipient))
+                await self._record(recipient, attempts, error)
+            except Exception as e:
+                await self._record(recipient, 0, str(e))
+            finally:
+                queue.task_done()
+
+    async def send_batch(self, recipients: List[Dict],
+                         build_message: Callable[[Dict], Message]) -> Tuple[int, int]:
+        """
+        Envoie à chaque destinataire ({"id", "email", ...}) et enregistre les résultats;
+        retourne (envoyés, échecs) du lot. Les connexions restent ouvertes pour le lot suivant.
+        """
+        sent, failed = self.sent, self.failed
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.workers * 2)
+        workers = [asyncio.create_task(self._worker(queue, build_message)) for _ in range(self.workers)]
+        try:
+            for recipient in recipients:
+                if recipient.get("email"):
+                    await queue.put(recipient)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+            await self._flush()
+        return self.sent - sent, self.failed - failed
+
+    async def close(self):
+        await self.pool.close()
@@ -0,0 +1,185 @@
+"""
+Indicateurs techniques incrémentaux pour BULL SAGE
+Chaque indicateur est mis à jour en O(1) à chaque nouvelle bougie clôturée,
+sans recalcul sur l'historique
+"""
+
+import math
+from collections import deque
+from typing import Dict, Optional
+
+
+class StreamingRSI:
+    """RSI de Wilder (lissage exponentiel des gains/pertes)"""
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.prev_close: Optional[float] = None
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+        self.count = 0
+        self.value: Optional[float] = None
+
+    def update(self, close: float) -> Optional[float]:
+        if self.prev_close is None:
+            self.prev_close = close
+            return None
+
+        change = close - self.prev_close
+        self.prev_close = close
+        gain = max(change, 0.0)
+        loss = max(-change, 0.0)
+        self.count += 1
+
+        if self.count <= self.period:
+            # Phase d'amorçage: moyenne simple des premières variations
+            self.avg_gain += gain / self.period
+            self.avg_loss += loss / self.period
+            if self.count < self.period:
+                return None
+        else:
+            self.avg_gain = (self.avg_gain * (self.period - 1) + gain) / self.period
+            self.avg_loss = (self.avg_loss * (self.period - 1) + loss) / self.period
+
+        if self.avg_loss == 0:
+            self.value = 100.0
+        else:
+            rs = self.avg_gain / self.avg_loss
+            self.value = 100 - (100 / (1 + rs))
+        return self.value
+
+
+class StreamingEMA:
+    """Moyenne mobile exponentielle"""
+
+    def __init__(self, period: int):
+        self.alpha = 2 / (period + 1)
+        self.value: Optional[float] = None
+
+    def update(self, x: float) -> float:
+        self.value = x if self.value is None else self.value + self.alpha * (x - self.value)
+        return self.value
+
+
+class StreamingMACD:
+    """MACD (12, 26, 9) avec détection des croisements de la ligne de signal"""
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self.fast = StreamingEMA(fast)
+        self.slow = StreamingEMA(slow)
+        self.signal = StreamingEMA(signal)
+        self.warmup = slow + signal
+        self.count = 0
+        self.macd: Optional[float] = None
+        self.histogram: Optional[float] = None
+        self.cross: Optional[str] = None  # "up", "down" ou None sur la dernière bougie
+
+    def update(self, close: float) -> Optional[str]:
+        macd = self.fast.update(close) - self.slow.update(close)
+        signal = self.signal.update(macd)
+        histogram = macd - signal
+        self.count += 1
+
+        self.cross = None
+        if self.count > self.warmup and self.histogram is not None:
+            if self.histogram <= 0 < histogram:
+                self.cross = "up"
+            elif self.histogram >= 0 > histogram:
+                self.cross = "down"
+
+        self.macd = macd
+        self.histogram = histogram
+        return self.cross
+
+
+class StreamingBollinger:
+    """Bandes de Bollinger sur fenêtre glissante (sommes courantes)"""
+
+    def __init__(self, period: int = 20, std_dev: float = 2.0):
+        self.period = period
+        self.std_dev = std_dev
+        self.window = deque(maxlen=period)
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.upper: Optional[float] = None
+        self.lower: Optional[float] = None
+
+    def update(self, close: float):
+        if len(self.window) == self.period:
+            old = self.window[0]
+            self.total -= old
+            self.total_sq -= old * old
+        self.window.append(close)
+        self.total += close
+        self.total_sq += close * close
+
+        if len(self.window) < self.period:
+            return
+        mean = self.total / self.period
+        std = math.sqrt(max(self.total_sq / self.period - mean * mean, 0.0))
+        self.upper = mean + self.std_dev * std
+        self.lower = mean - self.std_dev * std
+
+
+class StreamingVolume:
+    """Volume relatif: volume de la bougie / moyenne des N bougies précédentes"""
+
+    def __init__(self, period: int = 20):
+        self.period = period
+        self.window = deque(maxlen=period)
+        self.total = 0.0
+        self.ratio: Optional[float] = None
+
+    def update(self, volume: float) -> Optional[float]:
+        if len(self.window) == self.period and self.total > 0:
+            self.ratio = volume / (self.total / self.period)
+        else:
+            self.ratio = None
+
+        if len(self.window) == self.period:
+            self.total -= self.window[0]
+        self.window.append(volume)
+        self.total += volume
+        return self.ratio
+
+
+class IndicatorState:
+    """État des indicateurs d'un couple (symbole, intervalle), partagé par toutes les alertes"""
+
+    def __init__(self):
+        self.rsi = StreamingRSI()
+        self.macd = StreamingMACD()
+        self.bollinger = StreamingBollinger()
+        self.volume = StreamingVolume()
+        self.last_time: Optional[int] = None
+        self.close: Optional[float] = None
+
+    def update(self, candle: Dict) -> Dict:
+        """Intègre une bougie clôturée et retourne l'instantané des indicateurs"""
+        close = candle["close"]
+        self.rsi.update(close)
+        self.macd.update(close)
+        self.bollinger.update(close)
+        self.volume.update(candle.get("volume", 0))
+        self.last_time = candle["time"]
+        self.close = close
+        return self.snapshot()
+
+    def snapshot(self) -> Dict:
+        upper, lower = self.bollinger.upper, self.bollinger.lower
+        return {
+            "time": self.last_time,
+            "close": self.close,
+            "rsi": self.rsi.value,
+            "macd": self.macd.macd,
+            "macd_histogram": self.macd.histogram,
+            "macd_cross": self.macd.cross,
+            "bb_upper": upper,
+            "bb_lower": lower,
+            "bb_break": (
+                "up" if upper is not None and self.close > upper
+                else "down" if lower is not None and self.close < lower
+                else None
+            ),
+            "volume_ratio": self.volume.ratio
+        }
@@ -0,0 +1,180 @@
+"""
+Translation Cache - Cache des traductions EN -> FR
+Mémoire LRU bornée devant la collection MongoDB "translations" (clé: hash
+du texte source), partagée entre workers et conservée au redémarrage.
+Chaque texte manquant est "réservé" par un seul worker avant traduction:
+un même titre n'est envoyé qu'une fois au LLM.
+"""
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Iterable, List
+import logging
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+TRANSLATION_CACHE_MAX_ENTRIES = int(os.environ.get('TRANSLATION_CACHE_MAX_ENTRIES', '5000'))
+# Réservation abandonnée (worker arrêté) reprise après ce délai
+TRANSLATION_CLAIM_TIMEOUT_SECONDS = 120
+# Attente max des traductions lancées par une autre requête (le texte reste en anglais au-delà)
+TRANSLATION_WAIT_TIMEOUT_SECONDS = 60
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class TranslationCache:
+    def __init__(self, max_entries: int = TRANSLATION_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.db = None
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        # Traductions en cours dans ce processus (hash -> future)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    def initialize(self, db):
+        self.db = db
+
+    def _remember(self, key: str, translation: str):
+        self._entries[key] = translation
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def lookup(self, texts: Iterable[str]) -> Dict[str, str]:
+        """Traductions connues (mémoire puis MongoDB), indexées par texte source"""
+        found = {}
+        missing = {}
+        for text in texts:
+            key = text_hash(text)
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                found[text] = self._entries[key]
+                self.hits += 1
+            else:
+                missing[key] = text
+
+        if missing and self.db is not None:
+            cursor = self.db.translations.find(
+                {"_id": {"$in": list(missing)}, "status": "done"},
+                {"translation": 1}
+            )
+            async for doc in cursor:
+                found[missing[doc["_id"]]] = doc["translation"]
+                self._remember(doc["_id"], doc["translation"])
+                self.db_hits += 1
+        return found
+
+    async def claim(self, texts: List[str]) -> List[str]:
+        """Réserve les textes à traduire; retourne ceux attribués à ce worker"""
+        keys = {text_hash(text): text for text in texts if text_hash(text) not in self._inflight}
+        if not keys:
+            return []
+        if self.db is None:
+            owned = list(keys)
+        else:
+            now = datetime.now(timezone.utc)
+            try:
+                await self.db.translations.insert_many(
+                    [{"_id": key, "status": "pending", "claimed_at": now} for key in keys],
+                    ordered=False
+                )
+                owned = list(keys)
+            except BulkWriteError as e:
+                taken = {error["op"]["_id"] for error in e.details.get("writeErrors", [])}
+                owned = [key for key in keys if key not in taken]
+                # Reprendre les réservations abandonnées
+                stale = await self.db.translations.find(
+                    {"_id": {"$in": list(taken)}, "status": "pending",
+                     "claimed_at": {"$lt": now - timedelta(seconds=TRANSLATION_CLAIM_TIMEOUT_SECONDS)}},
+                    {"_id": 1}
+                ).to_list(len(taken))
+                for doc in stale:
+                    result = await self.db.translations.update_one(
+                        {"_id": doc["_id"], "status": "pending", "claimed_at": {"$lt": now - timedelta(seconds=TRANSLATION_CLAIM_TIMEOUT_SECONDS)}},
+                        {"$set": {"claimed_at": now}}
+                    )
+                    if result.modified_count:
+                        owned.append(doc["_id"])
+
+        loop = asyncio.get_running_loop()
+        for key in owned:
+            self._inflight[key] = loop.create_future()
+        self.misses += len(owned)
+        return [keys[key] for key in owned]
+
+    async def wait_inflight(self, texts: Iterable[str],
+                            timeout: float = TRANSLATION_WAIT_TIMEOUT_SECONDS) -> Dict[str, str]:
+        """Résultats des traductions lancées par une autre requête de ce processus"""
+        found = {}
+        deadline = time.monotonic() + timeout
+        for text in texts:
+            future = self._inflight.get(text_hash(text))
+            if future is None:
+                continue
+            try:
+                translation = await asyncio.wait_for(
+                    asyncio.shield(future), timeout=max(deadline - time.monotonic(), 0)
+                )
+            except asyncio.TimeoutError:
+                logger.warning("Translation still in flight after timeout, returning original text")
+                break
+            if translation:
+                found[text] = translation
+        return found
+
+    async def store(self, translations: Dict[str, str], failed: Iterable[str] = ()):
+        """Enregistre les traductions et libère les réservations non abouties"""
+        now = datetime.now(timezone.utc)
+        failed = list(failed)
+        for text, translation in translations.items():
+            self._remember(text_hash(text), translation)
+        # Les requêtes en attente sont servies avant (et quel que soit le résultat de) l'écriture
+        for text in list(translations) + failed:
+            future = self._inflight.pop(text_hash(text), None)
+            if future is not None and not future.done():
+                future.set_result(translations.get(text))
+
+        if self.db is None:
+            return
+        try:
+            if translations:
+                await self.db.translations.bulk_write([
+                    UpdateOne(
+                        {"_id": text_hash(text)},
+                        {"$set": {"status": "done", "translation": translation, "translated_at": now}},
+                        upsert=True
+                    )
+                    for text, translation in translations.items()
+                ], ordered=False)
+            failed_keys = [text_hash(text) for text in failed]
+            if failed_keys:
+                await self.db.translations.delete_many({"_id": {"$in": failed_keys}, "status": "pending"})
+        except Exception as e:
+            # Réservations restantes reprises après TRANSLATION_CLAIM_TIMEOUT_SECONDS
+            logger.error(f"Translation cache write error: {e}")
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.db_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "memory_hits": self.hits,
+            "db_hits": self.db_hits,
+            "translated": self.misses,
+            "hit_ratio": round((self.hits + self.db_hits) / lookups, 3) if lookups else None,
+            "inflight": len(self._inflight)
+        }
+
+
+# Instance globale
+translation_cache = TranslationCache()
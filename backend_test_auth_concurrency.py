@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+BULL SAGE - Login Concurrency Benchmark
+Measures /api/health latency alone, then during a burst of concurrent logins.
+With bcrypt running off the event loop, health latency should stay flat.
+
+Usage: python backend_test_auth_concurrency.py [base_url] [logins] [concurrency]
+Note: the burst counts against LOGIN_MAX_ATTEMPTS_PER_IP (default 30 per 15 min);
+raise it on the server for larger bursts.
+"""
+
+import requests
+import sys
+import time
+import statistics
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+class LoginConcurrencyBenchmark:
+    def __init__(self, base_url="http://localhost:8001", logins=20, concurrency=10):
+        self.base_url = base_url
+        self.logins = logins
+        self.concurrency = concurrency
+        self.email = f"bench_{datetime.now().strftime('%H%M%S%f')}@test.com"
+        self.password = "BenchPass123!"
+
+    def register(self):
+        """Create the account used for the burst"""
+        response = requests.post(
+            f"{self.base_url}/api/auth/register",
+            json={"email": self.email, "password": self.password, "name": "Bench User"},
+            timeout=30
+        )
+        return response.status_code == 200
+
+    def login(self, _):
+        start = time.perf_counter()
+        response = requests.post(
+            f"{self.base_url}/api/auth/login",
+            json={"email": self.email, "password": self.password},
+            timeout=60
+        )
+        return response.status_code, time.perf_counter() - start
+
+    def probe_health(self, stop_event, samples):
+        """Poll the health endpoint until stop_event is set"""
+        while not stop_event.is_set():
+            start = time.perf_counter()
+            try:
+                requests.get(f"{self.base_url}/api/health", timeout=30)
+                samples.append(time.perf_counter() - start)
+            except requests.RequestException:
+                pass
+            time.sleep(0.02)
+
+    @staticmethod
+    def summary(samples):
+        if not samples:
+            return "no samples"
+        ordered = sorted(samples)
+        p95 = ordered[max(int(len(ordered) * 0.95) - 1, 0)]
+        return (f"n={len(samples)} p50={statistics.median(samples) * 1000:.1f}ms "
+                f"p95={p95 * 1000:.1f}ms max={ordered[-1] * 1000:.1f}ms")
+
+    def run(self):
+        if not self.register():
+            print("❌ Could not register benchmark user")
+            return False
+
+        # Baseline: health latency with no login traffic
+        baseline = []
+        stop = threading.Event()
+        probe = threading.Thread(target=self.probe_health, args=(stop, baseline))
+        probe.start()
+        time.sleep(2)
+        stop.set()
+        probe.join()
+
+        # Burst: concurrent logins while probing health
+        during = []
+        stop = threading.Event()
+        probe = threading.Thread(target=self.probe_health, args=(stop, during))
+        probe.start()
+        burst_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            results = list(pool.map(self.login, range(self.logins)))
+        burst_time = time.perf_counter() - burst_start
+        stop.set()
+        probe.join()
+
+        ok = [t for status, t in results if status == 200]
+        throttled = sum(1 for status, _ in results if status == 429)
+        print(f"🔐 Logins: {len(ok)}/{self.logins} ok, {throttled} throttled, burst {burst_time:.2f}s")
+        print(f"   Login latency: {self.summary(ok)}")
+        print(f"🩺 Health baseline:    {self.summary(baseline)}")
+        print(f"🩺 Health under burst: {self.summary(during)}")
+
+        if baseline and during:
+            ratio = statistics.median(during) / statistics.median(baseline)
+            print(f"   Median slowdown during burst: x{ratio:.2f}")
+            return ratio < 3
+        return False
+
+def main():
+    print("🚀 BULL SAGE - Login Concurrency Benchmark")
+    print("=" * 50)
+
+    base_url = sys.argv[1] if len(sys.argv) > 1 else "http://localhost:8001"
+    logins = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+
+    benchmark = LoginConcurrencyBenchmark(base_url, logins, concurrency)
+    success = benchmark.run()
+    print("✅ Event loop unaffected by login burst" if success else "❌ Health latency degraded during login burst")
+    return 0 if success else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -200,6 +200,9 @@ export default function AdminPage() {
   const [activeTab, setActiveTab] = useState("overview");
   const [stats, setStats] = useState(null);
   const [users, setUsers] = useState([]);
+  // Cursor of the next users page (X-Next-Cursor), null on the last page
+  const [usersCursor, setUsersCursor] = useState(null);
+  const [loadingMoreUsers, setLoadingMoreUsers] = useState(false);
   const [loading, setLoading] = useState(true);
   const [refreshing, setRefreshing] = useState(false);
   
@@ -222,6 +225,7 @@ export default function AdminPage() {
       ]);
       setStats(statsRes.data || {});
       setUsers(Array.isArray(usersRes.data) ? usersRes.data : []);
+      setUsersCursor(usersRes.headers["x-next-cursor"] || null);
     } catch (error) {
       console.error("Error fetching admin data:", error);
       toast.error("Erreur lors du chargement des données admin");
@@ -231,6 +235,21 @@ export default function AdminPage() {
     }
   };
 
+  const fetchMoreUsers = async () => {
+    if (!usersCursor) return;
+    setLoadingMoreUsers(true);
+    try {
+      const response = await axios.get(`${API}/admin/users`, { params: { after: usersCursor } });
+      setUsers((prev) => [...prev, ...(Array.isArray(response.data) ? response.data : [])]);
+      setUsersCursor(response.headers["x-next-cursor"] || null);
+    } catch (error) {
+      console.error("Error fetching more users:", error);
+      toast.error("Erreur lors du chargement des utilisateurs");
+    } finally {
+      setLoadingMoreUsers(false);
+    }
+  };
+
   const fetchApiHealth = async () => {
     setLoadingHealth(true);
     try {
@@ -544,7 +563,11 @@ export default function AdminPage() {
                 <Users className="w-5 h-5 text-blue-500" />
                 Gestion des Utilisateurs
               </CardTitle>
-              <CardDescription>{users.length} utilisateur(s) inscrit(s)</CardDescription>
+              <CardDescription>
+                {usersCursor
+                  ? `${users.length} sur ${stats?.users ?? "?"} utilisateur(s) affiché(s)`
+                  : `${users.length} utilisateur(s) inscrit(s)`}
+              </CardDescription>
             </CardHeader>
             <CardContent>
               <ScrollArea className="h-[500px]">
@@ -645,6 +668,19 @@ export default function AdminPage() {
                   </TableBody>
                 </Table>
               </ScrollArea>
+              {usersCursor && (
+                <div className="flex justify-center pt-4">
+                  <Button
+                    variant="outline"
+                    onClick={fetchMoreUsers}
+                    disabled={loadingMoreUsers}
+                    className="border-white/10"
+                  >
+                    {loadingMoreUsers && <Loader2 className="w-4 h-4 mr-2 animate-spin" />}
+                    Charger plus
+                  </Button>
+                </div>
+              )}
             </CardContent>
           </Card>
         </TabsContent>
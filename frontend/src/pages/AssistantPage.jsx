@@ -33,6 +33,7 @@ export default function AssistantPage() {
   const [messages, setMessages] = useState([]);
   const [input, setInput] = useState("");
   const [loading, setLoading] = useState(false);
+  const [streaming, setStreaming] = useState(false);
   const [loadingHistory, setLoadingHistory] = useState(true);
   const [marketContext, setMarketContext] = useState(null);
   const scrollRef = useRef(null);
@@ -95,28 +96,70 @@ export default function AssistantPage() {
     setLoading(true);
 
     try {
-      const response = await axios.post(`${API}/assistant/chat`, {
-        message: text,
-        context: {
-          watchlist_data: marketContext
-        }
+      // Server-Sent Events: the answer is displayed as it is generated
+      const response = await fetch(`${API}/assistant/chat/stream`, {
+        method: "POST",
+        headers: {
+          "Content-Type": "application/json",
+          Authorization: `Bearer ${localStorage.getItem("token")}`
+        },
+        body: JSON.stringify({
+          message: text,
+          context: {
+            watchlist_data: marketContext
+          }
+        })
       });
+      if (!response.ok || !response.body) {
+        throw new Error(`HTTP ${response.status}`);
+      }
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      let content = "";
+      let done = false;
 
-      const assistantMessage = {
-        role: "assistant",
-        content: response.data.response,
-        timestamp: response.data.timestamp
-      };
+      while (!done) {
+        const chunk = await reader.read();
+        if (chunk.done) break;
+        buffer += decoder.decode(chunk.value, { stream: true });
 
-      setMessages(prev => [...prev, assistantMessage]);
+        const events = buffer.split("\n\n");
+        buffer = events.pop();
+        for (const raw of events) {
+          const type = raw.match(/^event: (.*)$/m)?.[1];
+          const data = raw.match(/^data: (.*)$/m)?.[1];
+          if (!type || !data) continue;
+          const payload = JSON.parse(data);
+
+          if (type === "delta") {
+            if (!content) {
+              setStreaming(true);
+              setMessages(prev => [...prev, { role: "assistant", content: "", timestamp: new Date().toISOString() }]);
+            }
+            content += payload.text;
+            const current = content;
+            setMessages(prev => [...prev.slice(0, -1), { ...prev[prev.length - 1], content: current }]);
+          } else if (type === "done") {
+            // Without any delta the last message is the user's own: leave it untouched
+            if (!content) throw new Error("Empty response");
+            setMessages(prev => [...prev.slice(0, -1), { ...prev[prev.length - 1], timestamp: payload.timestamp }]);
+            done = true;
+          } else if (type === "error") {
+            throw new Error(payload.detail);
+          }
+        }
+      }
     } catch (error) {
       console.error("Error sending message:", error);
       toast.error("Erreur de communication avec l'assistant");
       
-      // Remove the user message if error
-      setMessages(prev => prev.slice(0, -1));
+      // Remove the user message (and partial answer) if error
+      setMessages(prev => prev.slice(0, prev[prev.length - 1]?.role === "assistant" ? -2 : -1));
     } finally {
       setLoading(false);
+      setStreaming(false);
       inputRef.current?.focus();
     }
   };
@@ -229,7 +272,7 @@ export default function AssistantPage() {
                   </div>
                 ))}
                 
-                {loading && (
+                {loading && !streaming && (
                   <div className="flex justify-start animate-fade-in">
                     <div className="chat-bubble-assistant p-4">
                       <div className="flex items-center gap-2">
@@ -0,0 +1,78 @@
+"""
+AutoTrader trailing stops: the stop follows the high/low-water mark, never
+moves back, and the position closes once the price crosses it.
+"""
+import asyncio
+import sys
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from services.auto_trader import AutoTrader, AutoTrade  # noqa: E402
+
+
+def _trade(side: str, entry: float, stop: float, target: float) -> AutoTrade:
+    return AutoTrade(
+        id=f"trade_{side}",
+        user_id="user_1",
+        symbol="BTC",
+        side=side,
+        entry_price=entry,
+        quantity=1.0,
+        position_value=entry,
+        stop_loss=stop,
+        take_profit=target,
+        status="open",
+        signal_score=80,
+        signal_reason="test",
+        created_at=datetime.utcnow(),
+        trailing_stop_percent=2.0
+    )
+
+
+def _open(trader: AutoTrader, trade: AutoTrade):
+    trader.active_trades.setdefault(trade.user_id, []).append(trade)
+    trader._index_trade(trade)
+
+
+def test_long_trailing_stop_ratchets_then_fires():
+    trader = AutoTrader()
+    trade = _trade("long", entry=100.0, stop=95.0, target=200.0)
+    _open(trader, trade)
+
+    async def scenario():
+        assert await trader.check_prices({"BTC": 110.0}) == []
+        assert trade.stop_loss == 107.8
+        assert trade.water_mark == 110.0
+
+        # Pullback above the stop: the stop does not move back
+        assert await trader.check_prices({"BTC": 108.0}) == []
+        assert trade.stop_loss == 107.8
+
+        closed = await trader.check_prices({"BTC": 107.0})
+        assert [c["reason"] for c in closed] == ["STOP_LOSS"]
+        assert closed[0]["pnl"] == 7.0
+        assert trade.status == "stopped_out"
+        assert trader.monitored_symbols() == []
+
+    asyncio.run(scenario())
+
+
+def test_short_trailing_stop_ratchets_then_fires():
+    trader = AutoTrader()
+    trade = _trade("short", entry=100.0, stop=105.0, target=50.0)
+    _open(trader, trade)
+
+    async def scenario():
+        assert await trader.check_prices({"BTC": 90.0}) == []
+        assert trade.stop_loss == 91.8
+
+        assert await trader.check_prices({"BTC": 91.0}) == []
+        assert trade.stop_loss == 91.8
+
+        closed = await trader.check_prices({"BTC": 92.0})
+        assert [c["reason"] for c in closed] == ["STOP_LOSS"]
+        assert closed[0]["pnl"] == 8.0
+
+    asyncio.run(scenario())
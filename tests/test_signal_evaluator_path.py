@@ -0,0 +1,57 @@
+"""
+Signal evaluation path: candles that closed before the signal existed never
+resolve it, whatever their highs and lows.
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from services.signal_evaluator import path_start, resolve_outcome  # noqa: E402
+
+STEP = 3600
+SIGNAL = {
+    "signal_type": "BUY",
+    "entry_price": 100.0,
+    "stop_loss": 95.0,
+    "take_profit_1": 110.0,
+    "take_profit_2": 120.0,
+}
+
+
+def _path(times, highs, lows, created_ts, current_price):
+    start = path_start(times, created_ts, STEP)
+    return (
+        start,
+        np.append(highs[start:], current_price),
+        np.append(lows[start:], current_price),
+    )
+
+
+def test_signal_created_after_last_closed_candle_ignores_it():
+    times = np.array([0, 3600], dtype=np.int64)
+    # The last closed candle (3600-7200) spiked through TP before the signal existed
+    highs = np.array([101.0, 125.0])
+    lows = np.array([99.0, 90.0])
+
+    start, path_highs, path_lows = _path(times, highs, lows, created_ts=7300, current_price=101.0)
+
+    assert start == len(times)
+    assert list(path_highs) == [101.0]
+    assert resolve_outcome(SIGNAL, path_highs, path_lows) is None
+
+
+def test_candles_closed_before_creation_are_skipped():
+    times = np.array([0, 3600, 7200], dtype=np.int64)
+    # Candle 0 closed before creation with a low under the stop: it must not count
+    highs = np.array([101.0, 104.0, 111.0])
+    lows = np.array([90.0, 99.0, 103.0])
+
+    start, path_highs, path_lows = _path(times, highs, lows, created_ts=4000, current_price=108.0)
+
+    assert start == 1
+    outcome = resolve_outcome(SIGNAL, path_highs, path_lows)
+    assert outcome["status"] == "hit_tp1"
+    assert start + outcome["index"] == 2